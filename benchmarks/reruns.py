@@ -0,0 +1,220 @@
+"""Rerun latency of each page at several book sizes, checked against a baseline.
+
+Every page is driven headlessly with Streamlit's AppTest against a scratch
+store holding 10, 1,000, 10,000 or 100,000 submissions. The store is filled
+beforehand with a seeded synthetic book from ``core.synthetic``, spread
+over a year, then scored and synced to history, so it looks like a store
+that has been in use. Each page runs in a fresh interpreter, with the
+deadline monitor already loaded, through these scenarios:
+
+- ``first``: the first run of a session, with Streamlit's caches empty
+- ``rerun``: the same session run again with nothing changed, the median
+  of ``--repeats`` runs
+- ``filter``: a filter changed to a value not seen before, on the triage
+  queue and the dashboard
+
+Each scenario records the script-run time, the peak memory Python
+allocated during the run, and the number of elements the page emitted.
+Memory is measured in a second interpreter under ``tracemalloc``, which
+would otherwise slow the timed runs down.
+
+Results are compared with ``rerun_baseline.json``; a scenario regresses
+when it is more than half as slow again as its baseline (and at least
+50 ms slower), uses half as much memory again (and at least 5 MB more), or
+emits over a tenth more elements. Exits with status 1 on any regression
+or page error. ``--update-baseline`` writes the results measured as the new
+baseline.
+
+    python benchmarks/reruns.py [page ...] [--sizes N ...] [--repeats N] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rerun_baseline.json")
+PAGES = ["overview.py", "pages/01_Data_Ingestion.py", "pages/02_Submission_Triage.py", "pages/03_Dashboard.py"]
+SIZES = [10, 1_000, 10_000, 100_000]
+
+# Filter each page's ``filter`` scenario changes: (widget kind, label, new value)
+FILTERS = {
+    "pages/02_Submission_Triage.py": ("selectbox", "Line of Business", "Cyber"),
+    "pages/03_Dashboard.py": ("selectbox", "Date Range", "Last 12 Months"),
+}
+
+# Regression thresholds: relative, and the absolute margin also required
+TIME_TOLERANCE = (0.5, 0.05)
+MEMORY_TOLERANCE = (0.5, 5.0)
+ELEMENT_TOLERANCE = 0.1
+
+SEED = 2024
+
+
+def _populate(size, seed=SEED):
+    # Runs with HX_RENEW_DATA pointing at the scratch directory
+    sys.path.insert(0, ROOT)
+    from core import history, scoring, store, synthetic
+
+    # A new store seeds itself with the small demo book; the synthetic one goes on top
+    conn = store.get_connection()
+    with conn:
+        synthetic.load(conn, synthetic.generate_submissions(size, seed=seed, id_prefix="BENCH"))
+    scoring.ensure_scored()
+    history.sync()
+
+
+def _count_elements(node):
+    children = getattr(node, "children", None)
+    if children is None:
+        return 1
+    return 1 + sum(_count_elements(child) for child in children.values())
+
+
+def _run(at, traced):
+    if traced:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - started
+    peak_mb = (tracemalloc.get_traced_memory()[1] - before) / 2**20 if traced else None
+    elements = _count_elements(at.main) + _count_elements(at.sidebar)
+    return {"seconds": seconds, "peak_mb": peak_mb, "elements": elements, "errors": [str(e.value) for e in at.exception]}
+
+
+def _median(runs):
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "peak_mb": runs[0]["peak_mb"] if runs[0]["peak_mb"] is None else statistics.median(run["peak_mb"] for run in runs),
+        "elements": runs[-1]["elements"],
+        "errors": [error for run in runs for error in run["errors"]],
+    }
+
+
+def run_page(page, repeats, traced):
+    """Run one page's scenarios in this interpreter; returns ``{scenario: result}``."""
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    from core import sla
+
+    # A running server has the monitor loaded already
+    sla.get_monitor().tick()
+    if traced:
+        tracemalloc.start()
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=600)
+    results = {"first": _run(at, traced)}
+    results["rerun"] = _median([_run(at, traced) for _ in range(repeats)])
+    if page in FILTERS:
+        kind, label, value = FILTERS[page]
+        widget = next(w for w in getattr(at, kind) if w.label == label)
+        widget.set_value(value)
+        results["filter"] = _run(at, traced)
+    return results
+
+
+def measure(page, size, env, repeats):
+    """Scenario results for one page at one size, timed and memory runs merged."""
+    results = {}
+    for traced in (False, True):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", page, "--repeats", str(repeats)] + (["--traced"] if traced else []),
+            env=env, cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise RuntimeError(f"{page} at {size} submissions failed:\n{proc.stderr}")
+        for scenario, run in json.loads(proc.stdout.strip().splitlines()[-1]).items():
+            merged = results.setdefault(scenario, {"errors": []})
+            if traced:
+                merged["peak_mb"] = run["peak_mb"]
+            else:
+                merged["seconds"] = run["seconds"]
+                merged["elements"] = run["elements"]
+            merged["errors"] = sorted(set(merged["errors"] + run["errors"]))
+    return results
+
+
+def regressions(result, base):
+    """Ways ``result`` is worse than its baseline ``base``."""
+    found = []
+    relative, margin = TIME_TOLERANCE
+    if result["seconds"] > base["seconds"] * (1 + relative) and result["seconds"] - base["seconds"] > margin:
+        found.append(f"time {base['seconds']:.3f}s -> {result['seconds']:.3f}s")
+    relative, margin = MEMORY_TOLERANCE
+    if result["peak_mb"] > base["peak_mb"] * (1 + relative) and result["peak_mb"] - base["peak_mb"] > margin:
+        found.append(f"memory {base['peak_mb']:.1f}MB -> {result['peak_mb']:.1f}MB")
+    if result["elements"] > base["elements"] * (1 + ELEMENT_TOLERANCE):
+        found.append(f"elements {base['elements']} -> {result['elements']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeats", type=int, default=5, help="reruns to take the median of")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--populate", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--traced", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.populate is not None:
+        _populate(args.populate)
+        return
+    if args.child:
+        print(json.dumps(run_page(args.child, args.repeats, args.traced)))
+        return
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    failed = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = dict(os.environ, HX_RENEW_DATA=data_dir, HX_RENEW_DB=os.path.join(data_dir, "submissions.db"))
+            subprocess.run([sys.executable, __file__, "--populate", str(size)], env=env, cwd=ROOT, check=True)
+            for page in args.pages:
+                key = f"{page}@{size}"
+                results = measure(page, size, env, args.repeats)
+                print(f"{page} at {size:,} submissions")
+                for scenario, result in results.items():
+                    base = baseline.get(key, {}).get(scenario)
+                    found = regressions(result, base) if base else []
+                    status = "REGRESSED: " + "; ".join(found) if found else ("ok" if base else "no baseline")
+                    print(
+                        f"  {scenario:<7} {result['seconds']:7.3f}s {result['peak_mb']:8.1f}MB "
+                        f"{result['elements']:5d} elements  {status}"
+                    )
+                    for error in result["errors"]:
+                        print(f"    error: {error}")
+                    if found or result["errors"]:
+                        failed.append(f"{key} {scenario}")
+                baseline[key] = {
+                    scenario: {k: round(result[k], 4) for k in ("seconds", "peak_mb", "elements")}
+                    for scenario, result in results.items()
+                } if args.update_baseline else baseline.get(key, {})
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {os.path.relpath(BASELINE_PATH, ROOT)}")
+
+    if failed:
+        print(f"Regressed or failing: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
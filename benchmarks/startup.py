@@ -0,0 +1,115 @@
+"""Cold-start profile of each page, checked against a time budget.
+
+Every page is run once with Streamlit's AppTest in a fresh interpreter
+started with ``-X importtime``, so the time measured is what the first
+visitor after a restart waits for: the page's own imports plus its first
+run. Streamlit itself is imported before the clock starts, as the server
+has it loaded already. The store is created beforehand in a scratch data
+directory, as it would already exist on disk after a restart.
+
+Each page is also timed as the first page opened after the overview, once
+the overview's background warm-up has finished, which is the usual way in.
+
+Prints both times and each page's slowest imports, and exits with status 1
+when a cold run is over its budget in ``startup_budget.json``. Budgets are
+in seconds, set at about one and a half times the cold runs measured when
+they were last reviewed.
+
+    python benchmarks/startup.py [--top N] [page ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+PAGES = ["overview.py", "pages/01_Data_Ingestion.py", "pages/02_Submission_Triage.py", "pages/03_Dashboard.py"]
+
+MARKER = "--- page run starts ---"
+
+CHILD = f"""
+import json, sys, time
+sys.path.insert(0, {ROOT!r})
+from streamlit.testing.v1 import AppTest
+if sys.argv[2] == "after-overview":
+    AppTest.from_file({os.path.join(ROOT, "overview.py")!r}, default_timeout=300).run()
+    from core import warmup
+    warmup.start().join()
+print({MARKER!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+print(json.dumps({{"seconds": time.perf_counter() - started, "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _prepare_store(env):
+    subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); from core import store; store.get_connection()"],
+        env=env, check=True, capture_output=True,
+    )
+
+
+def profile_page(page, env, mode="cold"):
+    """First run of one page: ``(seconds, errors, [(module, seconds), ...] for its top-level imports)``.
+
+    ``mode`` is ``"cold"`` or ``"after-overview"``.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, os.path.join(ROOT, page), mode],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    run = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = []
+    lines = proc.stderr.split(MARKER, 1)[-1].splitlines()
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        # One leading space marks a module imported directly by the page or Streamlit
+        if match and len(match.group(3)) == 1:
+            imports.append((match.group(4), int(match.group(2)) / 1e6))
+    return run["seconds"], run["errors"], imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per page")
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+
+    over = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, HX_RENEW_DATA=data_dir, HX_RENEW_DB=os.path.join(data_dir, "submissions.db"))
+        _prepare_store(env)
+        for page in args.pages:
+            seconds, errors, imports = profile_page(page, env)
+            limit = budget.get(page)
+            status = "over budget" if limit is not None and seconds > limit else "ok"
+            print(f"{page}: {seconds:.2f}s cold (budget {limit}s) {status}")
+            if page != "overview.py":
+                warm_seconds, warm_errors, _ = profile_page(page, env, "after-overview")
+                print(f"  {warm_seconds:.2f}s after the overview")
+                errors += warm_errors
+            print(f"  imports: {sum(t for _, t in imports):.2f}s")
+            for module, t in sorted(imports, key=lambda item: -item[1])[:args.top]:
+                print(f"    {t:6.3f}s  {module}")
+            for error in errors:
+                print(f"  error: {error}")
+            if status != "ok" or errors:
+                over.append(page)
+
+    if over:
+        print(f"Over budget or failing: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
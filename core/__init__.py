@@ -0,0 +1 @@
+"""Shared data and processing layer for the hx Renew triage app pages."""
@@ -0,0 +1,81 @@
+"""Cached, lightweight Plotly figures.
+
+``figure_cache`` wraps a page's figure builder so the figure is built once
+per distinct input: the arguments, data frames included, are hashed into
+the cache key. A rerun with unchanged inputs gets back a figure whose JSON
+is byte-for-byte the same as last time, which Streamlit's message cache
+recognises, so the browser is sent a short reference instead of the full
+figure again.
+
+Built figures also pass through ``lighten``: scatter traces with many
+points switch to WebGL, and very long ones are downsampled to the minimum
+and maximum of each bucket, which keeps peaks and troughs visible.
+"""
+
+import functools
+
+import numpy as np
+import streamlit as st
+
+# Points in a scatter trace above which it is drawn with WebGL
+WEBGL_THRESHOLD = 5_000
+
+# Points a scatter trace is downsampled to; two are kept per bucket
+MAX_POINTS = 20_000
+
+FIGURE_CACHE_ENTRIES = 256
+
+
+def downsample_indices(y, max_points=MAX_POINTS):
+    """Sorted indices of the minimum and maximum ``y`` in each of ``max_points / 2`` buckets."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max_points // 2
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1)
+    keep = np.unique(np.concatenate([lows, highs]))
+    return keep[keep < n]
+
+
+def lighten(fig):
+    """Switch long scatter traces to WebGL and downsample the longest; other traces are left alone."""
+    traces, changed = [], False
+    for trace in fig.data:
+        points = len(trace.y) if trace.type in ("scatter", "scattergl") and trace.y is not None else 0
+        if points <= WEBGL_THRESHOLD:
+            traces.append(trace)
+            continue
+
+        data = trace.to_plotly_json()
+        data["type"] = "scattergl"
+        if points > MAX_POINTS:
+            keep = downsample_indices(data["y"])
+            for attr in ("x", "y", "text", "hovertext", "customdata"):
+                values = data.get(attr)
+                if values is not None and not isinstance(values, str) and len(values) == points:
+                    data[attr] = np.asarray(values)[keep]
+        traces.append(data)
+        changed = True
+    if not changed:
+        return fig
+    import plotly.graph_objects as go
+
+    return go.Figure(data=traces, layout=fig.layout)
+
+
+def figure_cache(builder):
+    """Decorator caching a figure builder on a hash of its arguments."""
+
+    @st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+    @functools.wraps(builder)
+    def build(*args, **kwargs):
+        return lighten(builder(*args, **kwargs))
+
+    return build
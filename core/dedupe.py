@@ -0,0 +1,242 @@
+"""Duplicate detection for incoming submissions.
+
+Client names are normalised and shingled into character trigrams, then
+summarised as MinHash signatures. Signatures are split into LSH bands and
+each band is bucketed together with the line of business, so a lookup only
+ever touches submissions in the same LOB whose names share a band. Those few
+candidates are verified with the exact trigram Jaccard similarity; a match
+from the same broker needs a lower score than a cross-broker one, because a
+broker resubmitting a risk rarely spells the client name differently twice.
+
+The index is built once per process from the store, in the background
+warm-up or else by the first duplicate-check job, and then topped up with
+rows added since the last lookup, so checks cost milliseconds regardless of
+how many historical submissions there are. The index holds only what
+matching needs; the status and receipt time of a match are read by primary
+key when it is found, so a match shows the submission as it stands.
+"""
+
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import streamlit as st
+
+from core import store
+from core.text import normalize_name
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+# Minimum trigram similarity for a submission to count as a duplicate
+SAME_BROKER_THRESHOLD = 0.6
+CROSS_BROKER_THRESHOLD = 0.8
+
+# Multiply-shift hash family: odd 64-bit multipliers, wrapping arithmetic
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 62, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.randint(1, 1 << 62, size=ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.randint(1, 1 << 62, size=BANDS, dtype=np.uint64)
+_LOB_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# Rows added one at a time sit in a small dict until there are this many,
+# then get merged into the sorted bucket arrays
+MERGE_THRESHOLD = 5000
+
+
+def shingles(name):
+    padded = f"  {normalize_name(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _hash_grams(grams):
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def _permute(hashes):
+    with np.errstate(over="ignore"):
+        return (np.outer(hashes, _PERM_A) + _PERM_B) >> np.uint64(32)
+
+
+def minhash(grams):
+    return _permute(_hash_grams(grams)).min(axis=0)
+
+
+def minhash_many(gram_sets, chunk_size=2000):
+    """MinHash signatures for many non-empty shingle sets, one row per set."""
+    signatures = np.empty((len(gram_sets), NUM_PERM), dtype=np.uint64)
+    for start in range(0, len(gram_sets), chunk_size):
+        chunk = gram_sets[start:start + chunk_size]
+        hashes = np.concatenate([_hash_grams(g) for g in chunk])
+        offsets = np.cumsum([0] + [len(g) for g in chunk[:-1]])
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(_permute(hashes), offsets, axis=0)
+    return signatures
+
+
+def band_keys(signatures, lobs):
+    """One LSH bucket key per band per signature, salted with band number and LOB."""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS_PER_BAND)
+    lob_salt = np.array([zlib.crc32(lob.encode()) for lob in lobs], dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        keys = (bands * _BAND_MIX).sum(axis=2)
+        keys += _BAND_SALT
+        keys += (lob_salt * _LOB_MIX)[:, np.newaxis]
+    return keys
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@dataclass
+class Match:
+    id: str
+    client: str
+    broker: str
+    lob: str
+    received: datetime
+    status: str
+    score: float
+
+
+class DuplicateIndex:
+    """MinHash LSH index over historical submissions, blocked by line of business.
+
+    Bucket keys live in a sorted array searched with ``searchsorted``; recent
+    additions go to a small dict that is folded into the array in bulk.
+    Lookups and additions share one lock, so a lookup never sees the bucket
+    arrays half way through a merge.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._postings = np.empty(0, dtype=np.int64)
+        self._recent = {}
+        self._recent_keys = []
+        self._records = []
+        self._grams = []
+        self._last_rowid = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        with self._lock:
+            self._add_many(records)
+
+    def _add_many(self, records):
+        grams = [shingles(r["client"]) for r in records]
+        keep = [i for i, g in enumerate(grams) if g]
+        if not keep:
+            return
+        keys = band_keys(
+            minhash_many([grams[i] for i in keep]),
+            [records[i]["lob"] for i in keep],
+        )
+        first = len(self._records)
+        for i in keep:
+            self._records.append(records[i])
+            self._grams.append(grams[i])
+        positions = np.repeat(np.arange(first, len(self._records)), BANDS)
+
+        if len(keep) + len(self._recent_keys) >= MERGE_THRESHOLD:
+            self._merge(keys.ravel(), positions)
+        else:
+            for key, pos in zip(keys.ravel().tolist(), positions.tolist()):
+                self._recent.setdefault(key, []).append(pos)
+                self._recent_keys.append((key, pos))
+
+    def _merge(self, keys, positions):
+        if self._recent_keys:
+            recent = np.array(self._recent_keys, dtype=np.uint64)
+            keys = np.concatenate([keys, recent[:, 0]])
+            positions = np.concatenate([positions, recent[:, 1].astype(np.int64)])
+            self._recent, self._recent_keys = {}, []
+        keys = np.concatenate([self._keys, keys])
+        positions = np.concatenate([self._postings, positions])
+        order = np.argsort(keys, kind="stable")
+        self._keys, self._postings = keys[order], positions[order]
+
+    def refresh(self):
+        """Index submissions added to the store since the last refresh."""
+        with self._lock:
+            rows = store.get_connection().execute(
+                "SELECT rowid, id, client, broker, lob FROM submissions WHERE rowid > ? ORDER BY rowid",
+                (self._last_rowid,),
+            ).fetchall()
+            if rows:
+                self._add_many([
+                    {"id": sub_id, "client": client, "broker": broker, "lob": lob}
+                    for _, sub_id, client, broker, lob in rows
+                ])
+                self._last_rowid = rows[-1][0]
+
+    def candidates(self, client, lob):
+        with self._lock:
+            return self._candidates(client, lob)
+
+    def _candidates(self, client, lob):
+        grams = shingles(client)
+        if not grams:
+            return grams, set()
+        keys = band_keys(minhash(grams)[np.newaxis], [lob])[0]
+        lo = np.searchsorted(self._keys, keys, side="left")
+        hi = np.searchsorted(self._keys, keys, side="right")
+        found = set()
+        for start, stop in zip(lo.tolist(), hi.tolist()):
+            found.update(self._postings[start:stop].tolist())
+        for key in keys.tolist():
+            found.update(self._recent.get(key, ()))
+        return grams, found
+
+    def find(self, submission_id, client, broker, lob):
+        """Best existing match for a submission, or ``None`` if it looks unique."""
+        best, best_score = None, 0.0
+        with self._lock:
+            grams, found = self._candidates(client, lob)
+            for pos in found:
+                record = self._records[pos]
+                if record["id"] == submission_id:
+                    continue
+                score = jaccard(grams, self._grams[pos])
+                threshold = SAME_BROKER_THRESHOLD if record["broker"] == broker else CROSS_BROKER_THRESHOLD
+                if score >= threshold and score > best_score:
+                    best, best_score = record, score
+        if best is None:
+            return None
+        received, status = store.get_connection().execute(
+            "SELECT received, status FROM submissions WHERE id = ?", (best["id"],)
+        ).fetchone()
+        return Match(received=datetime.fromisoformat(received), status=status, score=best_score, **best)
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_index(db_path):
+    return DuplicateIndex()
+
+
+def get_index():
+    """The process-wide index, topped up with submissions added since its last use."""
+    index = _shared_index(store.DB_PATH)
+    index.refresh()
+    return index
+
+
+def check_submission(submission):
+    """Job worker: duplicate check for one submission dict, returned JSON-ready.
+
+    The index is built or topped up here rather than on the page, so the
+    first check after a restart waits for the build, not the click.
+    """
+    match = get_index().find(submission["id"], submission["client"], submission["broker"], submission["type"])
+    if match is not None:
+        match = dict(vars(match), received=match.received.isoformat())
+    return {"submission": submission, "match": match}
@@ -0,0 +1,83 @@
+"""Dashboard data exports, built by background workers.
+
+``export_excel`` streams the filtered submission history from Parquet
+batches into an XLSX workbook written by XlsxWriter in constant-memory
+mode, which flushes each row to disk once the next one starts and writes
+strings inline instead of collecting a shared-string table. Memory stays
+flat whatever the number of rows, and because exports run on the job
+queue's process pool they never hold up other sessions' script threads.
+"""
+
+import os
+import time
+import uuid
+
+from core import history, store
+
+EXPORT_DIR = os.path.join(store.DATA_DIR, "exports")
+
+# Finished exports are deleted after this many seconds
+EXPORT_TTL = 24 * 60 * 60
+
+EXPORT_COLUMNS = [
+    "id", "client", "broker", "lob", "status", "source", "received", "deadline",
+    "estimated_premium", "risk_appetite", "ai_recommendation", "confidence",
+]
+
+# Rows decoded from Parquet at a time
+EXPORT_BATCH_ROWS = 4096
+
+# Excel's row limit, less the header; larger exports continue on another sheet
+MAX_SHEET_ROWS = 1_048_575
+
+
+def new_export_path(extension):
+    """Fresh file path for an export, clearing out expired ones first."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cutoff = time.time() - EXPORT_TTL
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    return os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}{extension}")
+
+
+def _submission_rows(since, lobs):
+    for batch in history.iter_batches(since=since, lobs=lobs, columns=EXPORT_COLUMNS, batch_rows=EXPORT_BATCH_ROWS):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def export_excel(spec):
+    """Job worker: write submissions and daily rollups to ``spec["path"]``.
+
+    ``spec`` also holds the dashboard filters, ``since`` and ``lobs``.
+    Returns the path and the number of rows on each sheet.
+    """
+    import xlsxwriter
+
+    since, lobs, path = spec["since"], spec["lobs"], spec["path"]
+    tmp = f"{path}.part"
+    workbook = xlsxwriter.Workbook(tmp, {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm"})
+
+    sheet, submissions = None, 0
+    for row in _submission_rows(since, lobs):
+        line = submissions % MAX_SHEET_ROWS + 1
+        if line == 1:
+            part = submissions // MAX_SHEET_ROWS + 1
+            sheet = workbook.add_worksheet("Submissions" if part == 1 else f"Submissions ({part})")
+            sheet.write_row(0, 0, EXPORT_COLUMNS)
+        sheet.write_row(line, 0, row)
+        submissions += 1
+    if sheet is None:
+        workbook.add_worksheet("Submissions").write_row(0, 0, EXPORT_COLUMNS)
+
+    rollups = store.query_rollups(since=since, lobs=lobs)
+    rollups["day"] = rollups["day"].dt.date
+    sheet = workbook.add_worksheet("Daily Rollups")
+    sheet.write_row(0, 0, list(rollups.columns))
+    for line, row in enumerate(rollups.itertuples(index=False), start=1):
+        sheet.write_row(line, 0, list(row))
+
+    workbook.close()
+    os.replace(tmp, path)
+    return {"path": path, "submissions": submissions, "rollups": len(rollups)}
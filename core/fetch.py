@@ -0,0 +1,244 @@
+"""Incremental inbox fetch from pluggable submission sources.
+
+Each source keeps a high-watermark in the ``fetch_watermarks`` table and only
+returns items newer than it. All configured sources are fetched concurrently
+with asyncio; HTTP sources share one pooled ``urllib3`` manager, so repeat
+fetches reuse open keep-alive connections instead of reconnecting.
+
+Sources are configured in ``sources.json`` in the data directory (or the
+file named by ``HX_RENEW_SOURCES``), for example::
+
+    [
+        {"type": "drop_folder", "name": "email", "label": "Email", "path": "data/inbox"},
+        {"type": "portal", "name": "portal", "label": "Broker Portal", "url": "http://127.0.0.1:8765"}
+    ]
+
+Without a config file a single drop folder at ``data/inbox`` is used.
+
+Bad input is handled item by item: a malformed item is logged and skipped,
+and a drop-folder file that cannot be read is moved to a ``quarantine``
+folder beside it. The rest of the batch is added and the watermark moves
+past the bad items, so one of them cannot hold a source back.
+"""
+
+import asyncio
+import email
+import email.policy
+import json
+import logging
+import os
+from datetime import datetime
+
+import urllib3
+
+from core import store
+
+SOURCES_PATH = os.environ.get("HX_RENEW_SOURCES", os.path.join(store.DATA_DIR, "sources.json"))
+
+# Per-source time limit, so one slow source cannot hold up the others
+FETCH_TIMEOUT = 5.0
+
+# Folder inside a drop folder that files which cannot be read are moved to
+QUARANTINE_DIR = "quarantine"
+
+# Fields an item must carry for the submission to be stored
+REQUIRED_FIELDS = ("id", "client", "broker", "lob")
+
+logger = logging.getLogger(__name__)
+
+_http = urllib3.PoolManager(
+    num_pools=8,
+    maxsize=4,
+    timeout=urllib3.Timeout(connect=1.0, read=FETCH_TIMEOUT),
+    retries=urllib3.Retry(total=2, backoff_factor=0.2),
+)
+
+
+def _submission(item, label):
+    missing = [f for f in REQUIRED_FIELDS if not item.get(f)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    received = item.get("received") or datetime.now().isoformat(sep=" ", timespec="seconds")
+    return {
+        "id": item["id"],
+        "client": item["client"],
+        "broker": item["broker"],
+        "lob": item["lob"],
+        "status": store.INBOX_STATUS,
+        "source": item.get("source", label),
+        "received": datetime.fromisoformat(received).isoformat(sep=" ", timespec="seconds"),
+        "notes": item.get("notes"),
+    }
+
+
+class DropFolderSource:
+    """A local folder (or the ``new`` folder of a maildir) that submissions are dropped into.
+
+    ``.json`` files hold one submission or a list of them; ``.eml`` and
+    maildir messages carry the fields in ``X-Submission-*`` headers. The
+    watermark is the newest modification time seen, with the file name as
+    a tie-breaker.
+    """
+
+    def __init__(self, name, path, label="Email"):
+        self.name = name
+        self.label = label
+        self.path = path
+
+    def _read(self, path):
+        if path.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else [data]
+
+        with open(path, "rb") as f:
+            message = email.message_from_binary_file(f, policy=email.policy.default)
+        item = {
+            "id": message["X-Submission-Id"],
+            "client": message["X-Submission-Client"] or message["Subject"],
+            "broker": message["X-Submission-Broker"],
+            "lob": message["X-Submission-LOB"],
+        }
+        if message["Date"] is not None:
+            item["received"] = message["Date"].datetime.astimezone().replace(tzinfo=None).isoformat()
+        return [item]
+
+    def _scan(self, watermark):
+        folder = os.path.join(self.path, "new") if os.path.isdir(os.path.join(self.path, "new")) else self.path
+        if not os.path.isdir(folder):
+            return [], watermark, []
+
+        after = (0, "")
+        if watermark:
+            mtime, name = watermark.split("|", 1)
+            after = (int(mtime), name)
+
+        fresh = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                key = (entry.stat().st_mtime_ns, entry.name)
+                if key > after:
+                    fresh.append((key, entry.path))
+
+        fresh.sort()
+        items, skipped = [], []
+        for _, path in fresh:
+            try:
+                items.extend(self._read(path))
+            except Exception as error:
+                skipped.append(f"{os.path.basename(path)}: {type(error).__name__}: {error}")
+                self._quarantine(path)
+        if fresh:
+            newest = fresh[-1][0]
+            watermark = f"{newest[0]}|{newest[1]}"
+        return items, watermark, skipped
+
+    def _quarantine(self, path):
+        # Scans skip folders, so the quarantine is never read back
+        target = os.path.join(self.path, QUARANTINE_DIR)
+        try:
+            os.makedirs(target, exist_ok=True)
+            os.replace(path, os.path.join(target, os.path.basename(path)))
+        except OSError:
+            # Left where it is; the watermark is past it, so it is not read again
+            pass
+
+    async def fetch(self, watermark):
+        return await asyncio.to_thread(self._scan, watermark)
+
+
+class PortalSource:
+    """Broker portal API returning ``{"items": [...], "cursor": "..."}`` for ``GET /submissions?since=``."""
+
+    def __init__(self, name, url, label="Broker Portal"):
+        self.name = name
+        self.label = label
+        self.url = url.rstrip("/")
+
+    def _get(self, watermark):
+        response = _http.request("GET", f"{self.url}/submissions", fields={"since": watermark or ""})
+        if response.status != 200:
+            raise RuntimeError(f"{self.name}: HTTP {response.status}")
+        payload = response.json()
+        return payload["items"], payload.get("cursor") or watermark, []
+
+    async def fetch(self, watermark):
+        return await asyncio.to_thread(self._get, watermark)
+
+
+SOURCE_TYPES = {
+    "drop_folder": DropFolderSource,
+    "portal": PortalSource,
+}
+
+
+def configured_sources():
+    """Source configs from the sources file, or the default drop folder."""
+    if os.path.exists(SOURCES_PATH):
+        with open(SOURCES_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    return [{"type": "drop_folder", "name": "inbox", "path": os.path.join(store.DATA_DIR, "inbox")}]
+
+
+def _build(config):
+    config = dict(config)
+    return SOURCE_TYPES[config.pop("type")](**config)
+
+
+def _watermarks():
+    return dict(store.get_connection().execute("SELECT source, watermark FROM fetch_watermarks"))
+
+
+async def _fetch_one(source, watermark):
+    try:
+        items, new_watermark, skipped = await asyncio.wait_for(source.fetch(watermark), FETCH_TIMEOUT)
+        return source, items, new_watermark, skipped, None
+    except Exception as error:
+        return source, [], watermark, [], f"{type(error).__name__}: {error}"
+
+
+async def _fetch_all(sources):
+    watermarks = _watermarks()
+    return await asyncio.gather(*(_fetch_one(s, watermarks.get(s.name)) for s in sources))
+
+
+def _item_id(item):
+    return item.get("id") if isinstance(item, dict) else None
+
+
+def fetch_new(configs=None):
+    """Fetch every source concurrently and add new items to the inbox.
+
+    Items and the advanced watermark are committed together per source, so
+    a failed fetch is simply retried from the old watermark next time.
+    Malformed items are skipped rather than failing the batch. Returns
+    ``{source name: {"added": n, "skipped": [message, ...], "error": message or None}}``.
+    """
+    sources = [_build(c) for c in (configs if configs is not None else configured_sources())]
+    outcomes = asyncio.run(_fetch_all(sources))
+
+    conn = store.get_connection()
+    report = {}
+    now = datetime.now().isoformat(sep=" ", timespec="seconds")
+    for source, items, watermark, skipped, error in outcomes:
+        added = 0
+        if error is None:
+            rows = []
+            for item in items:
+                try:
+                    rows.append(_submission(item, source.label))
+                except (AttributeError, KeyError, TypeError, ValueError) as bad:
+                    skipped.append(f"item {_item_id(item) or '(no id)'}: {type(bad).__name__}: {bad}")
+            with conn:
+                added = store.insert_submissions(conn, rows)
+                if watermark is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO fetch_watermarks (source, watermark, fetched_at) VALUES (?, ?, ?)",
+                        (source.name, watermark, now),
+                    )
+        for message in skipped:
+            logger.warning("Skipped from %s: %s", source.name, message)
+        report[source.name] = {"added": added, "skipped": skipped, "error": error}
+    return report
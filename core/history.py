@@ -0,0 +1,176 @@
+"""Columnar submission history in month-partitioned Parquet.
+
+Submissions are mirrored into ``data/history/month=YYYY-MM/part-0.parquet``,
+one file per month of receipt, sorted by LOB so row-group statistics narrow
+LOB filters as well. Reads go through a memory-mapped Arrow dataset: the
+date range prunes whole partitions, the LOB filter prunes row groups, and
+only the requested columns are decoded, so years of history load in a
+fraction of a second without holding the rest in memory.
+
+``sync`` keeps the mirror current. Triggers in the store note each month
+whose rows are inserted, deleted or updated in any mirrored column
+(scoring included), and a sync rewrites only those partitions. Pages call
+``sync_in_background``, which runs it on a background thread and returns
+at once; readers keep seeing the last synced partitions until it is done.
+"""
+
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from core import store
+
+HISTORY_DIR = os.path.join(store.DATA_DIR, "history")
+
+# Rows per Parquet row group; smaller groups prune more finely
+ROW_GROUP_ROWS = 16_384
+
+# Columns stored in each file; the month comes from the partition directory
+FILE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("client", pa.string()),
+    ("broker", pa.string()),
+    ("lob", pa.string()),
+    ("status", pa.string()),
+    ("source", pa.string()),
+    ("received", pa.timestamp("s")),
+    ("deadline", pa.timestamp("s")),
+    ("estimated_premium", pa.int64()),
+    ("risk_appetite", pa.int64()),
+    ("ai_recommendation", pa.string()),
+    ("confidence", pa.int64()),
+])
+COLUMNS = FILE_SCHEMA.names
+
+SCHEMA = FILE_SCHEMA.append(pa.field("month", pa.string()))
+
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+_sync_lock = threading.Lock()
+
+
+def _partition_path(month):
+    return os.path.join(HISTORY_DIR, f"month={month}", "part-0.parquet")
+
+
+def _write_month(month):
+    start = pd.Period(month, freq="M")
+    df = pd.read_sql_query(
+        f"""
+        SELECT {', '.join(COLUMNS)}
+        FROM submissions WHERE received >= ? AND received < ?
+        ORDER BY lob, received
+        """,
+        store.get_connection(),
+        params=[str(start.start_time.date()), str((start + 1).start_time.date())],
+        parse_dates=["received", "deadline"],
+    )
+    path = _partition_path(month)
+    if df.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    table = pa.Table.from_pandas(df, schema=FILE_SCHEMA, preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write beside the partition and swap it in, so readers never see a half-written file
+    tmp = os.path.join(os.path.dirname(path), ".part-0.parquet.tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS, compression="zstd")
+    os.replace(tmp, path)
+
+
+def sync():
+    """Rewrite the partitions for months whose rows changed; returns how many were written."""
+    with _sync_lock:
+        conn = store.get_connection()
+        changes = conn.execute("SELECT month, version FROM history_changes").fetchall()
+        if not changes:
+            return 0
+
+        for month, _ in changes:
+            _write_month(month)
+        with conn:
+            # A month changed again while it was being written keeps its newer version and stays pending
+            conn.executemany("DELETE FROM history_changes WHERE month = ? AND version = ?", changes)
+            store.bump_meta(conn, "history_version")
+        return len(changes)
+
+
+def _sync_quietly():
+    try:
+        sync()
+    except Exception:
+        # Months not written stay pending, so the next request retries them
+        pass
+
+
+def sync_in_background():
+    """Start a ``sync`` on a background thread if any month is pending and none is running.
+
+    Returns whether one was started. The sync bumps ``history_version``
+    when it finishes, which is what readers key their snapshots on.
+    """
+    if _sync_lock.locked():
+        return False
+    if store.get_connection().execute("SELECT 1 FROM history_changes LIMIT 1").fetchone() is None:
+        return False
+    threading.Thread(target=_sync_quietly, name="history-sync", daemon=True).start()
+    return True
+
+
+def _dataset():
+    return ds.dataset(
+        HISTORY_DIR,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _filter(since, until, lobs):
+    received, month = ds.field("received"), ds.field("month")
+    clauses = []
+    if since is not None:
+        since = pd.Timestamp(since)
+        clauses += [month >= since.strftime("%Y-%m"), received >= pa.scalar(since.to_pydatetime(), pa.timestamp("s"))]
+    if until is not None:
+        until = pd.Timestamp(until)
+        clauses += [month <= until.strftime("%Y-%m"), received < pa.scalar(until.to_pydatetime(), pa.timestamp("s"))]
+    if lobs:
+        clauses.append(ds.field("lob").isin(list(lobs)))
+    condition = None
+    for clause in clauses:
+        condition = clause if condition is None else condition & clause
+    return condition
+
+
+def load(since=None, until=None, lobs=(), columns=None):
+    """Historical submissions received in ``[since, until)`` for the given LOBs.
+
+    Filters are pushed down to the Parquet scan, and ``columns`` limits what
+    is decoded.
+    """
+    columns = list(columns) if columns else COLUMNS
+    if not os.path.isdir(HISTORY_DIR):
+        return pd.DataFrame(columns=columns)
+    return _dataset().to_table(columns=columns, filter=_filter(since, until, lobs)).to_pandas()
+
+
+def iter_batches(since=None, until=None, lobs=(), columns=None, batch_rows=ROW_GROUP_ROWS):
+    """Like ``load``, but yields Arrow record batches so callers can stream any amount of history."""
+    if not os.path.isdir(HISTORY_DIR):
+        return
+    yield from _dataset().to_batches(
+        columns=list(columns) if columns else COLUMNS,
+        filter=_filter(since, until, lobs),
+        batch_size=batch_rows,
+        # Read one batch ahead at a time so memory does not grow with the scan
+        batch_readahead=1,
+        fragment_readahead=1,
+    )
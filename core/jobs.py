@@ -0,0 +1,166 @@
+"""Background job queue for submission and document processing.
+
+A job is a batch of items run through one worker function. ``submit``
+returns a job ID straight away; items run on a shared thread pool, or on a
+process pool for CPU-heavy work such as parsing spreadsheets, and every
+finished item is written to the ``job_results`` table as it completes.
+Pages poll progress with ``show_progress``, which refreshes only a small
+fragment, so the underwriter can keep working while a batch runs.
+
+Job state lives in the store, so results survive reruns and browser
+reconnects. Jobs still running when the process stopped are marked
+"interrupted" on the next start.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+
+from core import store
+
+POLL_INTERVAL = "1s"
+
+UPLOAD_DIR = os.path.join(store.DATA_DIR, "uploads")
+
+
+def _now():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+class JobQueue:
+    """Thread and process pools whose job progress is recorded in the store."""
+
+    def __init__(self, max_threads=None, max_processes=None):
+        self._threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="job")
+        self._max_processes = max_processes or os.cpu_count()
+        self._processes = None
+        self._lock = threading.Lock()
+
+        conn = store.get_connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE status = 'running'",
+                (_now(),),
+            )
+
+    def _process_pool(self):
+        with self._lock:
+            if self._processes is None:
+                # Forking a multi-threaded Streamlit server is unsafe, so spawn workers
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self._max_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+
+    def submit(self, kind, func, items, processes=False):
+        """Queue ``func(item)`` for every item and return the new job's ID."""
+        items = list(items)
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        conn = store.get_connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (id, kind, status, total, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, kind, "running" if items else "done", len(items), now, now),
+            )
+
+        executor = self._process_pool() if processes else self._threads
+        for seq, item in enumerate(items):
+            future = executor.submit(func, item)
+            future.add_done_callback(lambda f, seq=seq: self._item_done(job_id, seq, f))
+        return job_id
+
+    def _item_done(self, job_id, seq, future):
+        error = future.exception()
+        result = None if error else json.dumps(future.result(), default=str)
+        conn = store.get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO job_results (job_id, seq, result, error) VALUES (?, ?, ?, ?)",
+                (job_id, seq, result, None if error is None else f"{type(error).__name__}: {error}"),
+            )
+            conn.execute(
+                """
+                UPDATE jobs SET
+                    completed = completed + ?,
+                    failed = failed + ?,
+                    status = CASE WHEN completed + failed + 1 >= total THEN 'done' ELSE status END,
+                    updated_at = ?
+                WHERE id = ?
+                """,
+                (int(error is None), int(error is not None), _now(), job_id),
+            )
+
+
+@st.cache_resource(show_spinner=False)
+def get_queue():
+    """The process-wide job queue shared by every session."""
+    return JobQueue()
+
+
+def get_job(job_id):
+    row = store.get_connection().execute(
+        "SELECT id, kind, status, total, completed, failed, created_at, updated_at FROM jobs WHERE id = ?",
+        (job_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    keys = ["id", "kind", "status", "total", "completed", "failed", "created_at", "updated_at"]
+    return dict(zip(keys, row))
+
+
+def job_results(job_id):
+    """Finished items in submission order; failed items carry an ``error``."""
+    rows = store.get_connection().execute(
+        "SELECT seq, result, error FROM job_results WHERE job_id = ? ORDER BY seq",
+        (job_id,),
+    ).fetchall()
+    return [
+        {"seq": seq, "result": json.loads(result) if result else None, "error": error}
+        for seq, result, error in rows
+    ]
+
+
+def spool_upload(uploaded):
+    """Copy an uploaded file to disk so a worker process can stream it."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{os.path.splitext(uploaded.name)[1]}")
+    uploaded.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(uploaded, out, length=1 << 20)
+    return uploaded.name, path
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _poll(job_id, label):
+    job = get_job(job_id)
+    if job["status"] != "running":
+        # Finished: rerun the whole page so the results render
+        st.rerun()
+    done = job["completed"] + job["failed"]
+    st.progress(done / job["total"], text=f"{label} ({done}/{job['total']})")
+
+
+def show_progress(job_id, label):
+    """Show a self-refreshing progress bar; returns True once the job has finished."""
+    job = get_job(job_id)
+    if job is None:
+        return False
+    if job["status"] == "running":
+        _poll(job_id, label)
+        return False
+    if job["status"] == "interrupted":
+        st.warning("Processing was interrupted by a restart. Please run it again.")
+        return False
+    return True
@@ -0,0 +1,65 @@
+"""Dashboard KPIs from running event counters.
+
+Every submission lifecycle event (received, triaged, accepted, declined,
+backlogged) is recorded by triggers in the store and adds to a counter row
+for its month, LOB and event type. Each event therefore costs one upsert,
+and the KPIs for any period are a few sums over a handful of counter rows,
+however many submissions lie behind them.
+"""
+
+import pandas as pd
+
+from core import store
+
+TRIAGE_OUTCOMES = ("accepted", "declined", "backlogged")
+
+
+def _window(counters, start, end):
+    months = counters["month"]
+    return counters[(months >= start.strftime("%Y-%m")) & (months < end.strftime("%Y-%m"))]
+
+
+def _kpis(counters):
+    totals = counters.groupby("event")[["count", "total"]].sum()
+    totals = totals.reindex(["received", *TRIAGE_OUTCOMES], fill_value=0)
+    received = totals.at["received", "count"]
+    outcomes = totals.loc[list(TRIAGE_OUTCOMES)]
+    triaged = outcomes["count"].sum()
+    processed = totals.at["accepted", "count"] + totals.at["declined", "count"]
+    return {
+        "submissions": int(received),
+        "triage_time": outcomes["total"].sum() / triaged if triaged else None,
+        "quality_score": 10 * totals.at["received", "total"] / (store.COMPLETENESS_FIELDS * received) if received else None,
+        "processing_rate": processed / received if received else None,
+    }
+
+
+def _change(current, previous):
+    if current is None or not previous:
+        return None
+    return (current - previous) / previous
+
+
+def kpi_summary(since, comparison="vs Previous Period", lobs=()):
+    """KPI values for the months from ``since`` to now, each with its change on the comparison period.
+
+    Returns ``{kpi: {"value": ..., "trend": ...}}``; either may be ``None``
+    when there is nothing to measure or compare against.
+    """
+    start = pd.Timestamp(since).to_period("M")
+    end = pd.Timestamp.now().to_period("M") + 1
+    if comparison == "vs Previous Period":
+        offset = end.ordinal - start.ordinal
+    elif comparison == "vs Same Period Last Year":
+        offset = 12
+    else:
+        # No targets are recorded yet, so there is nothing to compare with
+        offset = 0
+
+    counters = store.query_kpi_counters(since=(start - offset).to_timestamp(), lobs=lobs)
+    current = _kpis(_window(counters, start.to_timestamp(), end.to_timestamp()))
+    if offset:
+        previous = _kpis(_window(counters, (start - offset).to_timestamp(), (end - offset).to_timestamp()))
+    else:
+        previous = {}
+    return {name: {"value": value, "trend": _change(value, previous.get(name))} for name, value in current.items()}
@@ -0,0 +1,67 @@
+"""Server-side pagination controls for the card lists.
+
+Only the rows of the current page are rendered, so the number of widgets
+and the websocket payload stay constant however long a queue gets.
+"""
+
+import math
+
+import streamlit as st
+
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+
+
+def paginate(total, key, reset_on=None):
+    """Render page controls for ``total`` rows and return ``(offset, limit)``.
+
+    ``reset_on`` is any hashable describing the active filters; the view
+    jumps back to the first page whenever it changes.
+    """
+    page_key = f"{key}_page"
+    filters_key = f"{key}_filters"
+    size_key = f"{key}_page_size"
+
+    if st.session_state.get(filters_key) != reset_on:
+        st.session_state[filters_key] = reset_on
+        st.session_state[page_key] = 0
+
+    page_size = st.session_state.get(size_key, DEFAULT_PAGE_SIZE)
+    pages = max(1, math.ceil(total / page_size))
+
+    # Clamp the page in case rows were removed since the last rerun
+    page = min(st.session_state.get(page_key, 0), pages - 1)
+    st.session_state[page_key] = page
+
+    def _move(step):
+        st.session_state[page_key] += step
+
+    col1, col2, col3, col4 = st.columns([1, 1, 4, 1.5])
+    with col1:
+        st.button("◀ Prev", key=f"{key}_prev", disabled=page == 0,
+                  on_click=_move, args=(-1,), use_container_width=True)
+    with col2:
+        st.button("Next ▶", key=f"{key}_next", disabled=page >= pages - 1,
+                  on_click=_move, args=(1,), use_container_width=True)
+    with col4:
+        st.selectbox(
+            "Rows per page",
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(page_size),
+            key=size_key,
+            label_visibility="collapsed",
+            on_change=lambda: st.session_state.update({page_key: 0}),
+        )
+
+    offset = page * page_size
+    with col3:
+        if total:
+            st.markdown(
+                f'<span style="color:#666;">Page {page + 1} of {pages} · '
+                f'showing {offset + 1}–{min(offset + page_size, total)} of {total}</span>',
+                unsafe_allow_html=True
+            )
+        else:
+            st.markdown('<span style="color:#666;">No submissions</span>', unsafe_allow_html=True)
+
+    return offset, page_size
@@ -0,0 +1,241 @@
+"""Streaming parsers for uploaded submission files.
+
+Every parser yields bounded chunks instead of loading a whole file: CSVs are
+read ``CHUNK_ROWS`` rows at a time, Excel sheets are walked row by row with
+openpyxl in read-only mode, and ZIP archives are opened member by member
+straight from the upload without extracting anything to memory or disk.
+Peak memory therefore depends on the chunk size, not on the upload size.
+
+Names are screened against the sanctions list as the chunks go by, so
+every distinct insured name in a table is checked however large it is.
+PDFs have their text extracted page by page with pypdf and scanned for
+listed names.
+"""
+
+import os
+import zipfile
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+
+# Zipped bundles sometimes contain further zips; stop descending after this
+MAX_ZIP_DEPTH = 2
+
+# Columns holding insured or client names, which are screened against the
+# sanctions list
+NAME_HEADERS = {"client", "client name", "insured", "insured name", "named insured", "company name"}
+
+
+@dataclass
+class TableSummary:
+    source: str
+    sheet: str = None
+    rows: int = 0
+    columns: list = field(default_factory=list)
+    preview: pd.DataFrame = None
+    # Distinct names screened in a table, or pages of text scanned in a document
+    names_screened: int = 0
+    pages: int = 0
+    hits: list = field(default_factory=list)
+
+    @property
+    def is_document(self):
+        # Non-tabular files (PDFs and the like) are listed but not parsed
+        return not self.columns
+
+    @property
+    def screened(self):
+        # Tables are always screened; documents only when text could be read from them
+        return not self.is_document or self.pages > 0
+
+    def to_dict(self):
+        data = asdict(self)
+        if self.preview is not None:
+            data["preview"] = self.preview.astype(str).to_dict("records")
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        from core.sanctions import Entry, Hit
+
+        preview = pd.DataFrame(data["preview"], columns=data["columns"]) if data["preview"] is not None else None
+        hits = [Hit(**dict(hit, entry=Entry(**hit["entry"]))) for hit in data["hits"]]
+        return cls(**dict(data, preview=preview, hits=hits))
+
+
+def _extension(name):
+    return os.path.splitext(name)[1].lower()
+
+
+def _header(values):
+    # Blank or repeated header cells still need unique column names
+    names, seen = [], set()
+    for i, value in enumerate(values):
+        name = str(value).strip() if value not in (None, "") else f"Unnamed: {i}"
+        while name in seen:
+            name += "_"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _rows_to_chunks(rows, chunk_rows):
+    # Turn an iterator of row tuples (first non-empty one is the header) into DataFrames
+    header = None
+    buffer = []
+    for row in rows:
+        if header is None:
+            if any(v not in (None, "") for v in row):
+                header = _header(row)
+            continue
+        if not any(v not in (None, "") for v in row):
+            continue
+        buffer.append(row[:len(header)])
+        if len(buffer) >= chunk_rows:
+            yield pd.DataFrame.from_records(buffer, columns=header)
+            buffer = []
+    if buffer:
+        yield pd.DataFrame.from_records(buffer, columns=header)
+
+
+def _iter_csv(source, fileobj, chunk_rows):
+    reader = pd.read_csv(
+        fileobj,
+        chunksize=chunk_rows,
+        encoding_errors="replace",
+        skip_blank_lines=True,
+        low_memory=True,
+    )
+    with reader:
+        for chunk in reader:
+            yield source, None, chunk
+
+
+def _iter_xlsx(source, fileobj, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for chunk in _rows_to_chunks(sheet.iter_rows(values_only=True), chunk_rows):
+                yield source, sheet.title, chunk
+    finally:
+        workbook.close()
+
+
+def _iter_xls(source, fileobj, chunk_rows):
+    import xlrd
+
+    # Legacy .xls is capped at 65,536 rows per sheet; sheets are loaded on demand
+    workbook = xlrd.open_workbook(file_contents=fileobj.read(), on_demand=True)
+    try:
+        for index in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(index)
+            rows = (tuple(sheet.row_values(r)) for r in range(sheet.nrows))
+            for chunk in _rows_to_chunks(rows, chunk_rows):
+                yield source, sheet.name, chunk
+            workbook.unload_sheet(index)
+    finally:
+        workbook.release_resources()
+
+
+def _iter_pdf(source, fileobj):
+    from pypdf import PdfReader
+
+    for page in PdfReader(fileobj).pages:
+        yield source, None, page.extract_text() or ""
+
+
+def _iter_zip(source, fileobj, chunk_rows, depth):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            # Skip folders and the resource forks macOS adds to archives
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or os.path.basename(info.filename).startswith("."):
+                continue
+            member = f"{source}/{info.filename}"
+            if _extension(info.filename) == ".zip" and depth >= MAX_ZIP_DEPTH:
+                yield member, None, None
+                continue
+            with archive.open(info) as stream:
+                yield from iter_tables(member, stream, chunk_rows, depth + 1)
+
+
+def iter_tables(name, fileobj, chunk_rows=CHUNK_ROWS, depth=0):
+    """Yield ``(source, sheet, chunk)`` for every table in an uploaded file.
+
+    PDFs yield the text of each page as a string chunk. Other files without
+    tabular content yield a single ``(source, None, None)`` so callers can
+    still list them.
+    """
+    ext = _extension(name)
+    if ext == ".csv":
+        yield from _iter_csv(name, fileobj, chunk_rows)
+    elif ext == ".xlsx":
+        yield from _iter_xlsx(name, fileobj, chunk_rows)
+    elif ext == ".xls":
+        yield from _iter_xls(name, fileobj, chunk_rows)
+    elif ext == ".pdf":
+        yield from _iter_pdf(name, fileobj)
+    elif ext == ".zip":
+        yield from _iter_zip(name, fileobj, chunk_rows, depth)
+    else:
+        yield name, None, None
+
+
+def summarise(name, fileobj, chunk_rows=CHUNK_ROWS, preview_rows=5):
+    """Stream one upload and return a ``TableSummary`` per table or document in it.
+
+    Each chunk's names not seen earlier in its table, and each page of
+    document text, are screened against the sanctions list on the way.
+    """
+    from core import sanctions
+
+    index = sanctions.get_index()
+    summaries, seen = {}, {}
+    for source, sheet, chunk in iter_tables(name, fileobj, chunk_rows):
+        key = (source, sheet)
+        if key not in summaries:
+            summaries[key] = TableSummary(source=source, sheet=sheet)
+            seen[key] = set()
+        if chunk is None:
+            continue
+        summary = summaries[key]
+        if isinstance(chunk, str):
+            summary.pages += 1
+            for hit in index.scan_text(chunk):
+                # A listed name found on several pages is reported once
+                if hit.entry not in seen[key]:
+                    seen[key].add(hit.entry)
+                    summary.hits.append(hit)
+            continue
+        if summary.preview is None:
+            summary.columns = list(chunk.columns)
+            summary.preview = chunk.head(preview_rows)
+        summary.rows += len(chunk)
+        new = _names(chunk) - seen[key]
+        seen[key] |= new
+        summary.names_screened += len(new)
+        summary.hits.extend(index.screen(new).values())
+    return list(summaries.values())
+
+
+def _names(chunk):
+    # Distinct non-blank values of the name columns in one chunk
+    columns = [c for c in chunk.columns if " ".join(str(c).lower().replace("_", " ").split()) in NAME_HEADERS]
+    values = set()
+    for column in columns:
+        values.update(chunk[column].dropna().astype(str).str.strip().unique())
+    values.discard("")
+    return values
+
+
+def summarise_spooled(item):
+    """Job worker: summarise a spooled upload ``(name, path)`` and delete the spool file."""
+    name, path = item
+    try:
+        with open(path, "rb") as fileobj:
+            return [summary.to_dict() for summary in summarise(name, fileobj)]
+    finally:
+        os.remove(path)
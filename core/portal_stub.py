@@ -0,0 +1,98 @@
+"""Local stand-in for a broker portal API, for development and load testing.
+
+Serves ``GET /submissions?since=<cursor>`` in the format ``PortalSource``
+expects, over HTTP/1.1 keep-alive, and publishes a new submission every few
+seconds::
+
+    python -m core.portal_stub --port 8765 --interval 5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from core.store import BROKERS, LOBS
+
+CLIENTS = [
+    "Northern Freight Ltd", "Harbour View Hotels", "Apex Data Centres", "Crown Estates Group",
+    "Atlantic Offshore Services", "Summit Engineering Partners", "Metro Retail Holdings",
+]
+
+PAGE_LIMIT = 500
+
+
+class Portal:
+    def __init__(self, initial=5):
+        self.items = []
+        self.lock = threading.Lock()
+        for _ in range(initial):
+            self.publish()
+
+    def publish(self):
+        with self.lock:
+            n = len(self.items)
+            self.items.append({
+                "id": f"PORTAL-{n + 1:06d}",
+                "client": random.choice(CLIENTS),
+                "broker": random.choice(BROKERS),
+                "lob": random.choice(LOBS),
+                "received": datetime.now().isoformat(sep=" ", timespec="seconds"),
+            })
+
+    def since(self, cursor):
+        with self.lock:
+            start = int(cursor) if cursor else 0
+            items = self.items[start:start + PAGE_LIMIT]
+            return {"items": items, "cursor": str(start + len(items))}
+
+
+def make_handler(portal):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/submissions":
+                self.send_error(404)
+                return
+            cursor = parse_qs(url.query).get("since", [""])[0]
+            body = json.dumps(portal.since(cursor)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between new submissions")
+    parser.add_argument("--initial", type=int, default=5, help="submissions available at start")
+    args = parser.parse_args()
+
+    portal = Portal(args.initial)
+
+    def publisher():
+        while True:
+            time.sleep(args.interval)
+            portal.publish()
+
+    threading.Thread(target=publisher, daemon=True).start()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(portal))
+    print(f"Broker portal stand-in on http://127.0.0.1:{args.port}/submissions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""PDF dashboard reports, assembled in background workers.
+
+A report is described by a plain spec: title, filter summary, KPI strip
+and the dashboard figures as Plotly JSON. Two caches sit in front of the
+work:
+
+- each figure is rendered to PNG once per distinct figure JSON and size,
+  under ``data/reports/renders/<hash>.png``, so charts that did not change
+  are never re-rendered;
+- each report is stored under a hash of its whole spec, so everyone who
+  asks for the same report gets the same file, and requests that arrive
+  while it is still being built join the job already running.
+
+Rendering uses Plotly's static image export (Kaleido). Where Kaleido or
+its browser is unavailable, the report shows each chart's data as a table.
+fpdf2 and Plotly's I/O are imported inside the worker, so pages that only
+request reports do not load them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core import jobs, store
+
+REPORT_DIR = os.path.join(store.DATA_DIR, "reports")
+RENDER_DIR = os.path.join(REPORT_DIR, "renders")
+
+# Reports and renders are deleted after this many seconds
+REPORT_TTL = 7 * 24 * 60 * 60
+
+# Rendered chart size in pixels, and its width on the A4 page in millimetres
+RENDER_WIDTH, RENDER_HEIGHT = 1000, 450
+IMAGE_WIDTH_MM = 190
+
+# Rows of chart data shown when a chart cannot be rendered
+FALLBACK_ROWS = 15
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _prune(folder):
+    cutoff = time.time() - REPORT_TTL
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+
+def report_spec(title, subtitle, kpis, figures):
+    """Spec for a report.
+
+    ``kpis`` are ``(label, formatted value, relative change or None)`` and
+    ``figures`` are Plotly figures.
+    """
+    return {
+        "title": title,
+        "subtitle": subtitle,
+        "kpis": [[label, value, "-" if change is None else f"{change:+.1%}"] for label, value, change in kpis],
+        "figures": [fig.to_json() for fig in figures],
+    }
+
+
+def render(figure_json):
+    """PNG path for a figure, rendering it only if this exact figure has not been rendered before."""
+    path = os.path.join(RENDER_DIR, f"{_digest([figure_json, RENDER_WIDTH, RENDER_HEIGHT])}.png")
+    if not os.path.exists(path):
+        import plotly.io as pio
+
+        image = pio.to_image(pio.from_json(figure_json), format="png", width=RENDER_WIDTH, height=RENDER_HEIGHT, scale=2)
+        tmp = f"{path}.part"
+        with open(tmp, "wb") as f:
+            f.write(image)
+        os.replace(tmp, path)
+    return path
+
+
+def _text(value):
+    # The PDF core fonts only cover Latin-1
+    return str(value).replace("–", "-").encode("latin-1", "replace").decode("latin-1")
+
+
+def _figure_rows(figure):
+    rows = []
+    for trace in figure.data:
+        if getattr(trace, "labels", None) is not None:
+            labels, values = trace.labels, trace.values
+        elif getattr(trace, "orientation", None) == "h" or trace.type == "funnel":
+            labels, values = trace.y, trace.x
+        else:
+            labels, values = trace.x, trace.y
+        rows.extend((trace.name or "", label, value) for label, value in zip(labels or (), values or ()))
+    return rows[:FALLBACK_ROWS]
+
+
+def _add_chart(pdf, figure_json):
+    try:
+        image = render(figure_json)
+    except Exception:
+        # No static renderer here: show the chart's data instead
+        import plotly.io as pio
+
+        figure = pio.from_json(figure_json)
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(0, 8, _text(figure.layout.title.text or ""), new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Helvetica", size=9)
+        with pdf.table(col_widths=(50, 90, 50)) as table:
+            table.row(["Series", "Category", "Value"])
+            for row in _figure_rows(figure):
+                table.row([_text(f"{v:,.2f}" if isinstance(v, float) else v) for v in row])
+        pdf.ln(4)
+        return
+    pdf.image(image, w=IMAGE_WIDTH_MM)
+    pdf.ln(4)
+
+
+def build_pdf(spec):
+    """Job worker: assemble the report for ``spec`` at ``spec["path"]``."""
+    from fpdf import FPDF
+
+    os.makedirs(RENDER_DIR, exist_ok=True)
+    _prune(RENDER_DIR)
+
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(auto=True, margin=12)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 18)
+    pdf.cell(0, 10, _text(spec["title"]), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", size=10)
+    pdf.cell(0, 6, _text(spec["subtitle"]), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(4)
+
+    pdf.set_font("Helvetica", size=10)
+    with pdf.table(text_align="CENTER") as table:
+        table.row([_text(label) for label, _, _ in spec["kpis"]])
+        table.row([_text(value) for _, value, _ in spec["kpis"]])
+        table.row([_text(change) for _, _, change in spec["kpis"]])
+    pdf.ln(6)
+
+    for figure_json in spec["figures"]:
+        _add_chart(pdf, figure_json)
+
+    tmp = f"{spec['path']}.part"
+    pdf.output(tmp)
+    os.replace(tmp, spec["path"])
+    return {"path": spec["path"]}
+
+
+def request_report(spec):
+    """Cached report path for ``spec``, or the ID of the job building it.
+
+    Returns ``(path, None)`` when the report is ready, else ``(None, job_id)``.
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    key = _digest(spec)
+    path = os.path.join(REPORT_DIR, f"{key}.pdf")
+    with _pending_lock:
+        job_id = _pending.get(key)
+        if job_id is not None and jobs.get_job(job_id)["status"] == "running":
+            return None, job_id
+        if os.path.exists(path):
+            return path, None
+        _prune(REPORT_DIR)
+        job_id = jobs.get_queue().submit("pdf_report", build_pdf, [dict(spec, path=path)], processes=True)
+        _pending[key] = job_id
+        return None, job_id
@@ -0,0 +1,200 @@
+"""Sanctions screening against a local list file.
+
+The list (``resources/sanctions_list.csv`` or ``HX_RENEW_SANCTIONS``) is
+loaded once per process and compiled into two structures:
+
+- an Aho-Corasick automaton over every normalised name and alias, which
+  finds listed names anywhere inside a longer name or document text in a
+  single pass, on whole-word boundaries;
+- a character-trigram inverted index for fuzzy matches such as spelling
+  variants, scored with the Dice coefficient.
+
+Screening a batch of names costs microseconds per name, so it runs inline
+wherever submissions are shown, and chunk by chunk in the upload parser.
+"""
+
+import csv
+import os
+from collections import Counter, deque
+from dataclasses import dataclass
+
+import streamlit as st
+
+from core.store import APP_ROOT
+from core.text import normalize_name
+
+LIST_PATH = os.environ.get(
+    "HX_RENEW_SANCTIONS", os.path.join(APP_ROOT, "resources", "sanctions_list.csv")
+)
+
+# Minimum trigram Dice similarity for a fuzzy hit
+FUZZY_THRESHOLD = 0.8
+
+# Trigrams shared by more than this share of names are too common to
+# narrow down candidates (they still count when scoring)
+COMMON_TRIGRAM_SHARE = 0.1
+
+
+@dataclass(frozen=True)
+class Entry:
+    list_id: str
+    name: str
+    program: str
+
+
+@dataclass(frozen=True)
+class Hit:
+    query: str
+    entry: Entry
+    matched: str
+    score: float
+    kind: str
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Automaton:
+    """Aho-Corasick automaton matching whole-word patterns in normalised text."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, value in patterns:
+            self._add(f" {pattern} ", value)
+        self._link()
+
+    def _add(self, pattern, value):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(value)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text):
+        """Values of every pattern occurring in ``text`` (already normalised)."""
+        node, found = 0, []
+        for char in f" {text} ":
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            if self._out[node]:
+                found.extend(self._out[node])
+        return found
+
+
+class SanctionsIndex:
+    def __init__(self, entries):
+        self.entries = []
+        self._names = []
+        self._grams = []
+        patterns = []
+        for entry, names in entries:
+            for name in names:
+                normalized = normalize_name(name)
+                if not normalized:
+                    continue
+                pos = len(self._names)
+                self.entries.append(entry)
+                self._names.append(normalized)
+                self._grams.append(_trigrams(normalized))
+                patterns.append((normalized, pos))
+        self._automaton = Automaton(patterns)
+
+        postings = {}
+        for pos, grams in enumerate(self._grams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(pos)
+        limit = max(1, int(len(self._names) * COMMON_TRIGRAM_SHARE))
+        self._postings = {g: p for g, p in postings.items() if len(p) <= limit}
+
+    @classmethod
+    def from_csv(cls, path):
+        entries = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                aliases = [a for a in (row.get("aliases") or "").split(";") if a.strip()]
+                entries.append((Entry(row["list_id"], row["name"], row.get("program", "")), [row["name"], *aliases]))
+        return cls(entries)
+
+    def screen_one(self, name):
+        """Best hit for one name, or ``None`` when clear."""
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+
+        # Exact listed names, including ones embedded in a longer name
+        exact = self._automaton.search(normalized)
+        if exact:
+            pos = max(exact, key=lambda p: len(self._names[p]))
+            return Hit(name, self.entries[pos], self._names[pos], 1.0, "exact")
+
+        grams = _trigrams(normalized)
+        shared = Counter(p for g in grams for p in self._postings.get(g, ()))
+        best = None
+        for pos, _ in shared.most_common(20):
+            other = self._grams[pos]
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score >= FUZZY_THRESHOLD and (best is None or score > best.score):
+                best = Hit(name, self.entries[pos], self._names[pos], score, "fuzzy")
+        return best
+
+    def screen(self, names):
+        """Screen a batch of names; returns ``{name: Hit}`` for the ones that matched."""
+        hits = {}
+        for name in set(names):
+            hit = self.screen_one(name)
+            if hit is not None:
+                hits[name] = hit
+        return hits
+
+    def scan_text(self, text):
+        """Exact hits for listed names appearing anywhere in free text, such as an extracted document."""
+        found = {}
+        for pos in self._automaton.search(normalize_name(text)):
+            entry = self.entries[pos]
+            # Keep the longest listed name or alias found for each entry
+            if entry not in found or len(self._names[pos]) > len(found[entry].matched):
+                found[entry] = Hit(self._names[pos], entry, self._names[pos], 1.0, "exact")
+        return sorted(found.values(), key=lambda hit: hit.entry.list_id)
+
+
+@st.cache_resource(show_spinner=False)
+def _load(path, mtime):
+    return SanctionsIndex.from_csv(path)
+
+
+def get_index():
+    """The compiled list, shared by all sessions and reloaded when the file changes."""
+    return _load(LIST_PATH, os.path.getmtime(LIST_PATH))
+
+
+def screen(names):
+    return get_index().screen(names)
+
+
+def status_label(hit):
+    if hit is None:
+        return "Clear ✓"
+    return f"Potential Match ! ({hit.entry.name}, {hit.score:.0%})"
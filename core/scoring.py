@@ -0,0 +1,211 @@
+"""Risk-appetite scoring for the triage queue.
+
+Appetite rules live in ``resources/appetite_rules.json`` (or the file named
+by ``HX_RENEW_APPETITE``): points per LOB and broker, plus points per
+premium band and per deadline urgency band (``store.URGENCY_DAYS``), added
+to a base score. A missing premium or deadline earns no points, and the
+submission is sent for review at the lowest confidence whatever its score.
+The score maps to an Accept / Needs Review / Decline recommendation
+through two thresholds, and the confidence grows with the distance from
+the nearest threshold.
+
+``score`` evaluates the rules over a whole frame at once with pandas and
+NumPy, so re-scoring and writing back 100k submissions takes about a
+second. The version of the rules last applied is kept in the store; when
+the file changes, ``ensure_scored`` re-scores the whole queue in one
+transaction, and otherwise scores only new rows. Each row keeps the
+urgency band it was scored in; the deadline monitor re-scores the rows it
+moves into a tighter band (``rescore_urgency``), so scores follow deadlines
+as they approach without the page reads checking for it.
+"""
+
+import json
+import os
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from core import store
+
+RULES_PATH = os.environ.get(
+    "HX_RENEW_APPETITE", os.path.join(store.APP_ROOT, "resources", "appetite_rules.json")
+)
+
+RECOMMENDATIONS = ["Accept", "Needs Review", "Decline"]
+
+
+@dataclass(frozen=True)
+class Bands:
+    """Points for values falling between ascending ``edges``; one more point value than edges."""
+
+    edges: tuple
+    points: tuple
+
+    def __post_init__(self):
+        if len(self.points) != len(self.edges) + 1:
+            raise ValueError("Bands need exactly one more point value than edges")
+        if list(self.edges) != sorted(self.edges):
+            raise ValueError("Band edges must be ascending")
+
+    def index(self, values):
+        return np.digitize(values, self.edges)
+
+    def lookup(self, values):
+        return np.asarray(self.points)[self.index(values)]
+
+
+@dataclass(frozen=True)
+class AppetiteRules:
+    base: int
+    lob: dict
+    broker: dict
+    premium_bands: Bands
+    # Points per urgency band, most urgent first, as ``store.urgency`` numbers them
+    urgency_points: tuple
+    accept_threshold: int
+    decline_threshold: int
+    confidence: dict
+    version: int
+
+    def __post_init__(self):
+        if len(self.urgency_points) != len(store.URGENCY_DAYS) + 1:
+            raise ValueError("Urgency points need one value per urgency band")
+
+    @classmethod
+    def from_dict(cls, data):
+        canonical = json.dumps(data, sort_keys=True)
+        return cls(
+            base=data["base"],
+            lob=data.get("lob", {}),
+            broker=data.get("broker", {}),
+            premium_bands=Bands(tuple(data["premium_bands"]["edges"]), tuple(data["premium_bands"]["points"])),
+            urgency_points=tuple(data["urgency_points"]),
+            accept_threshold=data["thresholds"]["accept"],
+            decline_threshold=data["thresholds"]["decline"],
+            confidence={rec: tuple(data["confidence"][rec]) for rec in RECOMMENDATIONS},
+            version=zlib.crc32(canonical.encode()),
+        )
+
+
+@lru_cache(maxsize=4)
+def _load(path, mtime):
+    with open(path, encoding="utf-8") as f:
+        return AppetiteRules.from_dict(json.load(f))
+
+
+def load_rules():
+    """Current appetite rules, re-read only when the rules file changes."""
+    return _load(RULES_PATH, os.path.getmtime(RULES_PATH))
+
+
+def score(df, rules):
+    """Score submissions with ``lob``, ``broker``, ``estimated_premium``, ``deadline`` and ``urgency`` columns.
+
+    Returns a frame on the same index with ``risk_appetite``,
+    ``ai_recommendation``, ``confidence`` and the ``deadline_band`` (the
+    urgency band) scored in.
+    """
+    premium = pd.to_numeric(df["estimated_premium"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    has_premium = ~np.isnan(premium)
+    has_deadline = df["deadline"].notna().to_numpy()
+    deadline_band = df["urgency"].to_numpy(dtype=int)
+
+    points = (
+        rules.base
+        + df["lob"].map(rules.lob).fillna(0).to_numpy()
+        + df["broker"].map(rules.broker).fillna(0).to_numpy()
+        + np.where(has_premium, rules.premium_bands.lookup(np.nan_to_num(premium)), 0)
+        + np.where(has_deadline, np.asarray(rules.urgency_points)[deadline_band], 0)
+    )
+    appetite = np.clip(points, 0, 100).astype(int)
+
+    # Without a premium or deadline the score is partial, so it is only ever a prompt to review
+    complete = has_premium & has_deadline
+    accept = complete & (appetite >= rules.accept_threshold)
+    decline = complete & (appetite <= rules.decline_threshold)
+    recommendation = np.select([accept, decline], ["Accept", "Decline"], "Needs Review")
+
+    # Confidence rises from the floor of each band by the margin to the nearest threshold
+    margin = np.select(
+        [accept, decline, ~complete],
+        [appetite - rules.accept_threshold, rules.decline_threshold - appetite, 0],
+        np.minimum(appetite - rules.decline_threshold, rules.accept_threshold - appetite),
+    )
+    floor = np.select([accept, decline], [rules.confidence[r][0] for r in ("Accept", "Decline")],
+                      rules.confidence["Needs Review"][0])
+    ceiling = np.select([accept, decline], [rules.confidence[r][1] for r in ("Accept", "Decline")],
+                        rules.confidence["Needs Review"][1])
+    confidence = np.minimum(floor + margin, ceiling)
+
+    return pd.DataFrame(
+        {
+            "risk_appetite": appetite,
+            "ai_recommendation": recommendation,
+            "confidence": confidence,
+            "deadline_band": deadline_band,
+        },
+        index=df.index,
+    )
+
+
+def _rescore(conn, rules, where, params=()):
+    df = pd.read_sql_query(
+        f"SELECT id, lob, broker, estimated_premium, deadline, urgency FROM submissions WHERE {where}",
+        conn,
+        params=list(params),
+    )
+    if df.empty:
+        return 0
+
+    scores = score(df, rules)
+    conn.executemany(
+        "UPDATE submissions SET risk_appetite = ?, ai_recommendation = ?, confidence = ?, deadline_band = ? WHERE id = ?",
+        zip(
+            scores["risk_appetite"].tolist(),
+            scores["ai_recommendation"].tolist(),
+            scores["confidence"].tolist(),
+            scores["deadline_band"].tolist(),
+            df["id"].tolist(),
+        ),
+    )
+    store.bump_meta(conn, "data_version")
+    return len(df)
+
+
+def rescore(conn, rules, only_unscored=False):
+    """Score the triage queue inside the caller's transaction; returns the number of rows updated.
+
+    With ``only_unscored``, only rows never scored are read, straight off
+    the partial index of unscored rows.
+    """
+    where = "status = ?" + (" AND risk_appetite IS NULL" if only_unscored else "")
+    return _rescore(conn, rules, where, [store.TRIAGE_STATUS])
+
+
+def rescore_urgency(ids=None):
+    """Re-score scored submissions whose urgency band has moved since; returns how many.
+
+    ``ids`` limits the check to the submissions the deadline monitor just
+    moved; without it every scored row is checked, as on monitor start-up.
+    """
+    where, params = "risk_appetite IS NOT NULL AND deadline_band IS NOT urgency", []
+    if ids is not None:
+        where += " AND id IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(list(ids)))
+    conn = store.get_connection()
+    with conn:
+        return _rescore(conn, load_rules(), where, params)
+
+
+def ensure_scored():
+    """Re-score the queue if the rules changed since the last run, else score only new rows."""
+    rules = load_rules()
+    conn = store.get_connection()
+    stale = store.meta_value("appetite_rules") != rules.version
+    with conn:
+        rescore(conn, rules, only_unscored=not stale)
+        if stale:
+            store.set_meta(conn, "appetite_rules", rules.version)
@@ -0,0 +1,113 @@
+"""Row selection for the card lists, keyed by submission ID.
+
+A ``Selection`` lives in session state and records which submissions are
+ticked by their IDs, so a tick stays with its submission when filters or
+pages change. "Select all" does not tick every row: it stores the filters
+it applies to and the IDs unticked since, and the selected IDs are only
+worked out, with one query, when a batch action needs them. Selecting
+10,000 submissions therefore costs the same as selecting one, and only
+the visible page ever has checkboxes.
+
+Ticks are kept across filter changes, but a list can pass ``in_scope`` to
+``count`` and ``resolve`` so that only ticked rows its current filters
+still match are counted and acted on. Decided submissions are dropped
+with ``discard``.
+"""
+
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+
+@dataclass
+class Selection:
+    # Submissions ticked one by one
+    ids: set = field(default_factory=set)
+    # Whether "select all" is on, and the filters it applies to
+    all_matching: bool = False
+    filters: object = None
+    # Submissions unticked since "select all"
+    excluded: set = field(default_factory=set)
+
+    @property
+    def all_selected(self):
+        return self.all_matching and not self.excluded
+
+    def __contains__(self, item_id):
+        # Under "select all", every row on screen matches its filters
+        if self.all_matching:
+            return item_id not in self.excluded
+        return item_id in self.ids
+
+    def __bool__(self):
+        return self.all_matching or bool(self.ids)
+
+    def scope(self, filters):
+        """Drop "select all" if the filters it applied to are no longer the ones shown."""
+        if self.all_matching and self.filters != filters:
+            self.clear()
+
+    def set(self, item_id, selected):
+        if self.all_matching:
+            (self.excluded.discard if selected else self.excluded.add)(item_id)
+        else:
+            (self.ids.add if selected else self.ids.discard)(item_id)
+
+    def discard(self, item_ids):
+        """Forget submissions that have been decided and left the list."""
+        self.ids.difference_update(item_ids)
+        self.excluded.difference_update(item_ids)
+
+    def select_all(self, filters):
+        self.ids, self.all_matching, self.filters, self.excluded = set(), True, filters, set()
+
+    def clear(self):
+        self.ids, self.all_matching, self.filters, self.excluded = set(), False, None, set()
+
+    def count(self, total, in_scope=None):
+        """Number of selected submissions, given ``total`` rows match the current filters.
+
+        ``in_scope(ids)`` returns those of ``ids`` the current filters match;
+        without it every ticked ID counts.
+        """
+        if self.all_matching:
+            return total - len(in_scope(self.excluded) if in_scope else self.excluded)
+        return len(in_scope(self.ids) if in_scope else self.ids)
+
+    def resolve(self, matching_ids, in_scope=None):
+        """Selected IDs in a stable order; ``matching_ids()`` lists every ID the filters match."""
+        if self.all_matching:
+            return [item_id for item_id in matching_ids() if item_id not in self.excluded]
+        return sorted(in_scope(self.ids) if in_scope else self.ids)
+
+
+def get_selection(key):
+    """The session's selection for the list named ``key``."""
+    return st.session_state.setdefault(f"{key}_selection", Selection())
+
+
+def select_all_checkbox(selection, key, filters):
+    """"Select All" box for the list; ticking it selects everything ``filters`` match."""
+    selection.scope(filters)
+    widget_key = f"{key}_select_all"
+    st.session_state[widget_key] = selection.all_selected
+
+    def _toggle():
+        if st.session_state[widget_key]:
+            selection.select_all(filters)
+        else:
+            selection.clear()
+
+    st.checkbox("Select All", key=widget_key, on_change=_toggle)
+
+
+def row_checkbox(selection, key, item_id):
+    """Checkbox ticking one submission in or out of the selection."""
+    widget_key = f"{key}_select_{item_id}"
+    st.session_state[widget_key] = item_id in selection
+    st.checkbox(
+        f"Select {item_id}",
+        key=widget_key,
+        label_visibility="collapsed",
+        on_change=lambda: selection.set(item_id, st.session_state[widget_key]),
+    )
@@ -0,0 +1,203 @@
+"""Deadline watch for open submissions on a hierarchical timing wheel.
+
+Every open submission has a timer for each urgency threshold it has yet
+to cross (see ``store.URGENCY_DAYS``) and one for its deadline. Timers sit
+in a ``TimingWheel``: a minute wheel, an hour wheel and a day wheel, where
+each tick empties one minute slot and, once an hour or a day, spreads one
+coarser slot over the finer wheels. A tick therefore costs the timers that
+fall due plus the occasional cascade, however many submissions are being
+watched.
+
+A background thread advances the wheel once per ``TICK_SECONDS``. When a
+timer fires for a submission that is still open, its urgency band is
+tightened, which moves it up the triage queue and re-scores it (scores
+count the urgency band), and an alert is written to the ``sla_alerts``
+table for the pages to show. New submissions are picked up from the
+lifecycle events recorded since the last tick.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from core import scoring, store
+
+# Seconds per wheel tick
+TICK_SECONDS = 60
+
+# Slots per wheel, finest first: 60 one-minute slots, 24 one-hour slots and
+# 32 one-day slots; timers further out wait in an overflow list
+WHEEL_SLOTS = (60, 24, 32)
+
+# Band a submission is in once its deadline has passed
+OVERDUE = -1
+
+
+class TimingWheel:
+    """Hierarchical timing wheel over integer ticks.
+
+    ``schedule`` files an item under the tick it falls due; ``advance``
+    moves the wheel on and returns the items that fell due on the way.
+    """
+
+    def __init__(self, now, slots=WHEEL_SLOTS):
+        self.now = now
+        self._slots = slots
+        # Ticks covered by one slot of each wheel
+        self._spans = [math.prod(slots[:level]) for level in range(len(slots))]
+        self._horizon = self._spans[-1] * slots[-1]
+        self._wheels = [[[] for _ in range(size)] for size in slots]
+        self._overflow = []
+        self._due = []
+
+    def __len__(self):
+        return len(self._due) + len(self._overflow) + sum(len(slot) for wheel in self._wheels for slot in wheel)
+
+    def schedule(self, tick, item):
+        delta = tick - self.now
+        if delta <= 0:
+            self._due.append(item)
+            return
+        for size, span, wheel in zip(self._slots, self._spans, self._wheels):
+            if delta < size * span:
+                wheel[tick // span % size].append((tick, item))
+                return
+        self._overflow.append((tick, item))
+
+    def _respread(self, entries):
+        for tick, item in entries:
+            self.schedule(tick, item)
+
+    def advance(self, to_tick):
+        """Move the wheel on to ``to_tick``; returns the items due by then."""
+        while self.now < to_tick:
+            self.now += 1
+            # Spread the coarser slots starting now over the finer wheels,
+            # coarsest first so their timers land in slots not yet emptied
+            if self.now % self._horizon == 0:
+                entries, self._overflow = self._overflow, []
+                self._respread(entries)
+            for level in range(len(self._slots) - 1, 0, -1):
+                span = self._spans[level]
+                if self.now % span == 0:
+                    wheel = self._wheels[level]
+                    slot = self.now // span % self._slots[level]
+                    entries, wheel[slot] = wheel[slot], []
+                    self._respread(entries)
+            wheel = self._wheels[0]
+            slot = self.now % self._slots[0]
+            entries, wheel[slot] = wheel[slot], []
+            self._due.extend(item for _, item in entries)
+        due, self._due = self._due, []
+        return due
+
+
+def _tick(moment):
+    return math.ceil(moment.timestamp() / TICK_SECONDS)
+
+
+def _crossings(deadline):
+    # (band, moment) for each threshold, tightest last, then the deadline
+    for band, days in reversed(list(enumerate(store.URGENCY_DAYS))):
+        yield band, deadline - timedelta(days=days)
+    yield OVERDUE, deadline
+
+
+def band_label(band):
+    if band == OVERDUE:
+        return "Overdue"
+    return f"Due within {store.URGENCY_DAYS[band]} days"
+
+
+class SlaMonitor:
+    """Watches every open submission's deadline from a background thread."""
+
+    def __init__(self):
+        now = datetime.now()
+        self._lock = threading.Lock()
+        self._wheel = TimingWheel(_tick(now))
+        self._last_tick = now
+        self._last_event = 0
+        self._loaded = threading.Event()
+
+        # Loading every deadline is left to the thread so the first page
+        # to start the monitor does not wait for it
+        self._thread = threading.Thread(target=self._run, name="sla-monitor", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        # Catch up on bands crossed while nothing was watching
+        store.refresh_urgency(store.get_connection())
+        scoring.rescore_urgency()
+        with self._lock:
+            # Read the event mark first: a submission arriving during the
+            # scan is then watched twice, which is harmless, rather than missed
+            self._last_event = store.last_event_id()
+            for submission_id, deadline in store.open_deadlines():
+                self._watch(submission_id, deadline, self._last_tick)
+        self._loaded.set()
+
+    def __len__(self):
+        return len(self._wheel)
+
+    def _watch(self, submission_id, deadline, since):
+        # Crossings up to ``since`` were applied on insert or by the catch-up;
+        # later ones, even if already past, are due now
+        deadline = datetime.fromisoformat(deadline)
+        for band, moment in _crossings(deadline):
+            if moment > since:
+                self._wheel.schedule(_tick(moment), (submission_id, band, deadline))
+
+    def _run(self):
+        while not self._loaded.is_set():
+            try:
+                self._load()
+            except Exception:
+                time.sleep(TICK_SECONDS)
+        while True:
+            time.sleep(TICK_SECONDS)
+            try:
+                self.tick()
+            except Exception:
+                # Keep watching; failed timers are retried on the next tick
+                pass
+
+    def tick(self, now=None):
+        """Watch newly received submissions and act on timers due by ``now``; returns the alerts logged."""
+        self._loaded.wait()
+        now = now or datetime.now()
+        with self._lock:
+            # Submissions received since the last tick had their band set on
+            # insert, no earlier than that tick
+            for event_id, submission_id, deadline in store.received_since(self._last_event):
+                self._watch(submission_id, deadline, self._last_tick)
+                self._last_event = event_id
+            due = self._wheel.advance(_tick(now))
+            self._last_tick = now
+        if not due:
+            return 0
+        try:
+            logged = store.record_sla_alerts(due, now)
+        except Exception:
+            # Put the timers back so the next tick tries them again
+            with self._lock:
+                for item in due:
+                    self._wheel.schedule(self._wheel.now, item)
+            raise
+        scoring.rescore_urgency({submission_id for submission_id, _, _ in due})
+        return logged
+
+
+@st.cache_resource(show_spinner=False)
+def get_monitor():
+    """The process-wide deadline monitor, started on first use."""
+    return SlaMonitor()
+
+
+def recent_alerts(hours=24):
+    """Alerts raised in the last ``hours`` for submissions that are still open, newest first."""
+    get_monitor()
+    return store.query_sla_alerts(datetime.now() - timedelta(hours=hours))
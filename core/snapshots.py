@@ -0,0 +1,70 @@
+"""Read-mostly frames shared by every session in the server process.
+
+``st.cache_data`` hands each caller its own unpickled copy of a cached
+frame, so every session holds, and every rerun rebuilds, a private copy of
+the same data. A ``SharedFrame`` instead holds one immutable snapshot per
+process, stamped with the store version it was read at. Callers get views
+of it: a shallow copy, or a slice with ``since``, over the same column
+arrays. Under pandas copy-on-write (the default from pandas 3), a session
+that changes its view gets its own copy of what it changed, and the
+snapshot and every other session are untouched.
+
+When a write moves the version on, the first reader to ask for the new
+version builds the next snapshot and swaps it in with one assignment.
+Readers part-way through a run keep the snapshot they started with, which
+is freed once the last view of it goes.
+"""
+
+import threading
+
+import numpy as np
+import streamlit as st
+
+
+class SharedFrame:
+    """The latest snapshot of one frame, rebuilt when a newer version is asked for."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (version, frame), replaced whole so readers never see half a swap
+        self._snapshot = None
+
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return snapshot[0] if snapshot else None
+
+    def get(self, version, build):
+        """A view of the snapshot at ``version`` or later, calling ``build()`` for a new one if needed.
+
+        Versions must only grow, e.g. ``store.data_version()`` or a tuple
+        led by a window that only moves forward.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot[0] < version:
+            with self._lock:
+                # Sessions asking at once wait for one build rather than each doing it
+                snapshot = self._snapshot
+                if snapshot is None or snapshot[0] < version:
+                    snapshot = (version, build())
+                    self._snapshot = snapshot
+        return snapshot[1].copy(deep=False)
+
+
+@st.cache_resource(show_spinner=False)
+def shared_frame(name):
+    """The process-wide ``SharedFrame`` called ``name``."""
+    return SharedFrame()
+
+
+def since(frame, column, moment):
+    """Rows of ``frame`` with ``column`` at or after ``moment``, as a view.
+
+    ``frame`` must be sorted on ``column``, oldest or newest first; the rows
+    wanted are then one contiguous slice found by binary search.
+    """
+    values = frame[column].to_numpy()
+    moment = np.datetime64(moment)
+    if len(values) > 1 and values[0] > values[-1]:
+        return frame.iloc[:len(values) - np.searchsorted(values[::-1], moment, side="left")]
+    return frame.iloc[np.searchsorted(values, moment, side="left"):]
@@ -0,0 +1,934 @@
+"""Embedded SQLite submission store shared by every page.
+
+Submissions live in a single ``submissions`` table whose ``status`` column
+places them in the inbox ("New"), the triage queue ("In Triage"), the
+backlog (see ``BACKLOG_STATUSES``) or a closed state. Pages query only the
+rows their filters select instead of rebuilding the whole book on each rerun.
+
+Triggers on ``submissions`` keep ``submission_rollups`` (counts per day, LOB
+and broker) current on every insert, update and delete, so the dashboard
+reads a few small aggregates rather than scanning the history. Triggers also
+append lifecycle events to ``submission_events`` and add each one to the
+running ``kpi_counters``, and note in ``history_changes`` the months the
+Parquet history has to rewrite.
+"""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get("HX_RENEW_DATA", os.path.join(APP_ROOT, "data"))
+DB_PATH = os.environ.get("HX_RENEW_DB", os.path.join(DATA_DIR, "submissions.db"))
+
+INBOX_STATUS = "New"
+TRIAGE_STATUS = "In Triage"
+BACKLOG_STATUSES = ("Awaiting Info", "Duplicate Check", "Needs Review")
+OPEN_STATUSES = (INBOX_STATUS, TRIAGE_STATUS, *BACKLOG_STATUSES)
+
+ARCHIVED_STATUS = "Archived"
+
+# Status each triage or backlog decision moves a submission to
+DECISION_STATUSES = {
+    "Accept": "Accepted",
+    "Decline": "Declined",
+    "Backlog": "Needs Review",
+    "Resume": TRIAGE_STATUS,
+    "Archive": ARCHIVED_STATUS,
+}
+
+# Statuses a submission must be in for each decision to apply to it
+DECISION_SOURCES = {
+    "Accept": (TRIAGE_STATUS,),
+    "Decline": (TRIAGE_STATUS,),
+    "Backlog": (TRIAGE_STATUS,),
+    "Resume": BACKLOG_STATUSES,
+    "Archive": BACKLOG_STATUSES,
+}
+
+# Days before its deadline at which a submission enters each urgency band;
+# band 0 is the most urgent, and ``len(URGENCY_DAYS)`` means not yet urgent
+URGENCY_DAYS = (3, 7)
+
+# Order of AI recommendations in the triage queue
+RECOMMENDATION_PRIORITY = {
+    "Accept": 1,
+    "Needs Review": 2,
+    "Decline": 3
+}
+
+LOBS = ["Property D&F", "Professional Indemnity", "Cyber", "Marine Cargo", "Energy"]
+BROKERS = ["Marsh", "Aon", "WTW", "Howden", "BMS", "Miller", "Gallagher"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    broker TEXT NOT NULL,
+    lob TEXT NOT NULL,
+    status TEXT NOT NULL,
+    source TEXT,
+    received TEXT NOT NULL,
+    deadline TEXT,
+    estimated_premium INTEGER,
+    risk_appetite INTEGER,
+    ai_recommendation TEXT,
+    confidence INTEGER,
+    template_match INTEGER NOT NULL DEFAULT 0,
+    notes TEXT,
+    urgency INTEGER,
+    deadline_band INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_status_received ON submissions (status, received);
+CREATE INDEX IF NOT EXISTS idx_submissions_lob ON submissions (lob);
+CREATE INDEX IF NOT EXISTS idx_submissions_broker ON submissions (broker);
+CREATE INDEX IF NOT EXISTS idx_submissions_received ON submissions (received);
+CREATE INDEX IF NOT EXISTS idx_submissions_unscored ON submissions (status) WHERE risk_appetite IS NULL;
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_id TEXT NOT NULL REFERENCES submissions (id),
+    decision TEXT NOT NULL,
+    status TEXT NOT NULL,
+    decided_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_submission ON decisions (submission_id);
+
+CREATE TABLE IF NOT EXISTS sla_alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_id TEXT NOT NULL REFERENCES submissions (id),
+    band INTEGER NOT NULL,
+    deadline TEXT NOT NULL,
+    raised_at TEXT NOT NULL,
+    UNIQUE (submission_id, band)
+);
+CREATE INDEX IF NOT EXISTS idx_sla_alerts_raised ON sla_alerts (raised_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('templates_version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('appetite_rules', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('history_version', 0);
+
+CREATE TABLE IF NOT EXISTS mapping_templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    broker TEXT NOT NULL,
+    lob TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    mapping TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mapping_templates_signature ON mapping_templates (signature);
+CREATE INDEX IF NOT EXISTS idx_mapping_templates_broker_lob ON mapping_templates (broker, lob);
+
+CREATE TABLE IF NOT EXISTS fetch_watermarks (
+    source TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL REFERENCES jobs (id),
+    seq INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+def _sql_list(values):
+    return ", ".join(f"'{v}'" for v in values)
+
+
+# Per-submission contribution to the dashboard rollups, as SQL over a row
+# alias ({row} is NEW or OLD inside the triggers)
+ROLLUP_MEASURES = {
+    "received": "1",
+    "processed": f"{{row}}.status IN ({_sql_list([DECISION_STATUSES['Accept'], DECISION_STATUSES['Decline']])})",
+    "aligned": f"{{row}}.status = '{DECISION_STATUSES['Accept']}'",
+    "not_aligned": f"{{row}}.status = '{DECISION_STATUSES['Decline']}'",
+    "backlog": f"{{row}}.status IN ({_sql_list(BACKLOG_STATUSES)})",
+    "completeness": (
+        "({row}.deadline IS NOT NULL) + ({row}.estimated_premium IS NOT NULL)"
+        " + ({row}.source IS NOT NULL) + ({row}.template_match = 1)"
+    ),
+}
+
+# Number of fields counted in ``completeness``
+COMPLETENESS_FIELDS = 4
+
+# Columns whose changes move a submission between rollup buckets or measures
+_ROLLUP_COLUMNS = ["status", "received", "lob", "broker", "deadline", "estimated_premium", "source", "template_match"]
+
+
+def _rollup_upsert(row, sign):
+    measures = list(ROLLUP_MEASURES)
+    values = ", ".join(f"{sign}({ROLLUP_MEASURES[m].format(row=row)})" for m in measures)
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in measures)
+    return f"""
+        INSERT INTO submission_rollups (day, lob, broker, {', '.join(measures)})
+        VALUES (substr({row}.received, 1, 10), {row}.lob, {row}.broker, {values})
+        ON CONFLICT (day, lob, broker) DO UPDATE SET {updates};
+    """
+
+
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS submission_rollups (
+    day TEXT NOT NULL,
+    lob TEXT NOT NULL,
+    broker TEXT NOT NULL,
+    {''.join(f"{m} INTEGER NOT NULL DEFAULT 0, " for m in ROLLUP_MEASURES)}
+    PRIMARY KEY (day, lob, broker)
+);
+
+CREATE TRIGGER IF NOT EXISTS submission_rollups_insert AFTER INSERT ON submissions BEGIN
+    {_rollup_upsert("NEW", "+")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS submission_rollups_delete AFTER DELETE ON submissions BEGIN
+    {_rollup_upsert("OLD", "-")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS submission_rollups_update AFTER UPDATE ON submissions
+WHEN {' OR '.join(f"OLD.{c} IS NOT NEW.{c}" for c in _ROLLUP_COLUMNS)}
+BEGIN
+    {_rollup_upsert("OLD", "-")}
+    {_rollup_upsert("NEW", "+")}
+END;
+"""
+
+# Lifecycle event each status represents
+STATUS_EVENTS = {
+    TRIAGE_STATUS: "triaged",
+    DECISION_STATUSES["Accept"]: "accepted",
+    DECISION_STATUSES["Decline"]: "declined",
+    **{status: "backlogged" for status in BACKLOG_STATUSES},
+    ARCHIVED_STATUS: "archived",
+}
+
+_STATUS_EVENT = "CASE NEW.status " + " ".join(f"WHEN '{s}' THEN '{e}'" for s, e in STATUS_EVENTS.items()) + " END"
+
+# Submission events are emitted by triggers; each one bumps the running KPI
+# counters for its month and LOB: a count per event type, plus the sum of
+# its value (completeness points when received, days since receipt for
+# triage outcomes)
+EVENT_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS submission_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    lob TEXT NOT NULL,
+    occurred_at TEXT NOT NULL,
+    value REAL
+);
+
+CREATE TABLE IF NOT EXISTS kpi_counters (
+    month TEXT NOT NULL,
+    lob TEXT NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, lob, event)
+);
+
+CREATE TRIGGER IF NOT EXISTS kpi_counters_event AFTER INSERT ON submission_events BEGIN
+    INSERT INTO kpi_counters (month, lob, event, count, total)
+    VALUES (substr(NEW.occurred_at, 1, 7), NEW.lob, NEW.event, 1, coalesce(NEW.value, 0))
+    ON CONFLICT (month, lob, event) DO UPDATE SET count = count + 1, total = total + excluded.total;
+END;
+
+CREATE TRIGGER IF NOT EXISTS submission_events_insert AFTER INSERT ON submissions BEGIN
+    INSERT INTO submission_events (submission_id, event, lob, occurred_at, value)
+    VALUES (NEW.id, 'received', NEW.lob, NEW.received, {ROLLUP_MEASURES["completeness"].format(row="NEW")});
+    INSERT INTO submission_events (submission_id, event, lob, occurred_at, value)
+    SELECT NEW.id, {_STATUS_EVENT}, NEW.lob, datetime('now', 'localtime'),
+           julianday('now', 'localtime') - julianday(NEW.received)
+    WHERE {_STATUS_EVENT} IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS submission_events_status AFTER UPDATE OF status ON submissions
+WHEN OLD.status IS NOT NEW.status AND {_STATUS_EVENT} IS NOT NULL
+BEGIN
+    INSERT INTO submission_events (submission_id, event, lob, occurred_at, value)
+    VALUES (
+        NEW.id, {_STATUS_EVENT}, NEW.lob, datetime('now', 'localtime'),
+        julianday('now', 'localtime') - julianday(NEW.received)
+    );
+END;
+"""
+
+# Columns mirrored into the Parquet history (``core.history.FILE_SCHEMA``)
+_HISTORY_COLUMNS = [
+    "id", "client", "broker", "lob", "status", "source", "received", "deadline",
+    "estimated_premium", "risk_appetite", "ai_recommendation", "confidence",
+]
+
+
+def _history_change(*rows):
+    months = " UNION ".join(f"SELECT substr({row}.received, 1, 7)" for row in rows)
+    return f"""
+        INSERT INTO history_changes (month) {months} WHERE true
+        ON CONFLICT (month) DO UPDATE SET version = version + 1;
+    """
+
+
+# Months whose mirrored rows changed since the history last synced; a
+# month's version moves on with each change, so a sync only clears the
+# changes it has written out
+HISTORY_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS history_changes (
+    month TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS history_changes_insert AFTER INSERT ON submissions BEGIN
+    {_history_change("NEW")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS history_changes_delete AFTER DELETE ON submissions BEGIN
+    {_history_change("OLD")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS history_changes_update AFTER UPDATE ON submissions
+WHEN {' OR '.join(f"OLD.{c} IS NOT NEW.{c}" for c in _HISTORY_COLUMNS)}
+BEGIN
+    {_history_change("OLD", "NEW")}
+END;
+"""
+
+# Triage order: recommendation, deadline urgency, then premium, highest
+# first. The partial index below holds the queue in exactly this order, so
+# a page of it is read straight off the index instead of sorting the queue,
+# and a change to one submission moves one index entry.
+_RECOMMENDATION_ORDER = (
+    "CASE ai_recommendation "
+    + " ".join(f"WHEN '{r}' THEN {p}" for r, p in RECOMMENDATION_PRIORITY.items())
+    + f" ELSE {len(RECOMMENDATION_PRIORITY) + 1} END"
+)
+TRIAGE_ORDER = f"{_RECOMMENDATION_ORDER}, urgency, estimated_premium DESC, id"
+
+PRIORITY_SCHEMA = f"""
+CREATE INDEX IF NOT EXISTS idx_submissions_urgency ON submissions (urgency, deadline);
+CREATE INDEX IF NOT EXISTS idx_triage_priority ON submissions ({TRIAGE_ORDER})
+WHERE status = '{TRIAGE_STATUS}';
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def _ts(value):
+    # Timestamps are stored as sortable local-time ISO strings
+    return value.isoformat(sep=" ", timespec="seconds")
+
+
+def get_connection():
+    """Return this thread's connection to the store, creating the schema on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+
+    with _init_lock:
+        if DB_PATH not in _initialized:
+            conn.executescript(SCHEMA)
+            conn.executescript(ROLLUP_SCHEMA)
+            if conn.execute("SELECT 1 FROM submission_rollups LIMIT 1").fetchone() is None:
+                rebuild_rollups(conn)
+            conn.executescript(EVENT_SCHEMA)
+            if conn.execute("SELECT 1 FROM submission_events LIMIT 1").fetchone() is None:
+                backfill_events(conn)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_changes'").fetchone() is None:
+                # Stores mirrored before changes were tracked: write every month out again
+                conn.executescript(HISTORY_SCHEMA)
+                with conn:
+                    conn.execute("INSERT OR IGNORE INTO history_changes (month) SELECT DISTINCT substr(received, 1, 7) FROM submissions")
+            if "urgency" not in {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}:
+                # Stores created before urgency bands: add the column and band every row
+                with conn:
+                    conn.execute("ALTER TABLE submissions ADD COLUMN urgency INTEGER")
+                    conn.execute(f"UPDATE submissions SET urgency = {len(URGENCY_DAYS)}")
+                refresh_urgency(conn)
+            if "deadline_band" not in {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}:
+                # Stores scored before bands were recorded: left NULL, so the deadline monitor re-scores them on start
+                with conn:
+                    conn.execute("ALTER TABLE submissions ADD COLUMN deadline_band INTEGER")
+            conn.executescript(PRIORITY_SCHEMA)
+            if conn.execute("SELECT COUNT(*) FROM submissions").fetchone()[0] == 0:
+                _seed(conn)
+            _initialized.add(DB_PATH)
+
+    _local.conn = conn
+    return conn
+
+
+def _seed(conn):
+    # Populate an empty store with the demo book the pages used to generate
+    now = datetime.now()
+    rows = []
+
+    inbox = [
+        ("SUB-2024-0123", "ABC Property Holdings", "Marsh", "Property D&F", 2, "Email"),
+        ("SUB-2024-0122", "TechPro Solutions", "Aon", "Cyber", 5, "Broker Portal"),
+        ("SUB-2024-0121", "Global Architects Inc", "WTW", "Professional Indemnity", 8, "Email"),
+        ("SUB-2024-0120", "Marine Shipping Co", "Miller", "Marine Cargo", 12, "Broker Portal"),
+        ("SUB-2024-0119", "Luxury Hotel Group", "BMS", "Property D&F", 18, "Email"),
+        ("SUB-2024-0118", "Energy Solutions Ltd", "Lockton", "Energy", 24, "API"),
+    ]
+    for sub_id, client, broker, lob, hours, source in inbox:
+        rows.append({
+            "id": sub_id, "client": client, "broker": broker, "lob": lob,
+            "status": INBOX_STATUS, "source": source,
+            "received": _ts(now - timedelta(hours=hours)),
+        })
+
+    backlog = [
+        ("SUB-2024-0115", "Regional Property Trust", "Aon", "Property D&F", 3, "Duplicate Check", "Checking for potential duplicate"),
+        ("SUB-2024-0112", "Global Tech Services", "Marsh", "Cyber", 5, "Needs Review", "Awaiting additional info from broker"),
+        ("SUB-2024-0108", "European Hospitality Group", "WTW", "Property D&F", 7, "Awaiting Info", "Missing values for 3 locations"),
+        ("SUB-2024-0103", "Maritime Logistics Co", "Miller", "Marine Cargo", 10, "Duplicate Check", "Similar submission identified"),
+    ]
+    for sub_id, client, broker, lob, days, status, notes in backlog:
+        rows.append({
+            "id": sub_id, "client": client, "broker": broker, "lob": lob,
+            "status": status, "notes": notes,
+            "received": _ts(now - timedelta(days=days)),
+        })
+
+    # The triage queue is drawn from a fixed seed, so every new store starts the same
+    from core import synthetic
+
+    triage = synthetic.generate_triage(9, seed=0, now=now, id_prefix="SUB-2024", start=1000)
+    rows.extend(synthetic.records(triage))
+
+    with conn:
+        insert_submissions(conn, rows)
+
+
+SUBMISSION_COLUMNS = [
+    "id", "client", "broker", "lob", "status", "source", "received", "deadline",
+    "estimated_premium", "risk_appetite", "ai_recommendation", "confidence",
+    "template_match", "notes",
+]
+
+
+def urgency(deadline, now=None):
+    """Urgency band for a deadline, given as a datetime or stored timestamp; see ``URGENCY_DAYS``."""
+    if deadline is None:
+        return len(URGENCY_DAYS)
+    if isinstance(deadline, str):
+        deadline = datetime.fromisoformat(deadline)
+    days = (deadline - (now or datetime.now())).total_seconds() / 86400
+    return bisect.bisect_left(URGENCY_DAYS, days)
+
+
+def refresh_urgency(conn, now=None):
+    """Move submissions whose deadline has come within a more urgent band; returns how many moved.
+
+    Bands only ever tighten, so each band is one range probe on
+    ``(urgency, deadline)`` that touches just the rows changing band.
+    """
+    now = now or datetime.now()
+    bands = f"CASE {' '.join(f'WHEN deadline <= ? THEN {b}' for b in range(len(URGENCY_DAYS)))} END"
+    cutoffs = [_ts(now + timedelta(days=days)) for days in URGENCY_DAYS]
+    moved = 0
+    with conn:
+        for band in range(1, len(URGENCY_DAYS) + 1):
+            moved += conn.execute(
+                f"UPDATE submissions SET urgency = {bands} WHERE urgency = ? AND deadline <= ?",
+                [*cutoffs, band, cutoffs[band - 1]],
+            ).rowcount
+        if moved:
+            _bump_version(conn)
+    return moved
+
+
+def insert_submissions(conn, rows):
+    """Insert submission dicts inside the caller's transaction, skipping known IDs.
+
+    Returns the number of rows actually added.
+    """
+    now = datetime.now()
+    # The cursor counts the rows this statement inserted, not those the triggers wrote
+    added = conn.executemany(
+        f"""
+        INSERT OR IGNORE INTO submissions ({', '.join(SUBMISSION_COLUMNS)}, urgency)
+        VALUES ({', '.join('?' * (len(SUBMISSION_COLUMNS) + 1))})
+        """,
+        [
+            (*(row.get(c, 0 if c == "template_match" else None) for c in SUBMISSION_COLUMNS),
+             urgency(row.get("deadline"), now))
+            for row in rows
+        ],
+    ).rowcount
+    if added:
+        _bump_version(conn)
+    return added
+
+
+def last_rowid(conn):
+    """Highest submission rowid so far; rows inserted after this call get higher ones."""
+    return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM submissions").fetchone()[0]
+
+
+def ids_inserted_after(conn, rowid):
+    """IDs of the submissions inserted since ``last_rowid`` returned ``rowid``."""
+    return {sub_id for (sub_id,) in conn.execute("SELECT id FROM submissions WHERE rowid > ?", (rowid,))}
+
+
+def rebuild_rollups(conn):
+    """Recompute the dashboard rollups from scratch; the triggers keep them current afterwards."""
+    measures = list(ROLLUP_MEASURES)
+    with conn:
+        conn.execute("DELETE FROM submission_rollups")
+        conn.execute(f"""
+            INSERT INTO submission_rollups (day, lob, broker, {', '.join(measures)})
+            SELECT substr(received, 1, 10), lob, broker,
+                   {', '.join(f"SUM({ROLLUP_MEASURES[m].format(row='submissions')})" for m in measures)}
+            FROM submissions GROUP BY 1, 2, 3
+        """)
+
+
+def backfill_events(conn):
+    """Replay receipts and logged decisions of a store created before events were recorded."""
+    outcome = "CASE d.status " + " ".join(f"WHEN '{s}' THEN '{e}'" for s, e in STATUS_EVENTS.items()) + " END"
+    with conn:
+        conn.execute(f"""
+            INSERT INTO submission_events (submission_id, event, lob, occurred_at, value)
+            SELECT id, 'received', lob, received, {ROLLUP_MEASURES["completeness"].format(row="submissions")}
+            FROM submissions ORDER BY received
+        """)
+        conn.execute(f"""
+            INSERT INTO submission_events (submission_id, event, lob, occurred_at, value)
+            SELECT d.submission_id, {outcome}, s.lob, d.decided_at, julianday(d.decided_at) - julianday(s.received)
+            FROM decisions d JOIN submissions s ON s.id = d.submission_id
+            ORDER BY d.decided_at
+        """)
+
+
+def backdate_outcomes(conn, outcomes):
+    """Date the outcome of each ``(submission_id, decided_at)`` at ``decided_at``, inside the caller's transaction.
+
+    For loading past decisions in bulk: the insert triggers record a closed
+    submission's outcome as happening now. Its event moves to ``decided_at``,
+    along with its place in the KPI counters, and the decision is logged.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS backdated (submission_id TEXT PRIMARY KEY, decided_at TEXT NOT NULL)")
+    conn.execute("DELETE FROM backdated")
+    conn.executemany("INSERT OR REPLACE INTO backdated (submission_id, decided_at) VALUES (?, ?)", outcomes)
+    outcome_events = """
+        SELECT substr(e.occurred_at, 1, 7) AS month, e.lob, e.event, COUNT(*) AS count, SUM(coalesce(e.value, 0)) AS total
+        FROM backdated b JOIN submission_events e ON e.submission_id = b.submission_id
+        WHERE e.event != 'received' GROUP BY 1, 2, 3
+    """
+    # Take the outcomes out of the month they were counted in...
+    conn.execute(f"""
+        UPDATE kpi_counters AS k SET count = k.count - m.count, total = k.total - m.total
+        FROM ({outcome_events}) AS m
+        WHERE k.month = m.month AND k.lob = m.lob AND k.event = m.event
+    """)
+    conn.execute("""
+        UPDATE submission_events AS e
+        SET occurred_at = b.decided_at, value = julianday(b.decided_at) - julianday(s.received)
+        FROM backdated b JOIN submissions s ON s.id = b.submission_id
+        WHERE e.submission_id = b.submission_id AND e.event != 'received'
+    """)
+    # ...and into the month they happened in
+    conn.execute(f"""
+        INSERT INTO kpi_counters (month, lob, event, count, total)
+        SELECT * FROM ({outcome_events}) WHERE true
+        ON CONFLICT (month, lob, event) DO UPDATE SET count = count + excluded.count, total = total + excluded.total
+    """)
+    decision = "CASE s.status " + " ".join(f"WHEN '{s}' THEN '{d}'" for d, s in DECISION_STATUSES.items()) + " END"
+    conn.execute(f"""
+        INSERT INTO decisions (submission_id, decision, status, decided_at)
+        SELECT b.submission_id, {decision}, s.status, b.decided_at
+        FROM backdated b JOIN submissions s ON s.id = b.submission_id
+        WHERE {decision} IS NOT NULL
+    """)
+    conn.execute("DELETE FROM backdated")
+
+
+def meta_value(key):
+    return get_connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+
+def bump_meta(conn, key):
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _bump_version(conn):
+    bump_meta(conn, "data_version")
+
+
+def data_version():
+    """Counter bumped by every write, used to key cached query results."""
+    return meta_value("data_version")
+
+
+def set_template_match(conn, broker, lob):
+    """Flag a broker's submissions for one LOB as covered by a mapping template."""
+    changed = conn.execute(
+        "UPDATE submissions SET template_match = 1 WHERE broker = ? AND lob = ? AND template_match = 0",
+        (broker, lob),
+    ).rowcount
+    if changed:
+        _bump_version(conn)
+
+
+def record_decision(submission_id, decision):
+    """Apply a triage decision to one submission and log it."""
+    return record_decisions([submission_id], decision)
+
+
+def record_decisions(submission_ids, decision):
+    """Apply one decision to many submissions in a single transaction, logging each.
+
+    Submissions that are missing or no longer in a status the decision
+    applies to are skipped. Returns ``{"applied": [...], "failed": {id:
+    reason}, "seconds": ...}``.
+    """
+    status = DECISION_STATUSES[decision]
+    sources = DECISION_SOURCES[decision]
+    submission_ids = list(dict.fromkeys(submission_ids))
+    clause, params = _ids_clause(submission_ids)
+    # "+status" keeps the planner on ID lookups rather than a status index scan
+    source_clause, source_params = _in_clause("+status", sources)
+    started = time.perf_counter()
+    conn = get_connection()
+    with conn:
+        # One statement moves every eligible submission; the triggers keep
+        # the rollups and events in step row by row
+        applied = {
+            item_id for (item_id,) in conn.execute(
+                f"UPDATE submissions SET status = ? WHERE {clause} AND {source_clause} RETURNING id",
+                [status, *params, *source_params],
+            ).fetchall()
+        }
+        current = dict(conn.execute(f"SELECT id, status FROM submissions WHERE {clause}", params).fetchall())
+        decided_at = _ts(datetime.now())
+        conn.executemany(
+            "INSERT INTO decisions (submission_id, decision, status, decided_at) VALUES (?, ?, ?, ?)",
+            [(item_id, decision, status, decided_at) for item_id in submission_ids if item_id in applied],
+        )
+        if applied:
+            _bump_version(conn)
+
+    failed = {
+        item_id: f"status is {current[item_id]}" if item_id in current else "not found"
+        for item_id in submission_ids if item_id not in applied
+    }
+    return {
+        "applied": [item_id for item_id in submission_ids if item_id in applied],
+        "failed": failed,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def open_deadlines():
+    """``(id, deadline)`` of every open submission that has a deadline."""
+    where, params = _in_clause("status", OPEN_STATUSES)
+    return get_connection().execute(
+        f"SELECT id, deadline FROM submissions WHERE {where} AND deadline IS NOT NULL", params
+    ).fetchall()
+
+
+def last_event_id():
+    return get_connection().execute("SELECT COALESCE(MAX(id), 0) FROM submission_events").fetchone()[0]
+
+
+def received_since(event_id):
+    """``(event id, submission id, deadline)`` for submissions with a deadline received after ``event_id``."""
+    return get_connection().execute(
+        """
+        SELECT e.id, s.id, s.deadline
+        FROM submission_events e JOIN submissions s ON s.id = e.submission_id
+        WHERE e.id > ? AND e.event = 'received' AND s.deadline IS NOT NULL
+        ORDER BY e.id
+        """,
+        (event_id,),
+    ).fetchall()
+
+
+def record_sla_alerts(alerts, now):
+    """Log ``(id, band, deadline)`` alerts for submissions still open and tighten their urgency.
+
+    A negative band marks an overdue submission, which stays in band 0.
+    Returns the number of alerts logged.
+    """
+    conn = get_connection()
+    clause, params = _ids_clause([submission_id for submission_id, _, _ in alerts])
+    status_clause, status_params = _in_clause("+status", OPEN_STATUSES)
+    still_open = {
+        submission_id for (submission_id,) in conn.execute(
+            f"SELECT id FROM submissions WHERE {clause} AND {status_clause}", params + status_params
+        )
+    }
+    alerts = [alert for alert in alerts if alert[0] in still_open]
+    if not alerts:
+        return 0
+
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO sla_alerts (submission_id, band, deadline, raised_at) VALUES (?, ?, ?, ?)",
+            [(submission_id, band, _ts(deadline), _ts(now)) for submission_id, band, deadline in alerts],
+        )
+        moved = 0
+        for submission_id, band, _ in alerts:
+            band = max(band, 0)
+            moved += conn.execute(
+                "UPDATE submissions SET urgency = ? WHERE id = ? AND urgency > ?", (band, submission_id, band)
+            ).rowcount
+        if moved:
+            _bump_version(conn)
+    return len(alerts)
+
+
+def query_sla_alerts(since):
+    """Alerts raised since ``since`` for submissions that are still open, newest first."""
+    where, params = _in_clause("s.status", OPEN_STATUSES)
+    return _read(
+        f"""
+        SELECT a.submission_id, s.client, s.broker, s.lob, s.status, a.band, a.deadline, a.raised_at
+        FROM sla_alerts a JOIN submissions s ON s.id = a.submission_id
+        WHERE a.raised_at >= ? AND {where}
+        ORDER BY a.raised_at DESC, a.band
+        """,
+        [_ts(since), *params],
+        parse_dates=("deadline", "raised_at"),
+    )
+
+
+def _in_clause(column, values):
+    return f"{column} IN ({', '.join('?' * len(values))})", list(values)
+
+
+def _read(sql, params, parse_dates=("received",)):
+    return pd.read_sql_query(sql, get_connection(), params=params, parse_dates=list(parse_dates))
+
+
+def _ids_clause(ids):
+    # One JSON parameter rather than one per ID, so selections of any size fit
+    return "id IN (SELECT value FROM json_each(?))", [json.dumps(list(ids))]
+
+
+def _inbox_filter(lob, ids=None):
+    where, params = "status = ?", [INBOX_STATUS]
+    if lob:
+        where += " AND lob = ?"
+        params.append(lob)
+    if ids is not None:
+        clause, values = _ids_clause(ids)
+        where += f" AND {clause}"
+        params.extend(values)
+    return where, params
+
+
+def _backlog_filter(status, since, ids=None):
+    where, params = _in_clause("status", [status] if status else BACKLOG_STATUSES)
+    if since is not None:
+        where += " AND received >= ?"
+        params.append(_ts(since))
+    if ids is not None:
+        clause, values = _ids_clause(ids)
+        where += f" AND {clause}"
+        params.extend(values)
+    return where, params
+
+
+def _page(sql, params, limit, offset):
+    if limit is None:
+        return sql, params
+    return sql + " LIMIT ? OFFSET ?", params + [limit, offset]
+
+
+def _count(where, params):
+    return get_connection().execute(
+        f"SELECT COUNT(*) FROM submissions WHERE {where}", params
+    ).fetchone()[0]
+
+
+def _ids(where, params):
+    return [
+        item_id for (item_id,) in get_connection().execute(
+            f"SELECT id FROM submissions WHERE {where} ORDER BY received DESC, id DESC", params
+        )
+    ]
+
+
+def query_inbox(lob=None, limit=None, offset=0, ids=None):
+    """New submissions waiting in the inbox, newest first, optionally only those in ``ids``."""
+    where, params = _inbox_filter(lob, ids)
+    sql = f"""
+        SELECT id, client, broker, lob AS type, received, status, source
+        FROM submissions WHERE {where}
+        ORDER BY received DESC, id DESC
+    """
+    return _read(*_page(sql, params, limit, offset))
+
+
+def count_inbox(lob=None):
+    return _count(*_inbox_filter(lob))
+
+
+def inbox_ids(lob=None):
+    return _ids(*_inbox_filter(lob))
+
+
+def query_backlog(status=None, since=None, limit=None, offset=0, ids=None):
+    """Backlog submissions, optionally narrowed to one status, a received cut-off and ``ids``."""
+    where, params = _backlog_filter(status, since, ids)
+    sql = f"""
+        SELECT id, client, broker, lob AS type, received, status, notes
+        FROM submissions WHERE {where}
+        ORDER BY received DESC, id DESC
+    """
+    return _read(*_page(sql, params, limit, offset))
+
+
+def count_backlog(status=None, since=None):
+    return _count(*_backlog_filter(status, since))
+
+
+def backlog_ids(status=None, since=None):
+    return _ids(*_backlog_filter(status, since))
+
+
+def _triage_filter(lob, brokers, recommendations):
+    # The status is written into the SQL so the planner can match the
+    # partial priority index, which it cannot do for a bound parameter
+    where, params = f"status = '{TRIAGE_STATUS}'", []
+    if lob:
+        where += " AND lob = ?"
+        params.append(lob)
+    if brokers:
+        clause, values = _in_clause("broker", brokers)
+        where += f" AND {clause}"
+        params.extend(values)
+    if recommendations:
+        clause, values = _in_clause("ai_recommendation", recommendations)
+        where += f" AND {clause}"
+        params.extend(values)
+    return where, params
+
+
+def query_triage(lob=None, brokers=(), recommendations=(), limit=None, offset=0):
+    """Submissions in the triage queue matching the page filters, in priority order.
+
+    The order comes from the ``idx_triage_priority`` index, so a page costs
+    ``limit + offset`` index steps however long the queue is.
+    """
+    where, params = _triage_filter(lob, brokers, recommendations)
+    sql = f"""
+        SELECT id, client, broker, lob, deadline, risk_appetite, estimated_premium,
+               ai_recommendation, confidence, template_match, urgency
+        FROM submissions INDEXED BY idx_triage_priority
+        WHERE {where}
+        ORDER BY {TRIAGE_ORDER}
+    """
+    df = _read(*_page(sql, params, limit, offset), parse_dates=("deadline",))
+    # Submissions resumed from the backlog may have no deadline yet; theirs stays missing
+    df["days_remaining"] = (df["deadline"] - datetime.now()).dt.days.clip(lower=1).astype("Int64")
+    df["template_match"] = df["template_match"].astype(bool)
+    return df.drop(columns="deadline")
+
+
+def triage_ids(lob=None, brokers=(), recommendations=()):
+    """IDs of the triage submissions matching the page filters, in priority order."""
+    where, params = _triage_filter(lob, brokers, recommendations)
+    return [
+        item_id for (item_id,) in get_connection().execute(
+            f"SELECT id FROM submissions INDEXED BY idx_triage_priority WHERE {where} ORDER BY {TRIAGE_ORDER}",
+            params,
+        )
+    ]
+
+
+def triage_matching(ids, lob=None, brokers=(), recommendations=()):
+    """Those of ``ids`` still in the triage queue and matching the page filters."""
+    if not ids:
+        return set()
+    where, params = _triage_filter(lob, brokers, recommendations)
+    # CROSS JOIN keeps the ID list as the outer loop, so each ID is one primary-key lookup
+    return {
+        item_id for (item_id,) in get_connection().execute(
+            f"SELECT s.id FROM json_each(?) AS j CROSS JOIN submissions AS s ON s.id = j.value WHERE {where}",
+            [json.dumps(list(ids)), *params],
+        )
+    }
+
+
+def triage_summary(lob=None, brokers=(), recommendations=()):
+    """Submission count and premium per AI recommendation and broker for the filtered queue."""
+    where, params = _triage_filter(lob, brokers, recommendations)
+    return pd.read_sql_query(
+        f"""
+        SELECT ai_recommendation, broker, COUNT(*) AS submissions,
+               COALESCE(SUM(estimated_premium), 0) AS premium
+        FROM submissions WHERE {where}
+        GROUP BY ai_recommendation, broker
+        """,
+        get_connection(),
+        params=params,
+    )
+
+
+def query_rollups(since=None, lobs=()):
+    """Daily rollups by LOB and broker for the dashboard, from ``since`` onwards."""
+    sql = f"SELECT day, lob, broker, {', '.join(ROLLUP_MEASURES)} FROM submission_rollups WHERE received > 0"
+    params = []
+    if since is not None:
+        sql += " AND day >= ?"
+        params.append(since.strftime("%Y-%m-%d"))
+    if lobs:
+        clause, values = _in_clause("lob", lobs)
+        sql += f" AND {clause}"
+        params.extend(values)
+    return _read(sql, params, parse_dates=("day",))
+
+
+def query_kpi_counters(since=None, lobs=()):
+    """Running KPI counters per month, LOB and event type."""
+    sql = "SELECT month, lob, event, count, total FROM kpi_counters WHERE 1 = 1"
+    params = []
+    if since is not None:
+        sql += " AND month >= ?"
+        params.append(since.strftime("%Y-%m"))
+    if lobs:
+        clause, values = _in_clause("lob", lobs)
+        sql += f" AND {clause}"
+        params.extend(values)
+    return _read(sql, params, parse_dates=())
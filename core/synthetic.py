@@ -0,0 +1,347 @@
+"""Seeded synthetic submissions for demos and load tests.
+
+Every column is drawn for all rows at once with NumPy from a generator
+seeded by the caller, so the same seed always produces the same book and a
+million rows take a second or two. The draws follow the profiles below:
+each LOB has its own share of the book, premium distribution, deadline
+lead time and acceptance rate, and each broker its own share, strongest
+lines and rate of template-matched schedules. Submissions arrive on
+working days more than at weekends, mostly in office hours, and how far a
+submission has got depends on how long ago it arrived.
+
+``generate_submissions`` draws a whole book; ``generate_inbox``,
+``generate_triage``, ``generate_backlog`` and ``generate_history`` draw
+just one part of it. ``load`` inserts any of them into the store, dating
+past decisions when they were made rather than when they were loaded::
+
+    python -m core.synthetic --rows 1000000 --seed 7 --months 24
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core import store
+
+# Share of submissions, median premium and its log-normal spread, days from
+# receipt to deadline, and share of decisions that accept, per LOB
+LOB_PROFILES = {
+    "Property D&F": {"share": 0.30, "premium": 250_000, "sigma": 0.6, "lead_days": (10, 30), "accept_rate": 0.55},
+    "Professional Indemnity": {"share": 0.20, "premium": 120_000, "sigma": 0.5, "lead_days": (7, 21), "accept_rate": 0.60},
+    "Cyber": {"share": 0.25, "premium": 90_000, "sigma": 0.7, "lead_days": (5, 14), "accept_rate": 0.45},
+    "Marine Cargo": {"share": 0.15, "premium": 150_000, "sigma": 0.5, "lead_days": (7, 21), "accept_rate": 0.50},
+    "Energy": {"share": 0.10, "premium": 600_000, "sigma": 0.8, "lead_days": (14, 45), "accept_rate": 0.40},
+}
+
+# Share of submissions, share with a template-matched schedule, and the
+# lines each broker places most with us
+BROKER_PROFILES = {
+    "Marsh": {"share": 0.24, "template_rate": 0.80, "strong": ("Property D&F", "Energy")},
+    "Aon": {"share": 0.22, "template_rate": 0.75, "strong": ("Cyber", "Professional Indemnity")},
+    "WTW": {"share": 0.18, "template_rate": 0.70, "strong": ("Property D&F", "Marine Cargo")},
+    "Howden": {"share": 0.12, "template_rate": 0.65, "strong": ("Cyber",)},
+    "BMS": {"share": 0.08, "template_rate": 0.55, "strong": ("Energy", "Marine Cargo")},
+    "Miller": {"share": 0.08, "template_rate": 0.50, "strong": ("Marine Cargo",)},
+    "Gallagher": {"share": 0.08, "template_rate": 0.60, "strong": ("Professional Indemnity",)},
+}
+
+# How much more of a broker's business goes to its strongest lines
+STRONG_LINE_WEIGHT = 2.5
+
+SOURCES = {"Email": 0.55, "Broker Portal": 0.35, "API": 0.10}
+
+# Relative arrivals on a weekend day, against 1 on a working day
+WEEKEND_WEIGHT = 0.15
+
+# Hour of arrival: mean and spread, clipped to the working day
+ARRIVAL_HOUR = (12.5, 2.5, 7, 20)
+
+# Days from receipt to decision: a gamma distribution's shape and scale
+TURNAROUND = (2.0, 1.5)
+
+# Status mix by days since receipt, as (upper bound in days, shares).
+# "decided" rows are accepted or declined at their LOB's acceptance rate.
+STATUS_BY_AGE = [
+    (2, {store.INBOX_STATUS: 0.55, store.TRIAGE_STATUS: 0.40, "decided": 0.05}),
+    (14, {
+        store.INBOX_STATUS: 0.02, store.TRIAGE_STATUS: 0.45, "Awaiting Info": 0.06,
+        "Duplicate Check": 0.04, "Needs Review": 0.05, "decided": 0.38,
+    }),
+    (30, {
+        store.TRIAGE_STATUS: 0.12, "Awaiting Info": 0.05, "Duplicate Check": 0.02,
+        "Needs Review": 0.04, store.ARCHIVED_STATUS: 0.02, "decided": 0.75,
+    }),
+    (None, {store.ARCHIVED_STATUS: 0.08, "decided": 0.92}),
+]
+
+# Days of arrivals covered by the inbox, triage and backlog generators
+INBOX_DAYS = 2
+TRIAGE_DAYS = 14
+BACKLOG_DAYS = 30
+
+BACKLOG_NOTES = {
+    "Awaiting Info": ["Missing values for several locations", "Awaiting loss history from broker", "Schedule incomplete"],
+    "Duplicate Check": ["Similar submission identified", "Checking for potential duplicate"],
+    "Needs Review": ["Awaiting additional info from broker", "Outside delegated authority", "Referred to senior underwriter"],
+}
+
+CLIENT_PREFIXES = [
+    "Northern", "Atlantic", "Summit", "Crown", "Harbour", "Metro", "Global", "Regional",
+    "Apex", "Pioneer", "Sterling", "Meridian", "Castle", "Beacon", "Highland", "Thames",
+]
+CLIENT_TRADES = {
+    "Property D&F": ["Property Holdings", "Estates", "Hotels Group", "Retail Parks"],
+    "Professional Indemnity": ["Architects", "Consulting", "Legal Partners", "Engineering"],
+    "Cyber": ["Data Centres", "Software", "Payments", "Tech Services"],
+    "Marine Cargo": ["Shipping", "Freight", "Logistics", "Ports"],
+    "Energy": ["Offshore Services", "Power", "Renewables", "Petroleum"],
+}
+CLIENT_SUFFIXES = ["Ltd", "plc", "Group", "LLP", "Inc"]
+
+DECIDED_STATUSES = (store.DECISION_STATUSES["Accept"], store.DECISION_STATUSES["Decline"])
+
+_LOBS = list(LOB_PROFILES)
+_BROKERS = list(BROKER_PROFILES)
+_SECOND = np.timedelta64(1, "s")
+_DAY = np.timedelta64(1, "D")
+
+
+def _rng(seed, stream):
+    # Each generator draws from its own stream, so the parts of a book are independent
+    return np.random.default_rng([seed, stream])
+
+
+def _weights(shares):
+    p = np.asarray(list(shares), dtype=float)
+    return p / p.sum()
+
+
+def _choose(rng, cumulative, rows):
+    # One categorical draw per row from that row's cumulative probabilities
+    u = rng.random(len(rows))
+    return np.minimum((u[:, None] >= cumulative[rows]).sum(axis=1), cumulative.shape[1] - 1)
+
+
+def _broker_matrix():
+    shares = np.array([p["share"] for p in BROKER_PROFILES.values()])
+    weights = np.array([
+        [shares[b] * (STRONG_LINE_WEIGHT if lob in p["strong"] else 1) for b, p in enumerate(BROKER_PROFILES.values())]
+        for lob in _LOBS
+    ])
+    return np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+
+
+def _client_names(trades):
+    return [f"{prefix} {trade} {suffix}" for prefix in CLIENT_PREFIXES for trade in trades for suffix in CLIENT_SUFFIXES]
+
+
+# Every client name, grouped by LOB in ``LOB_PROFILES`` order
+CLIENTS = [name for lob in _LOBS for name in _client_names(CLIENT_TRADES[lob])]
+_CLIENTS_PER_LOB = len(CLIENT_PREFIXES) * len(CLIENT_SUFFIXES) * len(next(iter(CLIENT_TRADES.values())))
+
+
+def _timestamps(values):
+    # The store's sortable local-time format, "YYYY-MM-DD HH:MM:SS": ISO
+    # strings with the "T" overwritten in place
+    text = np.datetime_as_string(values, unit="s").astype("<U19")
+    if len(text):
+        text.view(np.uint32).reshape(len(text), -1)[:, 10] = ord(" ")
+    return text
+
+
+def _draw(rng, n, now, days):
+    """Columns shared by every part of the book, for ``n`` submissions received over ``days`` days."""
+    now = np.datetime64(now, "s")
+    today = now.astype("datetime64[D]")
+
+    lob = rng.choice(len(_LOBS), size=n, p=_weights(p["share"] for p in LOB_PROFILES.values()))
+    broker = _choose(rng, _broker_matrix(), lob)
+
+    # Arrival day, weekends quieter, then hour of the day
+    calendar = today - np.arange(max(int(np.ceil(days)), 1))
+    weekend = np.is_busday(calendar, weekmask="0000011")
+    day = rng.choice(len(calendar), size=n, p=_weights(np.where(weekend, WEEKEND_WEIGHT, 1.0)))
+    mean, spread, earliest, latest = ARRIVAL_HOUR
+    seconds = (np.clip(rng.normal(mean, spread, n), earliest, latest) * 3600).astype(np.int64)
+    received = np.minimum(calendar[day].astype("datetime64[s]") + seconds * _SECOND, now - 60 * _SECOND)
+
+    profiles = list(LOB_PROFILES.values())
+    lead_low = np.array([p["lead_days"][0] for p in profiles])[lob]
+    lead_high = np.array([p["lead_days"][1] for p in profiles])[lob]
+    deadline = received + rng.integers(lead_low, lead_high + 1) * _DAY
+
+    median = np.array([p["premium"] for p in profiles])[lob]
+    sigma = np.array([p["sigma"] for p in profiles])[lob]
+    premium = np.maximum(np.round(rng.lognormal(np.log(median), sigma) / 1000), 10).astype(np.int64) * 1000
+
+    template_rate = np.array([p["template_rate"] for p in BROKER_PROFILES.values()])[broker]
+
+    return {
+        "lob": lob,
+        "broker": broker,
+        "client": lob * _CLIENTS_PER_LOB + rng.integers(0, _CLIENTS_PER_LOB, n),
+        "source": rng.choice(len(SOURCES), size=n, p=_weights(SOURCES.values())),
+        "received": received,
+        "deadline": deadline,
+        "estimated_premium": premium,
+        "template_match": (rng.random(n) < template_rate).astype(np.int64),
+        "age_days": (now - received) / _DAY,
+    }
+
+
+def _decide(rng, draw, decided):
+    # Accept or decline at each LOB's rate; returns the statuses for ``decided`` rows
+    rate = np.array([p["accept_rate"] for p in LOB_PROFILES.values()])[draw["lob"][decided]]
+    return np.where(rng.random(len(rate)) < rate, *DECIDED_STATUSES)
+
+
+def _frame(rng, draw, status, now, id_prefix, start):
+    n = len(status)
+    now = np.datetime64(now, "s")
+
+    # Closed submissions were decided some days after they arrived, never later than now
+    closed = np.isin(status, [*DECIDED_STATUSES, store.ARCHIVED_STATUS])
+    shape, scale = TURNAROUND
+    turnaround = (rng.gamma(shape, scale, n) * 86400).astype(np.int64) * _SECOND
+    decided_at = np.where(closed, np.minimum(draw["received"] + turnaround, now - 30 * _SECOND), np.datetime64("NaT"))
+
+    notes = np.full(n, None, dtype=object)
+    for backlog_status, options in BACKLOG_NOTES.items():
+        rows = status == backlog_status
+        notes[rows] = np.array(options, dtype=object)[rng.integers(0, len(options), rows.sum())]
+
+    # Text columns are categoricals over a few hundred values, so a book of
+    # millions holds integer codes rather than millions of strings
+    ids = np.char.add(f"{id_prefix}-", np.char.zfill(np.arange(start, start + n).astype(str), 4))
+    return pd.DataFrame({
+        "id": ids,
+        "client": pd.Categorical.from_codes(draw["client"], CLIENTS),
+        "broker": pd.Categorical.from_codes(draw["broker"], _BROKERS),
+        "lob": pd.Categorical.from_codes(draw["lob"], _LOBS),
+        "status": pd.Categorical(status),
+        "source": pd.Categorical.from_codes(draw["source"], list(SOURCES)),
+        "received": draw["received"],
+        "deadline": draw["deadline"],
+        "estimated_premium": draw["estimated_premium"],
+        "template_match": draw["template_match"],
+        "notes": pd.Categorical(notes),
+        "decided_at": decided_at,
+    })
+
+
+def generate_submissions(n, seed=0, now=None, months=12, id_prefix="SYN", start=1):
+    """A book of ``n`` submissions received over the last ``months`` months, each as far along as its age suggests.
+
+    Returns a DataFrame of store columns plus ``decided_at`` for closed
+    submissions, with timestamps as datetimes; ``records`` turns it into
+    store rows. Appetite scores are left for ``core.scoring``.
+    """
+    now = now or datetime.now()
+    rng = _rng(seed, 0)
+    draw = _draw(rng, n, now, months * 30.44)
+
+    statuses = sorted({s for _, shares in STATUS_BY_AGE for s in shares})
+    cumulative = np.cumsum([[shares.get(s, 0) for s in statuses] for _, shares in STATUS_BY_AGE], axis=1)
+    bounds = [bound for bound, _ in STATUS_BY_AGE[:-1]]
+    band = np.searchsorted(bounds, draw["age_days"], side="right")
+    status = np.array(statuses, dtype=object)[_choose(rng, cumulative, band)]
+
+    decided = status == "decided"
+    status[decided] = _decide(rng, draw, decided)
+    return _frame(rng, draw, status, now, id_prefix, start)
+
+
+def generate_inbox(n, seed=0, now=None, id_prefix="INBOX", start=1):
+    """``n`` new submissions received over the last ``INBOX_DAYS`` days."""
+    now = now or datetime.now()
+    rng = _rng(seed, 1)
+    draw = _draw(rng, n, now, INBOX_DAYS)
+    return _frame(rng, draw, np.full(n, store.INBOX_STATUS, dtype=object), now, id_prefix, start)
+
+
+def generate_triage(n, seed=0, now=None, id_prefix="TRIAGE", start=1):
+    """``n`` submissions waiting in the triage queue, received over the last ``TRIAGE_DAYS`` days."""
+    now = now or datetime.now()
+    rng = _rng(seed, 2)
+    draw = _draw(rng, n, now, TRIAGE_DAYS)
+    return _frame(rng, draw, np.full(n, store.TRIAGE_STATUS, dtype=object), now, id_prefix, start)
+
+
+def generate_backlog(n, seed=0, now=None, id_prefix="BACKLOG", start=1):
+    """``n`` backlog submissions, each with a note, received over the last ``BACKLOG_DAYS`` days."""
+    now = now or datetime.now()
+    rng = _rng(seed, 3)
+    draw = _draw(rng, n, now, BACKLOG_DAYS)
+    shares = STATUS_BY_AGE[1][1]
+    weights = _weights(shares[s] for s in store.BACKLOG_STATUSES)
+    status = np.array(store.BACKLOG_STATUSES, dtype=object)[rng.choice(len(weights), size=n, p=weights)]
+    return _frame(rng, draw, status, now, id_prefix, start)
+
+
+def generate_history(n, seed=0, now=None, months=12, id_prefix="HIST", start=1):
+    """``n`` decided submissions received over the last ``months`` months, for the dashboard's history."""
+    now = now or datetime.now()
+    rng = _rng(seed, 4)
+    draw = _draw(rng, n, now, months * 30.44)
+    status = _decide(rng, draw, np.ones(n, dtype=bool)).astype(object)
+    return _frame(rng, draw, status, now, id_prefix, start)
+
+
+def _column(series):
+    # Plain Python values, timestamps in the store's format and None for missing
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = _timestamps(series.to_numpy()).astype(object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    if series.hasnans:
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
+
+
+def records(frame):
+    """Store rows, as ``store.insert_submissions`` takes them, for a generated frame."""
+    columns = [c for c in frame.columns if c in store.SUBMISSION_COLUMNS]
+    for values in zip(*(_column(frame[c]) for c in columns)):
+        yield dict(zip(columns, values))
+
+
+def load(conn, frame):
+    """Insert generated submissions inside the caller's transaction; returns the number added.
+
+    Closed submissions have their decisions dated at ``decided_at``. IDs
+    already in the store are skipped, and so are their outcomes, so loading
+    the same book twice adds nothing.
+    """
+    before = store.last_rowid(conn)
+    added = store.insert_submissions(conn, records(frame))
+    inserted = store.ids_inserted_after(conn, before) if added else set()
+    closed = frame[frame["decided_at"].notna() & frame["id"].isin(inserted)]
+    store.backdate_outcomes(conn, zip(closed["id"], _column(closed["decided_at"])))
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--months", type=int, default=12, help="months of history to spread the book over")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    frame = generate_submissions(args.rows, seed=args.seed, months=args.months)
+    generated = time.perf_counter() - started
+    conn = store.get_connection()
+    with conn:
+        added = load(conn, frame)
+    print(
+        f"Generated {len(frame):,} submissions in {generated:.1f}s and loaded {added:,} "
+        f"in {time.perf_counter() - started - generated:.1f}s into {store.DB_PATH}"
+    )
+    print(frame["status"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Field-mapping templates for broker spreadsheets.
+
+A template maps a broker's column headers onto our target fields for one
+broker and line of business. Incoming headers are normalised and
+fingerprinted; the fingerprint finds an exact template through a dict, and
+an inverted index from header to templates scores partial matches without
+trying every template in turn.
+
+Templates compile into a ``MappingPlan`` that renames, selects and converts
+a whole DataFrame in one vectorised pass, so a 50k-row schedule maps in
+milliseconds. Compiled plans are cached per template.
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+import streamlit as st
+
+from core import store
+
+# Target fields and how their values are converted
+TARGET_FIELDS = {
+    "Insured": "text",
+    "TIV": "number",
+    "Address": "text",
+    "Building Type": "text",
+    "Building Use": "text",
+    "Policy Limit": "number",
+    "Industry": "text",
+    "Policy End Date": "date",
+    "Payment Currency": "text",
+}
+
+# Header spellings brokers commonly use for each target field
+SYNONYMS = {
+    "Insured": ["client name", "insured", "insured name", "named insured", "client"],
+    "TIV": ["property value", "tiv", "total insured value", "sum insured", "total value"],
+    "Address": ["location", "address", "site address", "risk address"],
+    "Building Type": ["construction", "construction type", "building type"],
+    "Building Use": ["occupancy", "building use", "occupancy type"],
+    "Policy Limit": ["limit", "policy limit", "limit of indemnity", "limit of liability"],
+    "Industry": ["profession", "industry", "sector", "business description"],
+    "Policy End Date": ["expiry", "expiry date", "policy end date", "renewal date"],
+    "Payment Currency": ["currency", "ccy", "payment currency"],
+}
+
+# Headers of the schedule attached to a submission, until documents are
+# linked to submissions in the store
+SAMPLE_HEADERS = {
+    "Property D&F": ["Client Name", "Property Value", "Location", "Construction", "Occupancy"],
+    "default": ["Client Name", "Limit", "Profession", "Expiry", "Currency"],
+}
+
+# Share of headers a template must have in common to count as a partial match
+MIN_OVERLAP = 0.6
+
+_ALIASES = {alias: target for target, aliases in SYNONYMS.items() for alias in aliases}
+
+
+def normalize_header(header):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(header).lower()).split())
+
+
+def signature(headers):
+    """Order-insensitive fingerprint of a set of headers."""
+    normalized = sorted({normalize_header(h) for h in headers})
+    return hashlib.sha1("\x1f".join(normalized).encode()).hexdigest()
+
+
+def sample_headers(lob):
+    return SAMPLE_HEADERS.get(lob, SAMPLE_HEADERS["default"])
+
+
+def suggest_mapping(headers):
+    """Best-guess mapping for headers with no template, with a confidence per field."""
+    mapping, confidence = {}, {}
+    for header in headers:
+        key = normalize_header(header)
+        if key in _ALIASES:
+            mapping[header], confidence[header] = _ALIASES[key], "High ✓"
+            continue
+        close = difflib.get_close_matches(key, _ALIASES, n=1, cutoff=0.75)
+        if close:
+            mapping[header], confidence[header] = _ALIASES[close[0]], "Medium !"
+    return mapping, confidence
+
+
+def _blank(column):
+    return column.isna() | column.astype("string").str.strip().eq("").fillna(False)
+
+
+@dataclass(frozen=True)
+class MappingPlan:
+    """Compiled column mapping: ``(normalised source header, target field)`` pairs.
+
+    Headers mapped to the same field fill it in order, the first non-blank
+    value winning.
+    """
+
+    pairs: tuple
+
+    def apply(self, df):
+        by_header = {normalize_header(c): c for c in df.columns}
+        sources = {}
+        for src, target in self.pairs:
+            if src in by_header:
+                sources.setdefault(target, []).append(by_header[src])
+
+        out = {}
+        for target, columns in sources.items():
+            if len(columns) == 1:
+                column = df[columns[0]]
+            else:
+                # Several headers mapped to one field fill it in mapping order: the first non-blank value wins
+                column = df[columns[0]]
+                for source in columns[1:]:
+                    column = column.mask(_blank(column), df[source])
+            kind = TARGET_FIELDS.get(target)
+            if kind == "number" and not pd.api.types.is_numeric_dtype(column):
+                cleaned = column.astype("string").str.replace(r"[^0-9.\-]", "", regex=True)
+                column = pd.to_numeric(cleaned, errors="coerce")
+            elif kind == "date":
+                column = pd.to_datetime(column, errors="coerce", dayfirst=True)
+            out[target] = column
+        return pd.DataFrame(out, index=df.index, copy=False)
+
+
+@dataclass(frozen=True)
+class Template:
+    id: int
+    name: str
+    broker: str
+    lob: str
+    mapping: tuple
+
+    @property
+    def headers(self):
+        return [src for src, _ in self.mapping]
+
+    def compile(self):
+        return _compile(self.mapping)
+
+
+@lru_cache(maxsize=256)
+def _compile(mapping):
+    return MappingPlan(tuple((normalize_header(src), target) for src, target in mapping))
+
+
+class TemplateIndex:
+    """In-memory lookup structures over the ``mapping_templates`` table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._templates = {}
+        self._by_signature = {}
+        self._by_header = {}
+
+    def refresh(self):
+        version = store.meta_value("templates_version")
+        if version == self._version:
+            return
+        with self._lock:
+            rows = store.get_connection().execute(
+                "SELECT id, name, broker, lob, mapping FROM mapping_templates"
+            ).fetchall()
+            templates, by_signature, by_header = {}, {}, {}
+            for template_id, name, broker, lob, mapping in rows:
+                template = Template(template_id, name, broker, lob, tuple(map(tuple, json.loads(mapping))))
+                templates[template_id] = template
+                by_signature.setdefault(signature(template.headers), []).append(template_id)
+                for header in {normalize_header(h) for h in template.headers}:
+                    by_header.setdefault(header, []).append(template_id)
+            self._templates, self._by_signature, self._by_header = templates, by_signature, by_header
+            self._version = version
+
+    def _eligible(self, ids, broker, lob):
+        # Templates belong to a broker and LOB; without those, any template will do
+        return [
+            i for i in ids
+            if (broker is None or self._templates[i].broker == broker)
+            and (lob is None or self._templates[i].lob == lob)
+        ]
+
+    def match(self, headers, broker=None, lob=None):
+        """Template for these headers, or ``None``; exact fingerprints win over partial overlaps."""
+        exact = self._eligible(self._by_signature.get(signature(headers), ()), broker, lob)
+        if exact:
+            return self._templates[max(exact)]
+
+        normalized = {normalize_header(h) for h in headers}
+        shared = Counter(i for h in normalized for i in self._by_header.get(h, ()))
+        best, best_score = None, MIN_OVERLAP
+        for i in self._eligible(shared, broker, lob):
+            union = normalized | {normalize_header(h) for h in self._templates[i].headers}
+            score = shared[i] / len(union)
+            if score > best_score or (score == best_score and (best is None or i > best)):
+                best, best_score = i, score
+        return self._templates[best] if best is not None else None
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_index(db_path):
+    index = TemplateIndex()
+    _seed_templates()
+    return index
+
+
+def _seed_templates():
+    # Start with a template for every broker and LOB already flagged as matched
+    conn = store.get_connection()
+    if conn.execute("SELECT COUNT(*) FROM mapping_templates").fetchone()[0]:
+        return
+    pairs = conn.execute(
+        "SELECT DISTINCT broker, lob FROM submissions WHERE template_match = 1"
+    ).fetchall()
+    for broker, lob in pairs:
+        headers = sample_headers(lob)
+        save_template(broker, lob, suggest_mapping(headers)[0], flag_submissions=False)
+
+
+def get_index():
+    index = _shared_index(store.DB_PATH)
+    index.refresh()
+    return index
+
+
+def match(headers, broker=None, lob=None):
+    return get_index().match(headers, broker, lob)
+
+
+def save_template(broker, lob, mapping, name=None, flag_submissions=True):
+    """Store a broker + LOB template and mark that broker's submissions as matched."""
+    name = name or f"{broker} {lob} Template"
+    conn = store.get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO mapping_templates (name, broker, lob, signature, mapping, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (name, broker, lob, signature(mapping), json.dumps(list(mapping.items())),
+             datetime.now().isoformat(sep=" ", timespec="seconds")),
+        )
+        store.bump_meta(conn, "templates_version")
+        if flag_submissions:
+            store.set_template_match(conn, broker, lob)
+    return name
@@ -0,0 +1,19 @@
+"""Name normalisation shared by duplicate detection and sanctions screening.
+
+Kept free of heavy imports so screening can load without the duplicate
+index's MinHash machinery.
+"""
+
+import re
+
+# Legal suffixes that say nothing about which client it is
+LEGAL_SUFFIXES = {
+    "ltd", "limited", "inc", "incorporated", "co", "company", "corp",
+    "corporation", "llc", "llp", "plc", "sa", "ag", "gmbh", "the",
+}
+
+
+def normalize_name(name):
+    """Lower-case, drop punctuation and legal suffixes, collapse whitespace."""
+    words = re.sub(r"[^a-z0-9 ]+", " ", name.lower().replace("&", " and ")).split()
+    return " ".join(w for w in words if w not in LEGAL_SUFFIXES)
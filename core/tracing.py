@@ -0,0 +1,241 @@
+"""Stage timings for page runs, exported as Prometheus metrics.
+
+A page creates a ``Trace`` when it starts, marks each stage of interest as
+it reaches it (loading, aggregating, building figures, rendering rows and
+so on), and calls ``finish`` at the end. Marks are laps: each one closes
+the stage before it, so marking costs two clock reads and needs no change
+to the code between marks. Time spent in a stage more than once in a run
+is added up.
+
+Finished runs are recorded in a process-wide registry of histograms, one
+series per page and stage, which is written out in the Prometheus text
+format to ``METRICS_PATH`` (a node exporter textfile collector can pick it
+up) and, when ``HX_RENEW_METRICS_PORT`` is set, served at ``/metrics`` on
+that port. Users listed in ``HX_RENEW_ADMINS`` also get a diagnostics panel
+in the sidebar breaking the run down by stage.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+from core import store
+
+METRICS_PATH = os.environ.get("HX_RENEW_METRICS", os.path.join(store.DATA_DIR, "metrics.prom"))
+METRICS_PORT = int(os.environ.get("HX_RENEW_METRICS_PORT", 0))
+
+# E-mail addresses shown the diagnostics panel; "*" shows it to everyone
+ADMINS = {email.strip().lower() for email in os.environ.get("HX_RENEW_ADMINS", "").split(",") if email.strip()}
+
+# Histogram bucket bounds in seconds (the Prometheus client defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds between rewrites of the metrics file
+EXPORT_INTERVAL = 10
+
+# Runs kept per stage for the percentiles in the diagnostics panel
+RECENT_RUNS = 500
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def _labels(**labels):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped))
+
+
+class SpanRegistry:
+    """Histograms of page run and stage times since the server started."""
+
+    METRICS = {
+        "hx_renew_page_run_seconds": ("Time taken by a full run of each page.", ("page",)),
+        "hx_renew_stage_seconds": ("Time taken by each traced stage of a page run.", ("page", "stage")),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.METRICS}
+        self._recent = {}
+        self._exported = 0.0
+
+    def observe(self, page, stages, total):
+        """Record one run of ``page`` taking ``total`` seconds, ``stages`` mapping stage to seconds."""
+        with self._lock:
+            self._histograms["hx_renew_page_run_seconds"].setdefault((page,), _Histogram()).observe(total)
+            self._recent.setdefault((page, None), deque(maxlen=RECENT_RUNS)).append(total)
+            for stage, seconds in stages.items():
+                self._histograms["hx_renew_stage_seconds"].setdefault((page, stage), _Histogram()).observe(seconds)
+                self._recent.setdefault((page, stage), deque(maxlen=RECENT_RUNS)).append(seconds)
+
+    def summary(self, page):
+        """Count, mean and percentiles of the recent runs of ``page``, per stage; stage ``None`` is the whole run."""
+        with self._lock:
+            recent = {stage: sorted(times) for (p, stage), times in self._recent.items() if p == page}
+        return [
+            {
+                "stage": stage,
+                "runs": len(times),
+                "mean": sum(times) / len(times),
+                "p50": times[len(times) // 2],
+                "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+            }
+            for stage, times in recent.items()
+        ]
+
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (help_text, label_names) in self.METRICS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, histogram in sorted(self._histograms[name].items(), key=lambda item: tuple(map(str, item[0]))):
+                    labels = dict(zip(label_names, key))
+                    cumulative = 0
+                    for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}")
+                    lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=METRICS_PATH, force=False):
+        """Rewrite the metrics file if ``EXPORT_INTERVAL`` has passed since the last write."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._exported < EXPORT_INTERVAL:
+                return
+            self._exported = now
+        # Written aside and renamed so a scrape never reads half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError:
+            # Metrics are best effort; the page carries on without them
+            pass
+
+
+def _serve(registry, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_registry():
+    """The process-wide registry, serving ``/metrics`` if a port is configured."""
+    registry = SpanRegistry()
+    if METRICS_PORT:
+        try:
+            _serve(registry, METRICS_PORT)
+        except OSError:
+            # Port taken, e.g. by the process this one replaced; the file export still runs
+            pass
+    return registry
+
+
+def is_admin():
+    """Whether the signed-in user may see the diagnostics panel."""
+    if "*" in ADMINS:
+        return True
+    email = st.user.get("email")
+    return bool(email) and email.lower() in ADMINS
+
+
+class Trace:
+    """Stage timings for one run of a page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.stages = {}
+        self._stage = None
+        self._started = self._mark = time.perf_counter()
+
+    def stage(self, name):
+        """End the current stage and start ``name``; ``None`` leaves the time that follows untraced."""
+        now = time.perf_counter()
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._mark
+        self._stage, self._mark = name, now
+
+    def finish(self):
+        """Record the run, export the metrics and show the panel to admins."""
+        self.stage(None)
+        total = time.perf_counter() - self._started
+        registry = get_registry()
+        registry.observe(self.page, self.stages, total)
+        registry.export()
+        if is_admin():
+            diagnostics_panel(self, total, registry)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def diagnostics_panel(trace, total, registry):
+    """Sidebar breakdown of this run and of recent runs of the page, by stage."""
+    with st.sidebar.expander("Diagnostics"):
+        st.markdown(f"**This run:** {_ms(total)} ms")
+        untraced = total - sum(trace.stages.values())
+        st.dataframe(
+            [
+                {"Stage": stage, "ms": _ms(seconds), "Share": f"{seconds / total:.0%}"}
+                for stage, seconds in [*sorted(trace.stages.items(), key=lambda item: -item[1]), ("untraced", untraced)]
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.markdown("**Recent runs**")
+        st.dataframe(
+            [
+                {
+                    "Stage": row["stage"] or "whole run",
+                    "Runs": row["runs"],
+                    "Mean ms": _ms(row["mean"]),
+                    "p50 ms": _ms(row["p50"]),
+                    "p95 ms": _ms(row["p95"]),
+                }
+                for row in sorted(registry.summary(trace.page), key=lambda row: -row["mean"])
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(
+            f"Prometheus metrics in {METRICS_PATH}"
+            + (f" and on port {METRICS_PORT} at /metrics" if METRICS_PORT else "")
+        )
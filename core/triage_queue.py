@@ -0,0 +1,92 @@
+"""Cached, filter-keyed reads of the triage queue.
+
+The queue is never sorted here: the store keeps it in priority order in
+an index, so each page is a ``LIMIT``/``OFFSET`` read of that index. Pages
+and the per-filter summary are cached on the store's data version plus the
+filters, so toggling filters or paging back and forth reuses earlier
+results. Any write bumps the data version; recording a decision also
+clears the cache outright so stale queues are not kept around.
+"""
+
+import streamlit as st
+
+from core import scoring, sla, store
+
+# Seconds a cached page or summary is kept even if nothing invalidates it
+QUEUE_CACHE_TTL = 300
+
+
+@st.cache_data(ttl=QUEUE_CACHE_TTL, max_entries=256, show_spinner=False)
+def _load_page(version, lob, brokers, recommendations, limit, offset):
+    return store.query_triage(lob=lob, brokers=brokers, recommendations=recommendations, limit=limit, offset=offset)
+
+
+@st.cache_data(ttl=QUEUE_CACHE_TTL, max_entries=64, show_spinner=False)
+def _load_summary(version, lob, brokers, recommendations):
+    return store.triage_summary(lob=lob, brokers=brokers, recommendations=recommendations)
+
+
+def _version():
+    # Score new submissions before reading; the deadline monitor keeps the
+    # urgency bands current in the background
+    scoring.ensure_scored()
+    sla.get_monitor()
+    return store.data_version()
+
+
+def _filters(lob, brokers, recommendations):
+    return lob, tuple(sorted(brokers)), tuple(sorted(recommendations))
+
+
+def load_page(lob=None, brokers=(), recommendations=(), limit=None, offset=0):
+    """One page of the filtered triage queue, in priority order."""
+    return _load_page(_version(), *_filters(lob, brokers, recommendations), limit, offset)
+
+
+def load_summary(lob=None, brokers=(), recommendations=()):
+    """Submissions and premium per AI recommendation and broker for the filtered queue."""
+    return _load_summary(_version(), *_filters(lob, brokers, recommendations))
+
+
+def matching_ids(lob=None, brokers=(), recommendations=()):
+    """IDs of every submission in the filtered queue, in priority order."""
+    return store.triage_ids(*_filters(lob, brokers, recommendations))
+
+
+def in_queue(ids, lob=None, brokers=(), recommendations=()):
+    """Those of ``ids`` still in the filtered queue."""
+    return store.triage_matching(ids, *_filters(lob, brokers, recommendations))
+
+
+def record_decision(submission_id, decision):
+    """Record a triage decision and drop every cached queue."""
+    store.record_decision(submission_id, decision)
+    invalidate()
+
+
+def record_decisions(submission_ids, decision):
+    """Apply a batch decision in one transaction and drop every cached queue."""
+    result = store.record_decisions(submission_ids, decision)
+    invalidate()
+    return result
+
+
+def show_batch_result(result, done):
+    """Summarise a batch decision: how many were ``done``, how fast, and which failed."""
+    applied, failed, seconds = len(result["applied"]), result["failed"], result["seconds"]
+    if applied:
+        rate = f", {applied / seconds:,.0f}/s" if seconds else ""
+        st.success(f"{applied:,} submission{'s' if applied != 1 else ''} {done} in {seconds:.2f}s{rate}")
+    if failed:
+        st.warning(f"{len(failed):,} submission{'s' if len(failed) != 1 else ''} could not be updated")
+        with st.expander("Failed submissions"):
+            st.dataframe(
+                [{"Submission": item_id, "Reason": reason} for item_id, reason in failed.items()],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+
+def invalidate():
+    _load_page.clear()
+    _load_summary.clear()
@@ -0,0 +1,48 @@
+"""Background warm-up after a cold start.
+
+The first visit to a page after a restart pays for importing Plotly,
+PyArrow and the core modules, for opening the store and for building the
+duplicate index. ``start`` does that work on a background thread while the
+overview page is being read, so the first page opened from it finds
+everything already loaded.
+"""
+
+import importlib
+import threading
+
+import streamlit as st
+
+# Modules the pages import, roughly in order of cost
+PAGE_MODULES = (
+    "pandas",
+    "plotly.express",
+    "core.history",
+    "core.charts",
+    "core.kpis",
+    "core.sanctions",
+    "core.triage_queue",
+    "core.selection",
+    "core.jobs",
+    "core.parsers",
+    "core.templates",
+    "core.pagination",
+    "core.tracing",
+    "core.snapshots",
+)
+
+
+def _warm():
+    for name in PAGE_MODULES:
+        importlib.import_module(name)
+    from core import dedupe, store
+
+    store.get_connection()
+    dedupe.get_index()
+
+
+@st.cache_resource(show_spinner=False)
+def start():
+    """Start the warm-up once per process."""
+    thread = threading.Thread(target=_warm, name="warmup", daemon=True)
+    thread.start()
+    return thread
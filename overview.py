@@ -1,5 +1,7 @@
 import streamlit as st
 
+from core import warmup
+
 # Set page configuration
 st.set_page_config(
     page_title="hx Renew - Submission Triage App",
@@ -68,4 +70,7 @@ with col2:
     - Portfolio metrics
     - Performance tracking
     - Business intelligence
-    """)
\ No newline at end of file
+    """)
+
+# Load what the other pages need in the background while this one is read
+warmup.start()
@@ -1,8 +1,12 @@
 import streamlit as st
-import pandas as pd
-import time
 from datetime import datetime, timedelta
-import random
+from types import SimpleNamespace
+
+from core import jobs, parsers, sanctions, selection, store, templates, tracing, triage_queue
+from core.pagination import paginate
+
+# Time each stage of the run for the diagnostics panel and metrics
+trace = tracing.Trace("ingestion")
 
 st.title("Data Ingestion")
 
@@ -22,7 +26,7 @@ with tab1:
     
     with col1:
         st.subheader("New Submissions")
-        st.markdown('<span style="color:#666;">6 unprocessed submissions</span>', unsafe_allow_html=True)
+        st.markdown(f'<span style="color:#666;">{store.count_inbox()} unprocessed submissions</span>', unsafe_allow_html=True)
     
     with col2:
         fetch_button = st.button("Fetch New Submissions", use_container_width=True)
@@ -35,78 +39,38 @@ with tab1:
     lob_options = ["All Lines of Business", "Property D&F", "Professional Indemnity", "Cyber", "Marine Cargo", "Energy"]
     selected_lob = st.selectbox("Line of Business", lob_options)
     
-    # Simulate fetching new submissions
+    # Pull anything newer than each source's watermark, all sources at once
     if fetch_button:
+        # The source clients are only loaded when a fetch is asked for
+        from core import fetch
+        
         with st.spinner("Checking for new submissions..."):
-            time.sleep(1.5)
-        st.success("3 new submissions found and added to inbox")
-    
-    # Create a dataframe of simulated submissions in the inbox
-    def generate_inbox():
-        now = datetime.now()
-        submissions = [
-            {
-                "id": "SUB-2024-0123",
-                "client": "ABC Property Holdings",
-                "broker": "Marsh",
-                "type": "Property D&F",
-                "received": now - timedelta(hours=2),
-                "status": "New",
-                "source": "Email"
-            },
-            {
-                "id": "SUB-2024-0122",
-                "client": "TechPro Solutions",
-                "broker": "Aon",
-                "type": "Cyber",
-                "received": now - timedelta(hours=5),
-                "status": "New",
-                "source": "Broker Portal"
-            },
-            {
-                "id": "SUB-2024-0121",
-                "client": "Global Architects Inc",
-                "broker": "WTW",
-                "type": "Professional Indemnity",
-                "received": now - timedelta(hours=8),
-                "status": "New",
-                "source": "Email"
-            },
-            {
-                "id": "SUB-2024-0120",
-                "client": "Marine Shipping Co",
-                "broker": "Miller",
-                "type": "Marine Cargo",
-                "received": now - timedelta(hours=12),
-                "status": "New",
-                "source": "Broker Portal"
-            },
-            {
-                "id": "SUB-2024-0119",
-                "client": "Luxury Hotel Group",
-                "broker": "BMS",
-                "type": "Property D&F",
-                "received": now - timedelta(hours=18),
-                "status": "New",
-                "source": "Email"
-            },
-            {
-                "id": "SUB-2024-0118",
-                "client": "Energy Solutions Ltd",
-                "broker": "Lockton",
-                "type": "Energy",
-                "received": now - timedelta(hours=24),
-                "status": "New",
-                "source": "API"
-            }
-        ]
-        return pd.DataFrame(submissions)
+            st.session_state["fetch_report"] = fetch.fetch_new()
+        # Rerun so the inbox and its count include the new submissions
+        st.rerun()
+    
+    fetch_report = st.session_state.pop("fetch_report", None)
+    if fetch_report is not None:
+        added = sum(r["added"] for r in fetch_report.values())
+        st.success(f"{added} new submission{'s' if added != 1 else ''} found and added to inbox")
+        for source_name, r in fetch_report.items():
+            if r["error"]:
+                st.warning(f"Could not fetch from {source_name}: {r['error']}")
+            if r["skipped"]:
+                st.warning(
+                    f"Skipped {len(r['skipped'])} malformed item{'s' if len(r['skipped']) != 1 else ''} from {source_name}: "
+                    + "; ".join(r["skipped"][:3]) + ("; ..." if len(r["skipped"]) > 3 else "")
+                )
     
-    inbox_df = generate_inbox()
+    inbox_lob = None if selected_lob == "All Lines of Business" else selected_lob
     
-    # Apply LOB filter
-    if selected_lob != "All Lines of Business":
-        inbox_df = inbox_df[inbox_df["type"] == selected_lob]
+    # Display inbox with checkboxes
+    st.markdown("### Submission Inbox")
+    
+    # Query only the visible page of the inbox for the selected line of business
+    trace.stage("load_inbox")
+    inbox_offset, inbox_limit = paginate(store.count_inbox(inbox_lob), "inbox", reset_on=inbox_lob)
+    inbox_df = store.query_inbox(inbox_lob, limit=inbox_limit, offset=inbox_offset)
     
     # Format the received time
     inbox_df['received_fmt'] = inbox_df['received'].apply(
@@ -114,26 +78,30 @@ with tab1:
         else f"{(datetime.now() - x).days}d ago"
     )
     
-    # Display inbox with checkboxes
-    st.markdown("### Submission Inbox")
+    # Screen the visible clients against the sanctions list in one batch
+    trace.stage("screen_sanctions")
+    sanctions_hits = sanctions.screen(inbox_df["client"])
     
-    # Add select all checkbox
-    select_all = st.checkbox("Select All", key="select_all")
+    # Select by submission ID; "Select All" covers every inbox submission for the filter
+    trace.stage("render_inbox")
+    inbox_selection = selection.get_selection("inbox")
+    selection.select_all_checkbox(inbox_selection, "inbox", inbox_lob)
     
     # Show the inbox with checkboxes
-    for i, row in enumerate(inbox_df.itertuples()):
-        # Create checkbox for each row
-        checkbox_val = select_all
-        
+    for row in inbox_df.itertuples():
         col1, col2, col3, col4 = st.columns([0.5, 3, 1.5, 1])
         
         with col1:
-            st.checkbox("", value=checkbox_val, key=f"check_{i}")
+            selection.row_checkbox(inbox_selection, "inbox", row.id)
         
         with col2:
+            sanctions_badge = (
+                ' <span style="color:#721c24; background-color:#f8d7da; padding:1px 6px; border-radius:3px;">Sanctions ⚠</span>'
+                if row.client in sanctions_hits else ""
+            )
             st.markdown(f"""
             <div>
-                <strong>{row.client}</strong><br>
+                <strong>{row.client}</strong>{sanctions_badge}<br>
                 <span style="color:#666;">{row.id} | {row.type}</span>
             </div>
             """, unsafe_allow_html=True)
@@ -156,91 +124,102 @@ with tab1:
         # Add a separator
         st.markdown('<hr style="margin:5px 0; opacity:0.3;">', unsafe_allow_html=True)
     
-    # Process button clicked
+    # Process button clicked: queue the selected submissions and carry on
+    trace.stage(None)
     if process_all:
-        with st.spinner("Processing submissions and checking for duplicates..."):
-            time.sleep(2)
+        from core import dedupe
         
+        selected_df = store.query_inbox(ids=inbox_selection.resolve(lambda: store.inbox_ids(inbox_lob)))
+        selected = [
+            {"id": row.id, "client": row.client, "broker": row.broker, "type": row.type}
+            for row in selected_df.itertuples()
+        ]
+        st.session_state["inbox_job"] = jobs.get_queue().submit(
+            "duplicate_check", dedupe.check_submission, selected
+        )
+        inbox_selection.clear()
+    
+    inbox_job = st.session_state.get("inbox_job")
+    if inbox_job and jobs.show_progress(inbox_job, "Processing submissions and checking for duplicates..."):
         # Show duplicate check results
         st.markdown("### Duplicate Check Results")
         
-        # Simulate some duplicates for demo purposes
-        duplicate_found = False
-        for i, row in enumerate(inbox_df.itertuples()):
-            if st.session_state.get(f"check_{i}", False) or select_all:
-                # Randomly determine if we have a duplicate (for demo)
-                is_duplicate = False
-                if row.client == "TechPro Solutions" or (random.random() < 0.2 and not duplicate_found):
-                    is_duplicate = True
-                    duplicate_found = True  # Ensure we don't show too many duplicates
-                
-                # Show the appropriate status
-                if is_duplicate:
-                    # Show as duplicate
-                    with st.expander(f"**{row.client}** ({row.id} | {row.type})", expanded=True):
-                        st.markdown("""<div style="background-color:#f8d7da; color:#721c24; padding:10px; border-radius:5px; margin-bottom:10px;">
-                        <strong>⚠️ Potential Duplicate Detected</strong>
-                        </div>""", unsafe_allow_html=True)
-                        
-                        # Show the duplicate details
-                        st.markdown("##### Duplicate Details")
-                        
-                        # Create a simple DataFrame for the duplicate info
-                        dupe_data = {
-                            "Existing Submission": [f"SUB-2024-0092"],
-                            "Client Name": [row.client],
-                            "Broker": ["Willis Towers Watson"],  # Different broker
-                            "Received": ["10 days ago"],
-                            "Status": ["In Triage"]
+        for item in jobs.job_results(inbox_job):
+            i = item["seq"]
+            if item["error"]:
+                st.error(f"Submission could not be processed: {item['error']}")
+                continue
+            
+            result = item["result"]
+            row = SimpleNamespace(**result["submission"])
+            match = SimpleNamespace(**result["match"]) if result["match"] else None
+            
+            # Show the appropriate status
+            if match:
+                # Show as duplicate
+                with st.expander(f"**{row.client}** ({row.id} | {row.type})", expanded=True):
+                    st.markdown("""<div style="background-color:#f8d7da; color:#721c24; padding:10px; border-radius:5px; margin-bottom:10px;">
+                    <strong>⚠️ Potential Duplicate Detected</strong>
+                    </div>""", unsafe_allow_html=True)
+                    
+                    # Show the duplicate details
+                    st.markdown("##### Duplicate Details")
+                    
+                    # Duplicate info as a simple table
+                    dupe_data = {
+                        "Existing Submission": [match.id],
+                        "Client Name": [match.client],
+                        "Broker": [match.broker],
+                        "Received": [f"{(datetime.now() - datetime.fromisoformat(match.received)).days} days ago"],
+                        "Status": [match.status],
+                        "Name Similarity": [f"{match.score:.0%}"]
+                    }
+                    
+                    st.dataframe(dupe_data, hide_index=True, use_container_width=True)
+                    
+                    # Duplicate resolution actions
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.button(f"Mark as Unique", key=f"unique_{i}")
+                    with col2:
+                        st.button(f"Link to Existing", key=f"link_{i}", type="primary")
+            else:
+                # Show as unique
+                with st.expander(f"**{row.client}** ({row.id} | {row.type})", expanded=True):
+                    st.markdown("""<div style="background-color:#d4edda; color:#155724; padding:10px; border-radius:5px; margin-bottom:10px;">
+                    <strong>✓ No Duplicates Found</strong>
+                    </div>""", unsafe_allow_html=True)
+                    
+                    # Show completion message
+                    st.markdown("##### Key Information Extracted")
+                    
+                    # Summary info based on submission type
+                    if row.type == "Property D&F":
+                        info = {
+                            "Client": [row.client],
+                            "Locations": ["3 locations in UK"],
+                            "Total Value": ["£320,500,000"],
+                            "Primary Occupancy": ["Office Buildings"]
                         }
-                        
-                        dupe_df = pd.DataFrame(dupe_data)
-                        st.dataframe(dupe_df, hide_index=True, use_container_width=True)
-                        
-                        # Duplicate resolution actions
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.button(f"Mark as Unique", key=f"unique_{i}")
-                        with col2:
-                            st.button(f"Link to Existing", key=f"link_{i}", type="primary")
-                else:
-                    # Show as unique
-                    with st.expander(f"**{row.client}** ({row.id} | {row.type})", expanded=True):
-                        st.markdown("""<div style="background-color:#d4edda; color:#155724; padding:10px; border-radius:5px; margin-bottom:10px;">
-                        <strong>✓ No Duplicates Found</strong>
-                        </div>""", unsafe_allow_html=True)
-                        
-                        # Show completion message
-                        st.markdown("##### Key Information Extracted")
-                        
-                        # Summary info based on submission type
-                        if row.type == "Property D&F":
-                            info = {
-                                "Client": [row.client],
-                                "Locations": ["3 locations in UK"],
-                                "Total Value": ["£320,500,000"],
-                                "Primary Occupancy": ["Office Buildings"]
-                            }
-                        elif row.type == "Cyber":
-                            info = {
-                                "Client": [row.client],
-                                "Industry": ["Technology Services"],
-                                "Revenue": ["$450M"],
-                                "Coverages": ["Data Breach, Ransomware, Business Interruption"]
-                            }
-                        else:
-                            info = {
-                                "Client": [row.client],
-                                "Coverage Type": [row.type],
-                                "Estimated Premium": ["£175,000"],
-                                "Renewal Date": ["01/05/2024"]
-                            }
-                        
-                        info_df = pd.DataFrame(info)
-                        st.dataframe(info_df, hide_index=True, use_container_width=True)
-                        
-                        # Add action button
-                        st.button(f"Send to Triage", key=f"triage_{i}", type="primary")
+                    elif row.type == "Cyber":
+                        info = {
+                            "Client": [row.client],
+                            "Industry": ["Technology Services"],
+                            "Revenue": ["$450M"],
+                            "Coverages": ["Data Breach, Ransomware, Business Interruption"]
+                        }
+                    else:
+                        info = {
+                            "Client": [row.client],
+                            "Coverage Type": [row.type],
+                            "Estimated Premium": ["£175,000"],
+                            "Renewal Date": ["01/05/2024"]
+                        }
+                    
+                    st.dataframe(info, hide_index=True, use_container_width=True)
+                    
+                    # Add action button
+                    st.button(f"Send to Triage", key=f"triage_{i}", type="primary")
         
         # Add bulk action button
         st.markdown("---")
@@ -283,36 +262,94 @@ with tab2:
         process_button = st.button("Process Selected", type="primary")
         
         if process_button:
-            with st.spinner(f"Processing and checking for duplicates..."):
-                time.sleep(2)
+            # Spool the uploads to disk and parse them in worker processes
+            spooled = [jobs.spool_upload(uploaded) for uploaded in uploaded_files or []]
+            st.session_state["upload_job"] = jobs.get_queue().submit(
+                "document_parse", parsers.summarise_spooled, spooled, processes=True
+            )
+        
+        upload_job = st.session_state.get("upload_job")
+        if upload_job and jobs.show_progress(upload_job, "Processing and checking for duplicates..."):
+            # Each file was streamed chunk by chunk, keeping only a summary per table
+            parsed = []
+            for item in jobs.job_results(upload_job):
+                if item["error"]:
+                    st.error(f"File could not be processed: {item['error']}")
+                    continue
+                parsed.extend(parsers.TableSummary.from_dict(d) for d in item["result"])
             
             st.success("Processing complete!")
             
-            # Show duplicate check result for the sample
-            st.markdown("### Duplicate Check Results")
+            if parsed:
+                # Look each table's headers up in the template index
+                table_templates = [None if t.is_document else templates.match(t.columns) for t in parsed]
+                
+                st.markdown("### Parsed Files")
+                parsed_data = {
+                    "File": [t.source for t in parsed],
+                    "Sheet": [t.sheet or "" for t in parsed],
+                    "Rows": [t.rows for t in parsed],
+                    "Columns": [len(t.columns) if not t.is_document else "Document" for t in parsed],
+                    "Template": [
+                        "" if t.is_document else getattr(template, "name", "No match")
+                        for t, template in zip(parsed, table_templates)
+                    ],
+                    # Names and document text were screened in full by the parse worker
+                    "Sanctions": [
+                        "Not screened" if not t.screened else
+                        f"{len(t.hits)} potential match{'es' if len(t.hits) > 1 else ''} !" if t.hits else "Clear ✓"
+                        for t in parsed
+                    ]
+                }
+                st.dataframe(parsed_data, hide_index=True, use_container_width=True)
+                
+                flagged = [hit for t in parsed for hit in t.hits]
+                if flagged:
+                    st.warning("Names in the uploaded files resemble sanctions list entries:")
+                    st.dataframe({
+                        "Name in File": [hit.query for hit in flagged],
+                        "List Entry": [f"{hit.entry.list_id} {hit.entry.name}" for hit in flagged],
+                        "Program": [hit.entry.program for hit in flagged],
+                        "Similarity": [f"{hit.score:.0%}" for hit in flagged]
+                    }, hide_index=True, use_container_width=True)
+                
+                for t, template in zip(parsed, table_templates):
+                    if t.is_document:
+                        continue
+                    label = f"{t.source} ({t.sheet})" if t.sheet else t.source
+                    with st.expander(f"**{label}** - {t.rows:,} rows", expanded=False):
+                        if template:
+                            # Matched tables are shown mapped onto our fields by the compiled template
+                            st.caption(f"Mapped with {template.name}")
+                            st.dataframe(template.compile().apply(t.preview), hide_index=True, use_container_width=True)
+                        else:
+                            st.dataframe(t.preview, hide_index=True, use_container_width=True)
+            
+            if use_sample:
+                # Show duplicate check result for the sample
+                st.markdown("### Duplicate Check Results")
             
-            # Sample is not a duplicate
-            with st.expander("**Commercial Property Portfolio** (Property D&F)", expanded=True):
-                st.markdown("""<div style="background-color:#d4edda; color:#155724; padding:10px; border-radius:5px; margin-bottom:10px;">
-                <strong>✓ No Duplicates Found</strong>
-                </div>""", unsafe_allow_html=True)
+                # Sample is not a duplicate
+                with st.expander("**Commercial Property Portfolio** (Property D&F)", expanded=True):
+                    st.markdown("""<div style="background-color:#d4edda; color:#155724; padding:10px; border-radius:5px; margin-bottom:10px;">
+                    <strong>✓ No Duplicates Found</strong>
+                    </div>""", unsafe_allow_html=True)
                 
-                # Show extracted information
-                st.markdown("##### Key Information Extracted")
+                    # Show extracted information
+                    st.markdown("##### Key Information Extracted")
                 
-                sample_info = {
-                    "Client": ["ABC Property Holdings Ltd"],
-                    "Broker": ["Willis Towers Watson"],
-                    "Locations": ["12 locations across UK"],
-                    "Total Value": ["£550,628,219"],
-                    "Renewal Date": ["01/06/2024"]
-                }
+                    sample_info = {
+                        "Client": ["ABC Property Holdings Ltd"],
+                        "Broker": ["Willis Towers Watson"],
+                        "Locations": ["12 locations across UK"],
+                        "Total Value": ["£550,628,219"],
+                        "Renewal Date": ["01/06/2024"]
+                    }
                 
-                sample_df = pd.DataFrame(sample_info)
-                st.dataframe(sample_df, hide_index=True, use_container_width=True)
+                    st.dataframe(sample_info, hide_index=True, use_container_width=True)
                 
-                # Add action button
-                st.button("Send to Triage", key="sample_triage", type="primary")
+                    # Add action button
+                    st.button("Send to Triage", key="sample_triage", type="primary")
             
             # Add navigation buttons
             st.markdown("---")
@@ -341,78 +378,36 @@ with tab3:
             ["Last 7 days", "Last 30 days", "Last 90 days", "All Time"]
         )
     
-    # Generate some pending submissions
-    def generate_pending():
-        now = datetime.now()
-        submissions = [
-            {
-                "id": "SUB-2024-0115",
-                "client": "Regional Property Trust",
-                "broker": "Aon",
-                "type": "Property D&F",
-                "received": now - timedelta(days=3),
-                "status": "Duplicate Check",
-                "notes": "Checking for potential duplicate"
-            },
-            {
-                "id": "SUB-2024-0112",
-                "client": "Global Tech Services",
-                "broker": "Marsh",
-                "type": "Cyber",
-                "received": now - timedelta(days=5),
-                "status": "Needs Review",
-                "notes": "Awaiting additional info from broker"
-            },
-            {
-                "id": "SUB-2024-0108",
-                "client": "European Hospitality Group",
-                "broker": "WTW",
-                "type": "Property D&F",
-                "received": now - timedelta(days=7),
-                "status": "Awaiting Info",
-                "notes": "Missing values for 3 locations"
-            },
-            {
-                "id": "SUB-2024-0103",
-                "client": "Maritime Logistics Co",
-                "broker": "Miller",
-                "type": "Marine Cargo",
-                "received": now - timedelta(days=10),
-                "status": "Duplicate Check",
-                "notes": "Similar submission identified"
-            },
-        ]
-        return pd.DataFrame(submissions)
+    # Translate the filters into a store query
+    date_cutoffs = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
+    since = None
+    if date_filter in date_cutoffs:
+        since = datetime.now() - timedelta(days=date_cutoffs[date_filter])
     
-    pending_df = generate_pending()
+    pending_status = None if status_filter == "All in Backlog" else status_filter
     
-    # Apply filters
-    if status_filter != "All Pending":
-        pending_df = pending_df[pending_df["status"] == status_filter]
+    # Display pending submissions
+    st.markdown("### Pending Submissions List")
     
-    if date_filter == "Last 7 days":
-        pending_df = pending_df[pending_df["received"] >= datetime.now() - timedelta(days=7)]
-    elif date_filter == "Last 30 days":
-        pending_df = pending_df[pending_df["received"] >= datetime.now() - timedelta(days=30)]
-    elif date_filter == "Last 90 days":
-        pending_df = pending_df[pending_df["received"] >= datetime.now() - timedelta(days=90)]
+    # Query only the visible page of the backlog
+    trace.stage("load_backlog")
+    pending_offset, pending_limit = paginate(
+        store.count_backlog(pending_status, since), "backlog", reset_on=(status_filter, date_filter)
+    )
+    pending_df = store.query_backlog(pending_status, since, limit=pending_limit, offset=pending_offset)
     
     # Format the received time
     pending_df['received_fmt'] = pending_df['received'].apply(
         lambda x: f"{(datetime.now() - x).days}d ago"
     )
     
-    # Display pending submissions
-    st.markdown("### Pending Submissions List")
-    
-    # Add select all checkbox
-    pending_select_all = st.checkbox("Select All", key="pending_select_all")
+    # Select by submission ID; "Select All" covers every backlog submission for the filters
+    trace.stage("render_backlog")
+    pending_selection = selection.get_selection("backlog")
+    selection.select_all_checkbox(pending_selection, "backlog", (pending_status, date_filter))
     
     # Show the pending submissions with checkboxes
-    for i, row in enumerate(pending_df.itertuples()):
-        # Create checkbox for each row
-        checkbox_val = pending_select_all
-        
+    for row in pending_df.itertuples():
         # Get appropriate status color and HTML
         if row.status == "Awaiting Info":
             status_html = f"""<span style="background-color:#ffc107; color:white; padding:2px 8px; border-radius:10px; font-size:12px;">{row.status}</span>"""
@@ -426,7 +421,7 @@ with tab3:
         col1, col2, col3, col4 = st.columns([0.5, 3, 2, 1])
         
         with col1:
-            st.checkbox("", value=checkbox_val, key=f"pending_check_{i}")
+            selection.row_checkbox(pending_selection, "backlog", row.id)
         
         with col2:
             st.markdown(f"""
@@ -452,14 +447,26 @@ with tab3:
         st.markdown('<hr style="margin:5px 0; opacity:0.3;">', unsafe_allow_html=True)
     
     # Action buttons
+    trace.stage(None)
     col1, col2 = st.columns(2)
     with col1:
         resume_button = st.button("Resume Processing Selected", type="primary", use_container_width=True)
     with col2:
         archive_button = st.button("Archive Selected", use_container_width=True)
     
-    if resume_button:
-        st.success("Selected submissions have been sent for processing")
+    # Resume or archive every selected submission in one transaction
+    if resume_button or archive_button:
+        pending_ids = pending_selection.resolve(lambda: store.backlog_ids(pending_status, since))
+        if resume_button:
+            backlog_result = (triage_queue.record_decisions(pending_ids, "Resume"), "sent back to triage")
+        else:
+            backlog_result = (triage_queue.record_decisions(pending_ids, "Archive"), "archived")
+        st.session_state["backlog_result"] = backlog_result
+        pending_selection.clear()
+        st.rerun()
     
-    if archive_button:
-        st.info("Selected submissions have been archived")
\ No newline at end of file
+    backlog_result = st.session_state.pop("backlog_result", None)
+    if backlog_result is not None:
+        triage_queue.show_batch_result(*backlog_result)
+
+trace.finish()
@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import time
-import plotly.express as px
-from datetime import datetime, timedelta
 import random
 
+from core import charts, sanctions, selection, sla, templates, tracing, triage_queue
+from core.pagination import paginate
+
+# Time each stage of the run for the diagnostics panel and metrics
+trace = tracing.Trace("triage")
+
 # Add custom CSS for the decline button at the top of the app
 st.markdown("""
 <style>
@@ -46,115 +47,58 @@ with col3:
         default=["Accept", "Needs Review", "Decline"]
     )
 
-# Generate sample submissions data
-def generate_submissions(n=10):
-    now = datetime.now()
-    lobs = ["Property D&F", "Professional Indemnity", "Cyber", "Marine Cargo", "Energy"]
-    brokers = ["Marsh", "Aon", "WTW", "Howden", "BMS", "Miller", "Gallagher"]
-    clients = [
-        "ABC Property Holdings", "TechPro Solutions", "Global Architects Inc", 
-        "Marine Shipping Co", "Luxury Hotel Group", "Energy Solutions Ltd",
-        "European Manufacturing", "UK Retail Chain", "Global Financial Services"
-    ]
-    
-    submissions = []
-    
-    # Ensure we have at least one of each recommendation type
-    recommendations = ["Accept", "Needs Review", "Decline"]
-    
-    for i in range(n):
-        # Base data
-        client = random.choice(clients)
-        lob = random.choice(lobs)
-        broker = random.choice(brokers)
-        received_days = random.randint(0, 14)
-        
-        # Deadline info
-        deadline_days = random.randint(5, 21)
-        days_remaining = max(1, deadline_days - received_days)
-        
-        # Risk metrics
-        risk_appetite = random.randint(50, 95)
-        estimated_premium = random.randint(50, 500) * 1000
-        
-        # AI recommendation
-        # For the first 3 records, force one of each recommendation type
-        if i < 3:
-            ai_recommendation = recommendations[i]
-            confidence = random.randint(70, 95)
-        else:
-            if risk_appetite >= 75:
-                ai_recommendation = "Accept"
-                confidence = random.randint(80, 95)
-            elif risk_appetite <= 60:
-                ai_recommendation = "Decline"
-                confidence = random.randint(75, 90)
-            else:
-                ai_recommendation = "Needs Review"
-                confidence = random.randint(60, 75)
-        
-        # Template match (simplified)
-        template_match = random.random() > 0.3  # 70% chance of template match
-        
-        submissions.append({
-            "id": f"SUB-2024-{1000 + i}",
-            "client": client,
-            "broker": broker,
-            "lob": lob,
-            "days_remaining": days_remaining,
-            "risk_appetite": risk_appetite,
-            "estimated_premium": estimated_premium,
-            "ai_recommendation": ai_recommendation,
-            "confidence": confidence,
-            "template_match": template_match
-        })
-    
-    return pd.DataFrame(submissions)
-
-# Generate data
-submissions_df = generate_submissions(9)
+queue_lob = None if lob_filter == "All Lines of Business" else lob_filter
 
-# Apply filters
-if lob_filter != "All Lines of Business":
-    submissions_df = submissions_df[submissions_df["lob"] == lob_filter]
-
-if broker_filter:
-    submissions_df = submissions_df[submissions_df["broker"].isin(broker_filter)]
-
-if recommendation_filter:
-    submissions_df = submissions_df[submissions_df["ai_recommendation"].isin(recommendation_filter)]
-
-# Define a mapping for recommendation priority (for sorting)
-recommendation_priority = {
-    "Accept": 1,
-    "Needs Review": 2,
-    "Decline": 3
-}
-
-# Add a priority column for sorting by recommendation
-submissions_df["recommendation_priority"] = submissions_df["ai_recommendation"].map(recommendation_priority)
+# Deadline alerts raised by the SLA monitor over the last day
+trace.stage("load_alerts")
+sla_alerts = sla.recent_alerts()
+if not sla_alerts.empty:
+    overdue = int((sla_alerts["band"] == sla.OVERDUE).sum())
+    st.warning(
+        f"⏰ {len(sla_alerts)} deadline alert{'s' if len(sla_alerts) != 1 else ''} in the last 24 hours"
+        + (f", {overdue} overdue" if overdue else "")
+    )
+    with st.expander("Deadline Alerts"):
+        alerts_data = {
+            "Submission": sla_alerts["submission_id"],
+            "Client": sla_alerts["client"],
+            "Broker": sla_alerts["broker"],
+            "LOB": sla_alerts["lob"],
+            "Status": sla_alerts["status"],
+            "Alert": sla_alerts["band"].map(sla.band_label),
+            "Deadline": sla_alerts["deadline"].dt.strftime("%d %b %H:%M"),
+            "Raised": sla_alerts["raised_at"].dt.strftime("%d %b %H:%M")
+        }
+        st.dataframe(alerts_data, hide_index=True, use_container_width=True)
 
-# Apply fixed sort: recommended action first, then premium
-submissions_df = submissions_df.sort_values(["recommendation_priority", "estimated_premium"], ascending=[True, False])
+# Summarise the filtered queue (cached per data version and filter set)
+trace.stage("load_summary")
+summary_df = triage_queue.load_summary(
+    lob=queue_lob,
+    brokers=broker_filter,
+    recommendations=recommendation_filter
+)
+queue_total = int(summary_df["submissions"].sum())
 
 # Prepare data for pie chart
-recommendation_counts = submissions_df["ai_recommendation"].value_counts().reset_index()
+trace.stage("aggregate")
+recommendation_counts = summary_df.groupby("ai_recommendation")["submissions"].sum()
+recommendation_counts = recommendation_counts.sort_values(ascending=False).reset_index()
 recommendation_counts.columns = ["Recommendation", "Count"]
 
 # Add premium by broker
-premium_by_broker = submissions_df.groupby("broker")["estimated_premium"].sum().reset_index()
+premium_by_broker = summary_df.groupby("broker")["premium"].sum().reset_index()
 premium_by_broker.columns = ["Broker", "Premium"]
 premium_by_broker = premium_by_broker.sort_values("Premium", ascending=True)
 
 # Total premium
-total_premium = submissions_df["estimated_premium"].sum()
+total_premium = premium_by_broker["Premium"].sum()
 
-# Display submissions overview with pie chart
-st.markdown("### Submissions Overview")
-col1, col2 = st.columns([2, 3])
+@charts.figure_cache
+def build_recommendation_figure(recommendation_counts, total_submissions):
+    # Plotly is imported when the first chart is drawn, after the page has started rendering
+    import plotly.express as px
 
-with col1:
-    # Create the pie chart - no legend, consistent title
     fig = px.pie(
         recommendation_counts, 
         values="Count", 
@@ -172,7 +116,7 @@ with col1:
         height=250,
         showlegend=False,
         title={
-            'text': f"Total Submissions: {len(submissions_df)}",
+            'text': f"Total Submissions: {total_submissions}",
             'y':0.95,
             'x':0.5,
             'xanchor': 'center',
@@ -180,10 +124,12 @@ with col1:
             'font': {'size': 16}
         }
     )
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+@charts.figure_cache
+def build_premium_figure(premium_by_broker, total_premium):
+    import plotly.express as px
 
-with col2:
-    # Premium by broker - no legend, consistent title
     broker_fig = px.bar(
         premium_by_broker,
         x="Premium",
@@ -207,29 +153,64 @@ with col2:
     )
     broker_fig.update_yaxes(title="")
     broker_fig.update_xaxes(title="")
-    st.plotly_chart(broker_fig, use_container_width=True)
+    return broker_fig
+
+# Display submissions overview with pie chart
+trace.stage("build_figures")
+st.markdown("### Submissions Overview")
+col1, col2 = st.columns([2, 3])
+
+with col1:
+    # Create the pie chart - no legend, consistent title
+    fig = build_recommendation_figure(recommendation_counts, queue_total)
+    st.plotly_chart(fig, use_container_width=True, key="recommendation_chart")
+
+with col2:
+    # Premium by broker - no legend, consistent title
+    broker_fig = build_premium_figure(premium_by_broker, total_premium)
+    st.plotly_chart(broker_fig, use_container_width=True, key="premium_chart")
 
 # Submissions queue with select all below the header
+trace.stage(None)
 st.markdown("### Submissions Queue")
-st.markdown("🔄 **Sorted by:** Recommended Action, then Premium (highest to lowest)")
-select_all = st.checkbox("Select All")
+st.markdown("🔄 **Sorted by:** Recommended Action, then Deadline Urgency, then Premium (highest to lowest)")
+queue_filters = (lob_filter, tuple(broker_filter), tuple(recommendation_filter))
 
-selection = []
+# Selected submissions are kept by ID; "Select All" covers the whole filtered queue
+queue_selection = selection.get_selection("queue")
+selection.select_all_checkbox(queue_selection, "queue", queue_filters)
+
+# Only the visible page of the queue is rendered
+trace.stage("load_page")
+queue_offset, queue_limit = paginate(queue_total, "queue", reset_on=queue_filters)
+page_df = triage_queue.load_page(
+    lob=queue_lob,
+    brokers=broker_filter,
+    recommendations=recommendation_filter,
+    limit=queue_limit,
+    offset=queue_offset
+)
+
+# Screen the visible clients against the sanctions list in one batch
+trace.stage("screen_sanctions")
+sanctions_hits = sanctions.screen(page_df["client"])
 
 # Display each submission
-for i, row in enumerate(submissions_df.iterrows()):
+trace.stage("render_rows")
+for i, row in enumerate(page_df.iterrows(), start=queue_offset):
     index, data = row
-    
-    # Set checkbox value based on select all
-    checkbox_value = select_all
+    # Widgets are keyed by submission, so open panels and drafts stay with it as the queue shifts
+    submission_id = data["id"]
+    # Submissions resumed from the backlog may not have a premium or deadline yet
+    missing = data.isna()
+    premium_text = "–" if missing["estimated_premium"] else f"£{data['estimated_premium']:,.0f}"
+    days_text = "–" if missing["days_remaining"] else data["days_remaining"]
     
     # Create columns for each row - one small for checkbox, one large for data
     col1, col2 = st.columns([0.5, 11.5])
     
     with col1:
-        selected = st.checkbox("", value=checkbox_value, key=f"select_{i}")
-        if selected:
-            selection.append(data["id"])
+        selection.row_checkbox(queue_selection, "queue", submission_id)
     
     with col2:
         # Apply conditional formatting to AI recommendation with LARGER buttons
@@ -257,21 +238,21 @@ for i, row in enumerate(submissions_df.iterrows()):
             <div style="display:flex; gap:30px; flex-wrap:wrap; margin-top:5px;">
                 <div><span style="color:#666;">LOB:</span> {data["lob"]}</div>
                 <div><span style="color:#666;">Broker:</span> {data["broker"]}</div>
-                <div><span style="color:#666;">Est. Premium:</span> £{data["estimated_premium"]:,.0f}</div>
-                <div><span style="color:#666;">Days Left:</span> {data["days_remaining"]}</div>
+                <div><span style="color:#666;">Est. Premium:</span> {premium_text}</div>
+                <div><span style="color:#666;">Days Left:</span> {days_text}</div>
                 <div>{template_html}</div>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
         # Add view button functionality
-        view_button = st.button(f"View Details {i+1}", key=f"view_{i}")
+        view_button = st.button(f"View Details {i+1}", key=f"view_{submission_id}")
         
         if view_button:
-            st.session_state[f"view_submission_{i}"] = True
+            st.session_state[f"view_submission_{submission_id}"] = True
         
         # Show detailed view if button was clicked
-        if st.session_state.get(f"view_submission_{i}", False):
+        if st.session_state.get(f"view_submission_{submission_id}", False):
             with st.expander("Submission Details", expanded=True):
                 # Tabs for different aspects of the submission
                 detail_tab1, detail_tab2, detail_tab3 = st.tabs(["Overview", "Field Mapping", "Risk Analysis"])
@@ -287,7 +268,7 @@ for i, row in enumerate(submissions_df.iterrows()):
                         **Line of Business:** {data["lob"]}  
                         **Broker:** {data["broker"]}  
                         **Submission ID:** {data["id"]}  
-                        **Days Remaining:** {data["days_remaining"]}  
+                        **Days Remaining:** {days_text}  
                         """)
                     
                     with dcol2:
@@ -296,72 +277,75 @@ for i, row in enumerate(submissions_df.iterrows()):
                         **AI Recommendation:** {data["ai_recommendation"]}  
                         **Confidence:** {data["confidence"]}%  
                         **Risk Appetite Match:** {data["risk_appetite"]}%  
-                        **Estimated Premium:** £{data["estimated_premium"]:,.0f}  
+                        **Estimated Premium:** {premium_text}  
                         **Template Match:** {"Yes" if data["template_match"] else "No"}
                         """)
                     
                     # Add view source file button
                     st.markdown("##### Source Document")
-                    st.button("View Source File", key=f"source_{i}")
+                    st.button("View Source File", key=f"source_{submission_id}")
                     
                     # Submission notes
                     st.markdown("##### Notes")
-                    notes = st.text_area("", placeholder="Add notes about this submission...", key=f"notes_{i}")
+                    notes = st.text_area("", placeholder="Add notes about this submission...", key=f"notes_{submission_id}")
                 
                 with detail_tab2:
                     # Just field mapping, no source preview
                     st.markdown("##### Field Mapping")
                     
-                    # Simplified mapping display
-                    if data["template_match"]:
+                    # Look the schedule's headers up in the template index
+                    source_headers = templates.sample_headers(data["lob"])
+                    template = templates.match(source_headers, data["broker"], data["lob"])
+                    
+                    if template:
                         st.success("Mapped using existing template")
-                        template_name = f"{data['broker']} {data['lob']} Template"
-                        st.info(f"Template: **{template_name}**")
+                        st.info(f"Template: **{template.name}**")
+                        mapping = dict(template.mapping)
+                        confidence = {header: "High ✓" for header in mapping}
                     else:
                         st.warning("No template match - review mappings")
+                        mapping, confidence = templates.suggest_mapping(source_headers)
                     
                     # Simple mapping table - focus on just a few critical fields
                     mapping_data = {
                         "Source Field → Target Field": [
-                            "Client Name → Insured",
-                            "Property Value → TIV" if data["lob"] == "Property D&F" else "Limit → Policy Limit",
-                            "Location → Address" if data["lob"] == "Property D&F" else "Profession → Industry",
-                            "Construction → Building Type" if data["lob"] == "Property D&F" else "Expiry → Policy End Date",
-                            "Occupancy → Building Use" if data["lob"] == "Property D&F" else "Currency → Payment Currency"
+                            f"{header} → {mapping.get(header, 'Unmapped')}" for header in source_headers
                         ],
-                        "Confidence": [
-                            "High ✓",
-                            "Medium !" if not data["template_match"] else "High ✓",
-                            "High ✓",
-                            "Medium !" if not data["template_match"] else "High ✓",
-                            "High ✓"
-                        ]
+                        "Confidence": [confidence.get(header, "Low ✗") for header in source_headers]
                     }
                     
-                    mapping_df = pd.DataFrame(mapping_data)
-                    st.dataframe(mapping_df, hide_index=True, use_container_width=True)
+                    st.dataframe(mapping_data, hide_index=True, use_container_width=True)
                     
                     # Simple template management
-                    if not data["template_match"]:
-                        st.button(f"Save as New Template", key=f"save_template_{i}")
+                    if not template:
+                        if st.button(f"Save as New Template", key=f"save_template_{submission_id}"):
+                            templates.save_template(data["broker"], data["lob"], mapping)
+                            triage_queue.invalidate()
+                            st.rerun()
                 
                 with detail_tab3:
                     # Simple risk analysis
                     st.markdown("##### Key Risk Indicators")
                     
                     # Just the most important risk indicators
+                    sanctions_hit = sanctions_hits.get(data["client"])
                     risk_data = {
                         "Indicator": ["Sanctions Check", "Within Authority", "Exposure Limit"],
                         "Status": [
-                            "Clear ✓",
+                            sanctions.status_label(sanctions_hit),
                             "Yes ✓" if data["risk_appetite"] > 70 else "Referral Required !",
                             "Within Limits ✓" if random.random() > 0.2 else "Near Threshold !"
                         ]
                     }
                     
-                    # Create DataFrame
-                    risk_df = pd.DataFrame(risk_data)
-                    st.dataframe(risk_df, hide_index=True, use_container_width=True)
+                    st.dataframe(risk_data, hide_index=True, use_container_width=True)
+                    
+                    if sanctions_hit:
+                        st.warning(
+                            f"Client name {'matches' if sanctions_hit.kind == 'exact' else 'resembles'} "
+                            f"sanctions list entry {sanctions_hit.entry.list_id} "
+                            f"({sanctions_hit.entry.name}, {sanctions_hit.entry.program}). Refer before quoting."
+                        )
                 
                 # Decision buttons - use simple colored buttons
                 st.markdown("---")
@@ -370,36 +354,74 @@ for i, row in enumerate(submissions_df.iterrows()):
                 decision_col1, decision_col2, decision_col3 = st.columns(3)
                 
                 # Simple colored buttons
+                decision = None
                 with decision_col1:
-                    st.button("Accept", key=f"accept_{i}", type="primary")
+                    if st.button("Accept", key=f"accept_{submission_id}", type="primary"):
+                        decision = "Accept"
                 
                 with decision_col2:
-                    st.button("Move to Backlog", key=f"backlog_{i}")
+                    if st.button("Move to Backlog", key=f"backlog_{submission_id}"):
+                        decision = "Backlog"
                 
                 with decision_col3:
-                    st.button("Decline", key=f"decline_{i}", help="Decline this submission")
+                    if st.button("Decline", key=f"decline_{submission_id}", help="Decline this submission"):
+                        decision = "Decline"
+                
+                # Record the decision and reload the queue without this submission
+                if decision:
+                    triage_queue.record_decision(submission_id, decision)
+                    st.session_state.pop(f"view_submission_{submission_id}", None)
+                    queue_selection.discard([submission_id])
+                    st.rerun()
 
 # If any submissions are selected, show batch actions
-if selection:
+trace.stage(None)
+# Only ticked submissions the current filters still show are counted and acted on
+def in_filter(ids):
+    return triage_queue.in_queue(ids, queue_lob, broker_filter, recommendation_filter)
+
+selected_count = queue_selection.count(queue_total, in_filter)
+if selected_count:
     st.markdown("---")
-    st.markdown(f"### Batch Actions ({len(selection)} selected)")
+    st.markdown(f"### Batch Actions ({selected_count} selected)")
     
     # Use 3 even columns for buttons
     batch_col1, batch_col2, batch_col3 = st.columns(3)
     
+    batch_decision = None
+    
     # Accept button (green using Streamlit primary)
     with batch_col1:
-        st.button("Accept Selected", type="primary", key="batch_accept")
+        if st.button("Accept Selected", type="primary", key="batch_accept"):
+            batch_decision = ("Accept", "accepted")
     
     # Decline button (using a different key)
     with batch_col2:
-        st.button("Decline Selected", key="batch_decline")
+        if st.button("Decline Selected", key="batch_decline"):
+            batch_decision = ("Decline", "declined")
     
     # Move to backlog (using a different key)
     with batch_col3:
-        st.button("Move Selected to Backlog", key="batch_backlog")
+        if st.button("Move Selected to Backlog", key="batch_backlog"):
+            batch_decision = ("Backlog", "moved to backlog")
+    
+    # Apply the decision to every selected submission in one transaction
+    if batch_decision:
+        decision, done = batch_decision
+        selected_ids = queue_selection.resolve(
+            lambda: triage_queue.matching_ids(queue_lob, broker_filter, recommendation_filter), in_filter
+        )
+        st.session_state["batch_result"] = (triage_queue.record_decisions(selected_ids, decision), done)
+        queue_selection.clear()
+        st.rerun()
 else:
     # Show disabled batch actions
     st.markdown("---")
     st.markdown("### Batch Actions (0 selected)")
-    st.info("Select submissions to enable batch actions")
\ No newline at end of file
+    st.info("Select submissions to enable batch actions")
+
+batch_result = st.session_state.pop("batch_result", None)
+if batch_result is not None:
+    triage_queue.show_batch_result(*batch_result)
+
+trace.finish()
@@ -1,10 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+import os
+
+from core import charts, exports, history, jobs, kpis, reports, snapshots, store, tracing
 
 # Set page config for a cleaner look
 st.set_page_config(
@@ -13,6 +11,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# Time each stage of the run for the diagnostics panel and metrics
+trace = tracing.Trace("dashboard")
+
 # Add some custom CSS for styling
 st.markdown("""
 <style>
@@ -72,106 +73,110 @@ with col3:
         default=["All"]
     )
 
-# Generate sample data
-def generate_kpi_data():
-    return {
-        "submissions": {
-            "value": random.randint(450, 550),
-            "trend": random.uniform(0.05, 0.15),
-        },
-        "triage_time": {
-            "value": random.uniform(0.8, 1.5),
-            "trend": random.uniform(-0.1, -0.02),
-        },
-        "quality_score": {
-            "value": random.uniform(7.2, 8.5),
-            "trend": random.uniform(0.02, 0.08),
-        },
-        "processing_rate": {
-            "value": random.uniform(0.85, 0.95),
-            "trend": random.uniform(0.01, 0.05),
-        }
-    }
-
-def generate_submissions_data():
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    current_month = datetime.now().month
-    recent_months = months[max(0, current_month - 7):current_month]
-    
-    data = []
-    for month in recent_months:
-        received = random.randint(140, 220)
-        processed = int(received * random.uniform(0.85, 0.98))
-        aligned = int(processed * random.uniform(0.5, 0.7))
-        not_aligned = processed - aligned
-        backlog = received - processed
-        
-        data.append({
-            "month": month,
-            "Received": received,
-            "Processed": processed,
-            "Aligned with Appetite": aligned,
-            "Not Aligned": not_aligned,
-            "Backlog": backlog
-        })
-    
-    return pd.DataFrame(data)
-
-def generate_lob_data():
-    lobs = ["Property D&F", "Professional Indemnity", "Cyber", "Marine Cargo", "Energy"]
-    data = []
-    
-    for lob in lobs:
-        submission_count = random.randint(80, 180)
-        aligned_pct = random.uniform(0.5, 0.8)
-        avg_triage_time = random.uniform(0.7, 2.0)
-        data_quality = random.uniform(60, 95)
-        
-        if lob == "Cyber":
-            data_quality = 65  # Intentionally lower for insights
-        
-        data.append({
-            "lob": lob,
-            "submission_count": submission_count,
-            "aligned_pct": aligned_pct,
-            "avg_triage_time": avg_triage_time,
-            "data_quality": data_quality
-        })
-    
-    return pd.DataFrame(data)
+# Months of history each date range covers; None means since 1 January
+DATE_RANGE_MONTHS = {
+    "Last Quarter": 3,
+    "Last 6 Months": 6,
+    "Year to Date": None,
+    "Last 12 Months": 12,
+}
+
+# Rows of submission history shown on the page
+HISTORY_ROWS = 500
+
+def range_start(date_range):
+    today = datetime.now()
+    months = DATE_RANGE_MONTHS[date_range]
+    if months is None:
+        return datetime(today.year, 1, 1)
+    start = today.year * 12 + today.month - months
+    return datetime(start // 12, start % 12 + 1, 1)
+
+def load_submissions_data(rollups, since):
+    import pandas as pd
+
+    # Monthly flow from the daily rollups, with empty months kept on the axis
+    months = pd.period_range(since, datetime.now(), freq="M")
+    monthly = (
+        rollups.groupby(rollups["day"].dt.to_period("M"))[["received", "processed", "aligned", "not_aligned", "backlog"]]
+        .sum()
+        .reindex(months, fill_value=0)
+    )
+    return pd.DataFrame({
+        "month": monthly.index.strftime("%b %Y"),
+        "Received": monthly["received"].to_numpy(),
+        "Processed": monthly["processed"].to_numpy(),
+        "Aligned with Appetite": monthly["aligned"].to_numpy(),
+        "Not Aligned": monthly["not_aligned"].to_numpy(),
+        "Backlog": monthly["backlog"].to_numpy()
+    })
+
+def load_breakdown(rollups, by, keys):
+    import pandas as pd
+
+    totals = rollups.groupby(by)[["received", "processed", "aligned", "completeness"]].sum().reindex(keys, fill_value=0)
+    return pd.DataFrame({
+        by: totals.index,
+        "submission_count": totals["received"].to_numpy(),
+        "aligned_pct": (totals["aligned"] / totals["processed"].where(totals["processed"] > 0)).fillna(0).to_numpy(),
+        "data_quality": (
+            100 * totals["completeness"] / (store.COMPLETENESS_FIELDS * totals["received"].where(totals["received"] > 0))
+        ).fillna(0).to_numpy()
+    })
+
+def format_kpi(value, spec):
+    return "–" if value is None else format(value, spec)
+
+def format_trend(trend, lower_is_better=False):
+    # Improvements are green whichever direction they go
+    if trend is None:
+        return '<span style="color: #6c757d;">–</span>'
+    improving = (trend < 0) if lower_is_better else (trend >= 0)
+    return f'<span style="color: {"#28a745" if improving else "#dc3545"};">{trend:+.1%}</span>'
+
+def shared_window():
+    # The widest date range; every session's views are sliced from one shared snapshot this long
+    return min(range_start(date_range) for date_range in DATE_RANGE_MONTHS)
+
+def load_rollups(since, lobs):
+    # Views of the process-wide rollups, oldest day first, re-read once per write
+    window = shared_window()
+    rollups = snapshots.shared_frame("dashboard_rollups").get(
+        (window, store.data_version()),
+        lambda: store.query_rollups(since=window).sort_values("day", ignore_index=True)
+    )
+    rollups = snapshots.since(rollups, "day", since)
+    return rollups[rollups["lob"].isin(lobs)] if lobs else rollups
+
+def load_history(since, lobs):
+    # Views of the process-wide history, newest first, re-read once per history sync
+    window = shared_window()
+    history_df = snapshots.shared_frame("dashboard_history").get(
+        (window, store.meta_value("history_version")),
+        lambda: history.load(
+            since=window,
+            columns=["id", "client", "broker", "lob", "status", "received", "estimated_premium", "ai_recommendation"]
+        ).sort_values("received", ascending=False, ignore_index=True)
+    )
+    history_df = snapshots.since(history_df, "received", since)
+    return history_df[history_df["lob"].isin(lobs)] if lobs else history_df
 
-def generate_broker_data():
-    brokers = ["Marsh", "Aon", "WTW", "Howden", "BMS", "Miller", "Gallagher"]
-    data = []
-    
-    for broker in brokers:
-        submission_count = random.randint(40, 120)
-        aligned_pct = random.uniform(0.4, 0.85)
-        avg_triage_time = random.uniform(0.8, 2.2)
-        data_quality = random.uniform(65, 95)
-        
-        if broker == "Howden":  # Make one broker noticeably different for insights
-            aligned_pct = 0.82  # High alignment
-        elif broker == "Miller":
-            aligned_pct = 0.45  # Low alignment
-            
-        data.append({
-            "broker": broker,
-            "submission_count": submission_count,
-            "aligned_pct": aligned_pct,
-            "avg_triage_time": avg_triage_time,
-            "data_quality": data_quality
-        })
-    
-    return pd.DataFrame(data)
+# Slice the shared daily rollups to the selected period and lines
+trace.stage("load_rollups")
+since = range_start(date_range)
+selected_lobs = [] if "All" in lob_filter else lob_filter
+rollups = load_rollups(since, selected_lobs)
 
 # Generate the data
-kpi_data = generate_kpi_data()
-submissions_df = generate_submissions_data()
-lob_df = generate_lob_data()
-broker_df = generate_broker_data()
+trace.stage("kpis")
+kpi_data = kpis.kpi_summary(since, comparison, lobs=selected_lobs)
+trace.stage("aggregate")
+submissions_df = load_submissions_data(rollups, since)
+lob_df = load_breakdown(rollups, "lob", selected_lobs or store.LOBS)
+broker_df = load_breakdown(rollups, "broker", sorted(set(store.BROKERS) | set(rollups["broker"])))
 
 # Sparkle emoji with header
+trace.stage(None)
 st.markdown('<h2 style="font-size: 1.5rem;">✨ Key Insights & Action Items</h2>', unsafe_allow_html=True)
 
 # Use expanders for each insight/action pair
@@ -190,10 +195,10 @@ kpi_cols = st.columns(4)
 with kpi_cols[0]:
     st.markdown(f"""
     <div class="kpi-card">
-        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{kpi_data['submissions']['value']}</p>
+        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{format_kpi(kpi_data['submissions']['value'], ',')}</p>
         <p style="font-size: 0.9rem; color: #6c757d; margin: 0;">Total Submissions</p>
-        <p style="font-size: 0.8rem; color: #28a745; margin-top: 0.25rem;">
-            +{kpi_data['submissions']['trend']:.1%}
+        <p style="font-size: 0.8rem; margin-top: 0.25rem;">
+            {format_trend(kpi_data['submissions']['trend'])}
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -201,10 +206,10 @@ with kpi_cols[0]:
 with kpi_cols[1]:
     st.markdown(f"""
     <div class="kpi-card">
-        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{kpi_data['triage_time']['value']:.1f} days</p>
+        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{format_kpi(kpi_data['triage_time']['value'], '.1f')} days</p>
         <p style="font-size: 0.9rem; color: #6c757d; margin: 0;">Avg Triage Time</p>
-        <p style="font-size: 0.8rem; color: #28a745; margin-top: 0.25rem;">
-            {kpi_data['triage_time']['trend']:.1%}
+        <p style="font-size: 0.8rem; margin-top: 0.25rem;">
+            {format_trend(kpi_data['triage_time']['trend'], lower_is_better=True)}
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -212,10 +217,10 @@ with kpi_cols[1]:
 with kpi_cols[2]:
     st.markdown(f"""
     <div class="kpi-card">
-        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{kpi_data['quality_score']['value']:.1f}/10</p>
+        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{format_kpi(kpi_data['quality_score']['value'], '.1f')}/10</p>
         <p style="font-size: 0.9rem; color: #6c757d; margin: 0;">Data Quality Score</p>
-        <p style="font-size: 0.8rem; color: #28a745; margin-top: 0.25rem;">
-            +{kpi_data['quality_score']['trend']:.1%}
+        <p style="font-size: 0.8rem; margin-top: 0.25rem;">
+            {format_trend(kpi_data['quality_score']['trend'])}
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -223,10 +228,10 @@ with kpi_cols[2]:
 with kpi_cols[3]:
     st.markdown(f"""
     <div class="kpi-card">
-        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{kpi_data['processing_rate']['value']:.0%}</p>
+        <p style="font-size: 1.8rem; font-weight: 700; color: #1E3A8A; margin: 0;">{format_kpi(kpi_data['processing_rate']['value'], '.0%')}</p>
         <p style="font-size: 0.9rem; color: #6c757d; margin: 0;">Processing Rate</p>
-        <p style="font-size: 0.8rem; color: #28a745; margin-top: 0.25rem;">
-            +{kpi_data['processing_rate']['trend']:.1%}
+        <p style="font-size: 0.8rem; margin-top: 0.25rem;">
+            {format_trend(kpi_data['processing_rate']['trend'])}
         </p>
     </div>
     """, unsafe_allow_html=True)
@@ -235,71 +240,78 @@ with kpi_cols[3]:
 st.markdown('<div class="sub-header">Submission Flow</div>', unsafe_allow_html=True)
 
 # Create the visualization for submission flow
-fig = px.bar(
-    submissions_df,
-    x="month",
-    y=["Received", "Processed", "Aligned with Appetite", "Not Aligned", "Backlog"],
-    title="Submission Volume by Month",
-    barmode="group",
-    color_discrete_map={
-        "Received": "#36A2EB",
-        "Processed": "#4BC0C0",
-        "Aligned with Appetite": "#3CB371",
-        "Not Aligned": "#FF6384",
-        "Backlog": "#FFB347"
-    }
-)
-fig.update_layout(
-    height=400,
-    legend_title_text="",
-    xaxis_title="",
-    yaxis_title="Number of Submissions",
-    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-)
-st.plotly_chart(fig, use_container_width=True)
+@charts.figure_cache
+def build_flow_figure(submissions_df):
+    # Plotly is imported when the first chart is drawn, after the page has started rendering
+    import plotly.express as px
+
+    fig = px.bar(
+        submissions_df,
+        x="month",
+        y=["Received", "Processed", "Aligned with Appetite", "Not Aligned", "Backlog"],
+        title="Submission Volume by Month",
+        barmode="group",
+        color_discrete_map={
+            "Received": "#36A2EB",
+            "Processed": "#4BC0C0",
+            "Aligned with Appetite": "#3CB371",
+            "Not Aligned": "#FF6384",
+            "Backlog": "#FFB347"
+        }
+    )
+    fig.update_layout(
+        height=400,
+        legend_title_text="",
+        xaxis_title="",
+        yaxis_title="Number of Submissions",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+trace.stage("build_figures")
+fig = build_flow_figure(submissions_df)
+st.plotly_chart(fig, use_container_width=True, key="flow_chart")
+trace.stage(None)
 
 # Broker Analysis Section
 st.markdown('<div class="sub-header">Broker Submission Analysis</div>', unsafe_allow_html=True)
 
-# Sort brokers by alignment percentage
-broker_df_sorted = broker_df.sort_values("aligned_pct", ascending=False)
-
-# Create a horizontal bar chart for broker alignment
-broker_fig = px.bar(
-    broker_df_sorted,
-    y="broker",
-    x="aligned_pct",
-    orientation="h",
-    title="Broker Submission Alignment with Risk Appetite",
-    text=broker_df_sorted["aligned_pct"].apply(lambda x: f"{x:.0%}"),
-    color="aligned_pct",
-    color_continuous_scale="Blues",
-    hover_data=["submission_count", "data_quality"]
-)
-broker_fig.update_layout(
-    height=400,
-    xaxis_title="Alignment with Risk Appetite (%)",
-    yaxis_title="",
-    coloraxis_showscale=False
-)
-st.plotly_chart(broker_fig, use_container_width=True)
+@charts.figure_cache
+def build_broker_figure(broker_df):
+    # Sort brokers by alignment percentage
+    broker_df_sorted = broker_df.sort_values("aligned_pct", ascending=False)
+
+    # Create a horizontal bar chart for broker alignment
+    import plotly.express as px
+
+    broker_fig = px.bar(
+        broker_df_sorted,
+        y="broker",
+        x="aligned_pct",
+        orientation="h",
+        title="Broker Submission Alignment with Risk Appetite",
+        text=broker_df_sorted["aligned_pct"].apply(lambda x: f"{x:.0%}"),
+        color="aligned_pct",
+        color_continuous_scale="Blues",
+        hover_data=["submission_count", "data_quality"]
+    )
+    broker_fig.update_layout(
+        height=400,
+        xaxis_title="Alignment with Risk Appetite (%)",
+        yaxis_title="",
+        coloraxis_showscale=False
+    )
+    return broker_fig
 
-# Team Performance Section 
-st.markdown('<div class="sub-header">Triage Analysis by LoB</div>', unsafe_allow_html=True)
-efficiency_col1, efficiency_col2 = st.columns(2)
+trace.stage("build_figures")
+broker_fig = build_broker_figure(broker_df)
+st.plotly_chart(broker_fig, use_container_width=True, key="broker_chart")
+trace.stage(None)
+
+@charts.figure_cache
+def build_funnel_figure(funnel_labels, funnel_values):
+    import plotly.graph_objects as go
 
-with efficiency_col1:
-    # Create a funnel chart for the submission triage process
-    latest_month = submissions_df.iloc[-1]
-    
-    funnel_labels = ["Received", "Initial Screening", "Processed", "Aligned with Appetite"]
-    funnel_values = [
-        latest_month["Received"], 
-        int(latest_month["Received"] * 0.95),  # Assume 95% pass initial screening
-        latest_month["Processed"],
-        latest_month["Aligned with Appetite"]
-    ]
-    
     funnel_fig = go.Figure(go.Funnel(
         y=funnel_labels,
         x=funnel_values,
@@ -312,68 +324,163 @@ with efficiency_col1:
         height=400,
         margin=dict(t=50, b=0, l=30, r=30)
     )
-    
-    st.plotly_chart(funnel_fig, use_container_width=True)
+    return funnel_fig
 
- # Submission distribution
-pie_fig = px.pie(
+@charts.figure_cache
+def build_pie_figure(lob_df):
+    import plotly.express as px
+
+    pie_fig = px.pie(
         lob_df,
         values="submission_count",
         names="lob",
         title="Submission Distribution by Line of Business",
         color_discrete_sequence=px.colors.qualitative.Pastel
     )
-pie_fig.update_traces(textposition='inside', textinfo='percent+label')
-pie_fig.update_layout(
+    pie_fig.update_traces(textposition='inside', textinfo='percent+label')
+    pie_fig.update_layout(
         height=400,
         margin=dict(t=30, b=0, l=0, r=0),
         showlegend=False
     )
-st.plotly_chart(pie_fig, use_container_width=True)
-
-# Create horizontal bar chart for data quality
-quality_fig = px.bar(
-    lob_df.sort_values("data_quality"),
-    y="lob",
-    x="data_quality",
-    orientation="h",
-    title="Data Completeness Score by Line of Business (%)",
-    text=lob_df["data_quality"].apply(lambda x: f"{x:.0f}%"),
-    color="data_quality",
-    color_continuous_scale=["#dc3545", "#ffc107", "#28a745"],
-    range_color=[60, 100]
-)
-quality_fig.update_layout(
-    height=400,
-    xaxis_title="Data Completeness Score (%)",
-    yaxis_title="",
-    coloraxis_showscale=False
-)
-st.plotly_chart(quality_fig, use_container_width=True)
-
-# Export options
-st.markdown('<div class="sub-header">Export Report</div>', unsafe_allow_html=True)
-export_col1, export_col2 = st.columns(2)
-
-with export_col1:
-    st.download_button(
-        "Export Dashboard (PDF)",
-        "Example PDF Report",
-        file_name="executive_dashboard_report.pdf",
-        mime="application/pdf"
+    return pie_fig
+
+@charts.figure_cache
+def build_quality_figure(lob_df):
+    import plotly.express as px
+
+    lob_df_sorted = lob_df.sort_values("data_quality")
+    quality_fig = px.bar(
+        lob_df_sorted,
+        y="lob",
+        x="data_quality",
+        orientation="h",
+        title="Data Completeness Score by Line of Business (%)",
+        text=lob_df_sorted["data_quality"].apply(lambda x: f"{x:.0f}%"),
+        color="data_quality",
+        color_continuous_scale=["#dc3545", "#ffc107", "#28a745"],
+        range_color=[60, 100]
     )
-
-with export_col2:
-    st.download_button(
-        "Export Data (Excel)",
-        "Example Excel Data Export",
-        file_name="executive_dashboard_data.xlsx",
-        mime="application/vnd.ms-excel"
+    quality_fig.update_layout(
+        height=400,
+        xaxis_title="Data Completeness Score (%)",
+        yaxis_title="",
+        coloraxis_showscale=False
     )
+    return quality_fig
+
+# Team Performance Section 
+trace.stage("build_figures")
+st.markdown('<div class="sub-header">Triage Analysis by LoB</div>', unsafe_allow_html=True)
+efficiency_col1, efficiency_col2 = st.columns(2)
+
+with efficiency_col1:
+    # Create a funnel chart for the submission triage process
+    latest_month = submissions_df.iloc[-1]
+    
+    funnel_labels = ["Received", "Initial Screening", "Processed", "Aligned with Appetite"]
+    funnel_values = [
+        latest_month["Received"], 
+        int(latest_month["Received"] * 0.95),  # Assume 95% pass initial screening
+        latest_month["Processed"],
+        latest_month["Aligned with Appetite"]
+    ]
+    
+    funnel_fig = build_funnel_figure(tuple(funnel_labels), tuple(int(v) for v in funnel_values))
+    st.plotly_chart(funnel_fig, use_container_width=True, key="funnel_chart")
+
+ # Submission distribution
+pie_fig = build_pie_figure(lob_df)
+st.plotly_chart(pie_fig, use_container_width=True, key="lob_pie_chart")
+
+# Create horizontal bar chart for data quality
+quality_fig = build_quality_figure(lob_df)
+st.plotly_chart(quality_fig, use_container_width=True, key="quality_chart")
+
+# Submission history for the selected period, read from the Parquet history store
+trace.stage("load_history")
+st.markdown('<div class="sub-header">Submission History</div>', unsafe_allow_html=True)
+# Changed months are rewritten in the background; this run shows the last synced history
+history.sync_in_background()
+history_df = load_history(since, selected_lobs)
+trace.stage("render_history")
+st.caption(f"{len(history_df):,} submissions received since {since.strftime('%d %b %Y')}, newest {HISTORY_ROWS:,} shown")
+st.dataframe(history_df.head(HISTORY_ROWS), hide_index=True, use_container_width=True)
+
+# Export options run in a fragment, so their buttons rerun only this section
+trace.stage(None)
+@st.fragment
+def export_section(figures, kpi_data, since, selected_lobs, date_range, comparison):
+    st.markdown('<div class="sub-header">Export Report</div>', unsafe_allow_html=True)
+    export_col1, export_col2 = st.columns(2)
+
+    with export_col1:
+        # Identical reports are served from the report cache; new ones are built in a worker
+        if st.button("Export Dashboard (PDF)"):
+            report = reports.report_spec(
+                title="Executive Dashboard",
+                subtitle=f"{date_range} ({comparison}), {', '.join(selected_lobs) or 'all lines of business'}, as of {datetime.now():%d %b %Y}",
+                kpis=[
+                    ("Total Submissions", format_kpi(kpi_data["submissions"]["value"], ","), kpi_data["submissions"]["trend"]),
+                    ("Avg Triage Time (days)", format_kpi(kpi_data["triage_time"]["value"], ".1f"), kpi_data["triage_time"]["trend"]),
+                    ("Data Quality Score", format_kpi(kpi_data["quality_score"]["value"], ".1f"), kpi_data["quality_score"]["trend"]),
+                    ("Processing Rate", format_kpi(kpi_data["processing_rate"]["value"], ".0%"), kpi_data["processing_rate"]["trend"])
+                ],
+                figures=figures
+            )
+            report_path, report_job = reports.request_report(report)
+            st.session_state["pdf_report"] = {"path": report_path, "job": report_job}
+    
+        pdf_report = st.session_state.get("pdf_report")
+        if pdf_report and pdf_report["job"] and jobs.show_progress(pdf_report["job"], "Preparing PDF report..."):
+            report_result = jobs.job_results(pdf_report["job"])[0]
+            if report_result["error"]:
+                st.error(f"Report failed: {report_result['error']}")
+            else:
+                pdf_report["path"] = report_result["result"]["path"]
+    
+        if pdf_report and pdf_report["path"] and os.path.exists(pdf_report["path"]):
+            with open(pdf_report["path"], "rb") as report_file:
+                st.download_button(
+                    "Download PDF Report",
+                    report_file,
+                    file_name="executive_dashboard_report.pdf",
+                    mime="application/pdf"
+                )
+
+    with export_col2:
+        # Build the workbook in a worker process and offer it once it is ready
+        if st.button("Export Data (Excel)"):
+            st.session_state["excel_export_job"] = jobs.get_queue().submit(
+                "excel_export",
+                exports.export_excel,
+                [{"since": since, "lobs": selected_lobs, "path": exports.new_export_path(".xlsx")}],
+                processes=True
+            )
+    
+        excel_job = st.session_state.get("excel_export_job")
+        if excel_job and jobs.show_progress(excel_job, "Preparing Excel export..."):
+            excel_result = jobs.job_results(excel_job)[0]
+            if excel_result["error"]:
+                st.error(f"Export failed: {excel_result['error']}")
+            elif not os.path.exists(excel_result["result"]["path"]):
+                st.warning("This export has expired. Please export again.")
+            else:
+                with open(excel_result["result"]["path"], "rb") as export_file:
+                    st.download_button(
+                        f"Download Excel ({excel_result['result']['submissions']:,} submissions)",
+                        export_file,
+                        file_name="executive_dashboard_data.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+
+export_section([fig, broker_fig, funnel_fig, pie_fig, quality_fig], kpi_data, since, selected_lobs, date_range, comparison)
 
 # Footer with last update time
 st.markdown(f"""
 <div style="text-align: right; color: #6c757d; font-size: 0.8rem; margin-top: 3rem;">
     Dashboard last updated: {datetime.now().strftime('%d %b %Y, %H:%M')}
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+trace.finish()